@@ -0,0 +1,60 @@
+#! /usr/bin/env python3
+"""
+Micro-benchmark of the GPGNet protocol code in fa.game_connection.
+
+Decodes a stream of typical game messages fed in socket-sized chunks, and
+encodes the same messages again. Prints microseconds per message, the best
+of several runs.
+
+    python bench/bench_gpgnet.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from fa.game_connection import GPGNetDecoder, encode_message  # noqa: E402
+
+CHUNK_SIZE = 4096
+
+MESSAGES = [
+    ("GameState", ["Lobby"]),
+    ("Chat", ["hello there friends"]),
+    ("PlayerOption", [2, "Faction", 3]),
+    ("JsonStats", ['{"stats":[' + ",".join(['{"a":1}'] * 200) + ']}']),
+    ("Desync", [1, 2, 3, 4]),
+] * 2000
+
+
+def decode(data):
+    decoder = GPGNetDecoder()
+    messages = []
+    for i in range(0, len(data), CHUNK_SIZE):
+        messages += decoder.feed(data[i:i + CHUNK_SIZE])
+    return messages
+
+
+def encode(messages):
+    return b"".join(encode_message(command, args)
+                    for command, args in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = encode(MESSAGES)
+    assert decode(data) == MESSAGES
+
+    for name, func in [("decode", lambda: decode(data)),
+                       ("encode", lambda: encode(MESSAGES))]:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print("{}: {:.2f} us/msg".format(name, best / len(MESSAGES) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
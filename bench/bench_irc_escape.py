@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+"""
+Micro-benchmark of util.irc_escape, which escapes and linkifies every chat
+line before it is shown.
+
+Runs over a synthetic corpus of chat lines made up on the spot, or over the
+file given with --corpus, e.g. a chat log. Prints microseconds per line, the
+best of several runs.
+
+The synthetic lines mix what real lobby chat has in roughly realistic
+amounts: mostly short lines of plain words, some sentences with dots, links
+with and without a protocol, replay and game links, IPs and HTML special
+characters. They're always the same, so runs can be compared.
+
+    python bench/bench_irc_escape.py [--corpus FILE] [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+from util import irc_escape  # noqa: E402
+
+LINES = 5000
+SEED = 1
+
+WORDS = ("gl hf gg wp lol noob rush eco t2 t3 arty nukes why is this map so "
+         "bad, anyone 1v1? setons again. ok ty np brb afk ranked ladder "
+         "ünïcode Δelta").split()
+
+EXTRAS = [
+    (0.05, lambda rng, i: "https://forum.faforever.com/topic/{}".format(i)),
+    (0.02, lambda rng, i: "www.faforever.com/replays/{}".format(i)),
+    (0.01, lambda rng, i: "faflive://lobby.faforever.com/{}/Player.SCFAreplay"
+                          .format(i)),
+    (0.01, lambda rng, i: "127.0.0.1:{}".format(rng.randint(1000, 9999))),
+    (0.01, lambda rng, i: "localhost"),
+    (0.05, lambda rng, i: "<3 & stuff"),
+    (0.03, lambda rng, i: "\"quoted\" 'text'"),
+]
+
+
+def make_corpus(lines=LINES, seed=SEED):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(lines):
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 15)))
+        for chance, extra in EXTRAS:
+            if rng.random() < chance:
+                line += " " + extra(rng, i)
+        corpus.append(line)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.corpus is None:
+        lines = make_corpus()
+    else:
+        with open(args.corpus, "rt", encoding="utf-8") as fh:
+            lines = fh.read().splitlines()
+
+    def escape_all():
+        for line in lines:
+            irc_escape(line)
+
+    best = min(timeit.repeat(escape_all, number=1, repeat=args.repeat))
+    links = sum(irc_escape(line).count("<a href") for line in lines)
+    print("irc_escape: {:.2f} us/line ({} lines, {} links)".format(
+        best / len(lines) * 1e6, len(lines), links))
+
+
+if __name__ == '__main__':
+    main()
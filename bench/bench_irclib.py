@@ -0,0 +1,166 @@
+#! /usr/bin/env python3
+"""
+Benchmark of the IRC client's receive path in chat.irclib: splitting
+socket reads into lines, parsing them and dispatching events.
+
+Feeds a synthetic 60000-line session of a busy channel - a 3000 user
+NAMES list, then mostly chat, joins and quits - through
+ServerConnection.process_data in socket-sized reads. It runs once with a
+no-op global handler and once with a SimpleIRCClient subclass handling the
+common events. Prints lines per second, the best of several runs.
+
+    python bench/bench_irclib.py [--lines N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "src"))
+
+from chat import irclib  # noqa: E402
+
+
+def session(lines=60000, seed=1):
+    rng = random.Random(seed)
+    nicks = (["Player{}".format(i) for i in range(3000)]
+             + ["ümläut", "Δelta", "[TAG]x_y"])
+
+    def source(nick):
+        return ":{}!{}@{}.users.faforever.com".format(
+            nick, rng.randint(1, 300000), nick.lower())
+
+    out = [":irc.faforever.com 001 me :Welcome to the FAF IRC Network me",
+           ":irc.faforever.com 375 me :- irc.faforever.com Message of the "
+           "Day -"]
+    for i in range(0, len(nicks), 60):
+        names = (rng.choice("@+~") + nick if rng.random() < .05 else nick
+                 for nick in nicks[i:i + 60])
+        out.append(":irc.faforever.com 353 me = #aeolus :" + " ".join(names))
+    out.append(":irc.faforever.com 366 me #aeolus :End of /NAMES list.")
+
+    words = ["gg", "anyone", "for", "setons", "2v2?", "http://faforever.com/",
+             "lol", "ünïcode", "rank", "1000"]
+    kinds = (["msg"] * 40 + ["join"] * 20 + ["quit"] * 20 + ["part"] * 5
+             + ["mode"] * 3 + ["notice"] * 3 + ["action"] * 3 + ["ping"] * 2
+             + ["topic"])
+    while len(out) < lines:
+        kind, nick = rng.choice(kinds), rng.choice(nicks)
+        if kind == "msg":
+            text = " ".join(rng.choice(words)
+                            for _ in range(rng.randint(1, 20)))
+            out.append("{} PRIVMSG #aeolus :{}".format(source(nick), text))
+        elif kind == "join":
+            out.append("{} JOIN :#aeolus".format(source(nick)))
+        elif kind == "quit":
+            reason = rng.choice(["Quit: leaving", "*.net *.split",
+                                 "Ping timeout: 240 seconds"])
+            out.append("{} QUIT :{}".format(source(nick), reason))
+        elif kind == "part":
+            out.append("{} PART #aeolus :bye".format(source(nick)))
+        elif kind == "mode":
+            out.append(":ChanServ!ChanServ@services. MODE #aeolus +o "
+                       + nick)
+        elif kind == "notice":
+            out.append(":NickServ!NickServ@services. NOTICE me :[#aeolus] "
+                       "Password accepted - you are now recognized.")
+        elif kind == "action":
+            out.append("{} PRIVMSG #aeolus :\x01ACTION waves at {}\x01"
+                       .format(source(nick), rng.choice(nicks)))
+        elif kind == "ping":
+            out.append("PING :irc.faforever.com")
+        else:
+            out.append("{} TOPIC #aeolus :Welcome to FAF :: rules at "
+                       "http://faforever.com".format(source(nick)))
+    return ("\r\n".join(out) + "\r\n").encode("utf-8")
+
+
+class _Socket:
+    def __init__(self, data):
+        self._data = data
+        self._pos = 0
+
+    @property
+    def done(self):
+        return self._pos >= len(self._data)
+
+    def recv(self, size):
+        data = self._data[self._pos:self._pos + size]
+        self._pos += size
+        return data
+
+    def send(self, data):
+        pass
+
+
+class _Client(irclib.SimpleIRCClient):
+    def on_pubmsg(self, c, e):
+        pass
+
+    def on_join(self, c, e):
+        pass
+
+    def on_quit(self, c, e):
+        pass
+
+    def on_part(self, c, e):
+        pass
+
+    def on_namreply(self, c, e):
+        pass
+
+    def on_action(self, c, e):
+        pass
+
+
+def _prepare(connection, data):
+    # Pretend we're connected, without a server
+    connection.previous_buffer = bytearray()
+    connection.handlers = {}
+    connection.real_server_name = ""
+    connection.real_nickname = "me"
+    connection.ssl = None
+    connection.socket = _Socket(data)
+    return connection
+
+
+def global_handler(data):
+    irc = irclib.IRC()
+    irc.add_global_handler("all_events", lambda c, e: None)
+    return _prepare(irc.server(), data)
+
+
+def client(data):
+    return _prepare(_Client().connection, data)
+
+
+def best_time(setup, data, repeat):
+    times = []
+    for _ in range(repeat):
+        connection = setup(data)
+        start = time.perf_counter()
+        while not connection.socket.done:
+            connection.process_data()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=60000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = session(args.lines)
+    lines = data.count(b"\n")
+    for name, setup in [("global handler", global_handler),
+                        ("SimpleIRCClient", client)]:
+        best = best_time(setup, data, args.repeat)
+        print("{}: {:.0f} ms, {:.0f} lines/s".format(
+            name, best * 1000, lines / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -31,8 +31,8 @@ class ChannelView:
         if self._channel.id_key.type == ChannelType.PRIVATE:
             self.widget.show_chatter_list(False)
 
-        self._channel.added_chatter.connect(self._update_chatter_count)
-        self._channel.removed_chatter.connect(self._update_chatter_count)
+        self._channel.added_chatters.connect(self._update_chatter_count)
+        self._channel.removed_chatters.connect(self._update_chatter_count)
         self._update_chatter_count()
 
     def _update_chatter_count(self):
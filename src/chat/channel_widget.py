@@ -1,5 +1,4 @@
 from PyQt5.QtCore import QObject, pyqtSignal, QUrl, Qt
-from PyQt5.QtGui import QTextDocument, QTextCursor
 import re
 from util.qt import monkeypatch_method
 
@@ -61,7 +60,7 @@ class ChannelWidget(QObject):
         self.nick_list.resized.connect(self._chatter_list_resized)
         self.chat_edit.set_channel(self.channel)
         self.nick_filter.textChanged.connect(self._set_chatter_filter)
-        self.chat_area.anchorClicked.connect(self._url_clicked)
+        self.chat_area.url_clicked.connect(self._url_clicked)
         self._override_widget_methods()
         self._load_css()
         self._sticky_scroll = ChatAreaStickyScroll(
@@ -90,16 +89,13 @@ class ChannelWidget(QObject):
         self.css_reloaded.emit()    # Qt does not reapply css on its own
 
     def _load_css(self):
-        self.chat_area.document().setDefaultStyleSheet(self._chat_area_css.css)
+        self.chat_area.set_css(self._chat_area_css.css)
 
     def clear_chat(self):
-        self.chat_area.document().setHtml("")
+        self.chat_area.clear_lines()
 
     def add_avatar_resource(self, url, pix):
-        doc = self.chat_area.document()
-        link = QUrl(url)
-        if not doc.resource(QTextDocument.ImageResource, link):
-            doc.addResource(QTextDocument.ImageResource, link, pix)
+        self.chat_area.add_image(QUrl(url).toString(), pix)
 
     def _set_chatter_filter(self, text):
         self.nick_list.model().setFilterFixedString(text)
@@ -119,22 +115,10 @@ class ChannelWidget(QObject):
         self.nick_frame.setVisible(should_show)
 
     def append_line(self, text):
-        # QTextEdit has its own ideas about scrolling and does not stay
-        # in place when adding content
-        self._sticky_scroll.save_scroll()
-
-        cursor = self.chat_area.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.chat_area.setTextCursor(cursor)
-        self.chat_area.insertHtml(text)
-
-        self._sticky_scroll.restore_scroll()
+        self.chat_area.append_line(text)
 
     def remove_lines(self, number):
-        cursor = self.chat_area.textCursor()
-        cursor.movePosition(QTextCursor.Start)
-        cursor.movePosition(QTextCursor.Down, QTextCursor.KeepAnchor, number)
-        cursor.removeSelectedText()
+        self.chat_area.remove_lines(number)
 
     def set_chatter_delegate(self, delegate):
         self.nick_list.setItemDelegate(delegate)
@@ -164,16 +148,6 @@ class ChatAreaStickyScroll:
         self._scrollbar.rangeChanged.connect(self._stick_at_range_changed)
         self._is_set_to_maximum = True
         self._old_value = self._scrollbar.value()
-        self._saved_scroll = 0
-
-    def save_scroll(self):
-        self._saved_scroll = self._scrollbar.value()
-
-    def restore_scroll(self):
-        if self._is_set_to_maximum:
-            self._scrollbar.setValue(self._scrollbar.maximum())
-        else:
-            self._scrollbar.setValue(self._saved_scroll)
 
     def _track_maximum(self, val):
         self._is_set_to_maximum = val == self._scrollbar.maximum()
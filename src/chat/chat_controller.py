@@ -7,11 +7,41 @@ from model.chat.channelchatter import ChannelChatter
 from enum import Enum
 
 
+def _batched(fn):
+    # Changes made outside of a batch make up a batch of their own
+    def wrap(self, *args, **kwargs):
+        if self._transaction is not None:
+            return fn(self, *args, **kwargs)
+        self._at_batch_started()
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            self._at_batch_finished()
+    return wrap
+
+
+def _after_joins(fn):
+    # Joins waiting to be applied happened before anything else
+    def wrap(self, *args, **kwargs):
+        self._apply_joins()
+        return fn(self, *args, **kwargs)
+    return _batched(wrap)
+
+
 class ChatController(QObject):
+    """
+    Applies events from the chat connection to the chat model.
+
+    The connection hands over events in batches. Changes a batch makes to
+    chatters go into one transaction of the model update scheduler, so views
+    hear of them at most once per frame, and the chatters that joined a
+    channel are added to it in bulk. Channels are added and removed right
+    away, since views of a channel have to exist before its lines come in.
+    """
     join_requested = pyqtSignal(object)
 
     def __init__(self, connection, model, user_relations, chat_config,
-                 line_metadata_builder):
+                 line_metadata_builder, model_updates):
         QObject.__init__(self)
         self._connection = connection
         self._model = model
@@ -19,8 +49,13 @@ class ChatController(QObject):
         self._chat_config = chat_config
         self._chat_config.updated.connect(self._at_config_updated)
         self._line_metadata_builder = line_metadata_builder
+        self._model_updates = model_updates
+        self._transaction = None
+        self._pending_joins = {}
 
         c = connection
+        c.batch_started.connect(self._at_batch_started)
+        c.batch_finished.connect(self._at_batch_finished)
         c.new_line.connect(self._at_new_line)
         c.new_channel_chatters.connect(self._at_new_channel_chatters)
         c.channel_chatter_left.connect(self._at_channel_chatter_left)
@@ -36,9 +71,9 @@ class ChatController(QObject):
 
     @classmethod
     def build(cls, connection, model, user_relations, chat_config,
-              line_metadata_builder, **kwargs):
+              line_metadata_builder, model_updates, **kwargs):
         return cls(connection, model, user_relations, chat_config,
-                   line_metadata_builder)
+                   line_metadata_builder, model_updates)
 
     @property
     def _channels(self):
@@ -52,8 +87,22 @@ class ChatController(QObject):
     def _ccs(self):
         return self._model.channelchatters
 
+    def _at_batch_started(self):
+        self._transaction = self._model_updates.transaction()
+
+    def _at_batch_finished(self):
+        self._apply_joins()
+        transaction, self._transaction = self._transaction, None
+        transaction.finalize()
+
+    def _emit_pending_updates(self):
+        self._transaction.finalize()
+        self._model_updates.flush()
+
     def _check_add_new_channel(self, cid):
         if cid not in self._channels:
+            # Views have to hear of earlier changes before the new channel's
+            self._emit_pending_updates()
             channel = Channel(cid, Lines(), "")
             self._channels[cid] = channel
             if cid.type == ChannelType.PRIVATE:
@@ -66,7 +115,7 @@ class ChatController(QObject):
         me = None if my_name is None else self._chatters.get(my_name, None)
         if me is not None:
             cc = ChannelChatter(channel, me, "")
-            self._ccs[(channel.id_key, me.id_key)] = cc
+            self._ccs.set_item(cc.id_key, cc, self._transaction)
 
     def _join_chatter_to_his_privchannel(self, name):
         channel = self._channels.get(ChannelID.private_cid(name), None)
@@ -77,34 +126,43 @@ class ChatController(QObject):
             return
         key = (channel.id_key, chatter.id_key)
         if key not in self._ccs:
-            self._ccs[key] = ChannelChatter(channel, chatter, "")
+            cc = ChannelChatter(channel, chatter, "")
+            self._ccs.set_item(key, cc, self._transaction)
 
     def _check_add_new_chatter(self, cinfo):
         if cinfo.name not in self._chatters:
             chatter = Chatter(cinfo.name, cinfo.hostname)
-            self._chatters[chatter.name] = chatter
+            self._chatters.set_item(chatter.name, chatter, self._transaction)
             self._join_chatter_to_his_privchannel(chatter.name)
         return self._chatters[cinfo.name]
 
     def _add_or_update_cc(self, cid, cinfo):
+        self._add_or_update_ccs(cid, [cinfo])
+
+    def _add_or_update_ccs(self, cid, cinfos):
         channel = self._check_add_new_channel(cid)
-        chatter = self._check_add_new_chatter(cinfo)
-        key = (channel.id_key, chatter.id_key)
-        if key not in self._ccs:
-            cc = ChannelChatter(channel, chatter, cinfo.elevation)
-            self._ccs[key] = cc
-        else:
-            self._ccs[key].update(elevation=cinfo.elevation)
+        new_ccs = {}
+        for cinfo in cinfos:
+            chatter = self._check_add_new_chatter(cinfo)
+            key = (channel.id_key, chatter.id_key)
+            if key in self._ccs:
+                self._ccs[key].update(elevation=cinfo.elevation,
+                                      _transaction=self._transaction)
+            else:
+                new_ccs[key] = ChannelChatter(channel, chatter,
+                                              cinfo.elevation)
+        self._ccs.set_items(new_ccs.values(), self._transaction)
 
     def _remove_cc(self, cid, cinfo):
         key = (cid, cinfo.name)
-        self._ccs.pop(key, None)
+        self._ccs.del_item(key, self._transaction)
 
     def _add_line(self, channel, line):
         data = self._line_metadata_builder.get_meta(channel, line)
         channel.lines.add_line(data)
         self._trim_channel_lines(channel)
 
+    @_after_joins
     def _at_new_line(self, cid, cinfo, line):
         if cid.type == ChannelType.PUBLIC and cid not in self._channels:
             return
@@ -123,25 +181,38 @@ class ChatController(QObject):
 
         self._add_line(self._channels[cid], line)
 
+    # Joins are collected per channel and applied once something else
+    # happens or the batch ends.
+    @_batched
     def _at_new_channel_chatters(self, cid, chatters):
-        for c in chatters:
-            self._add_or_update_cc(cid, c)
+        joins = self._pending_joins.setdefault(cid, [])
+        joins += ((c, False) for c in chatters)
 
+    @_batched
     def _at_channel_chatter_joined(self, cid, chatter):
-        self._at_new_channel_chatters(cid, [chatter])
-        self._announce_join(cid, chatter)
+        self._pending_joins.setdefault(cid, []).append((chatter, True))
+
+    def _apply_joins(self):
+        pending, self._pending_joins = self._pending_joins, {}
+        for cid, joins in pending.items():
+            self._add_or_update_ccs(cid, [cinfo for cinfo, _ in joins])
+            for cinfo, announce in joins:
+                if announce:
+                    self._announce_join(cid, cinfo)
 
+    @_after_joins
     def _at_channel_chatter_left(self, cid, chatter):
         self._announce_part(cid, chatter)
         self._remove_cc(cid, chatter)
 
+    @_after_joins
     def _at_chatter_quit(self, chatter, msg):
         chatter_obj = self._chatters.get(chatter.name, None)
         if chatter_obj is None:
             return
         for cc in chatter_obj.channels.values():
             self._announce_quit(cc.channel.id_key, chatter, msg)
-        self._chatters.pop(chatter.name, None)
+        self._chatters.del_item(chatter.name, self._transaction)
 
     def _joinpart(fn):
         def wrap(self, cid, chatter, *args, **kwargs):
@@ -183,14 +254,17 @@ class ChatController(QObject):
             message = "{}: {}".format(prefix, message)
         self._announce_chatter(channel, chatter, message)
 
+    @_after_joins
     def _at_quit_channel(self, cid):
         self._delete_channel_ignoring_connection(cid)
 
+    @_after_joins
     def _at_chatter_renamed(self, old, new):
         if old not in self._chatters:
             return
-        self._chatters[old].update(name=new)
+        self._chatters[old].update(name=new, _transaction=self._transaction)
 
+    @_after_joins
     def _at_new_chatter_elevation(self, cid, chatter, added, removed):
         key = (cid, chatter.name)
         if key not in self._ccs:
@@ -198,16 +272,19 @@ class ChatController(QObject):
         cc = self._ccs[key]
         old = cc.elevation
         new = ''.join(c for c in old + added if c not in removed)
-        cc.update(elevation=new)
+        cc.update(elevation=new, _transaction=self._transaction)
 
+    @_after_joins
     def _at_new_channel_topic(self, cid, topic):
         channel = self._channels.get(cid)
         if channel is None:
             return
-        channel.update(topic=topic)
+        channel.update(topic=topic, _transaction=self._transaction)
 
+    @_after_joins
     def _at_connected(self):
         privchannels = self._save_privchannels()
+        self._emit_pending_updates()
         self._channels.clear()
         self._chatters.clear()
         self._ccs.clear()
@@ -229,16 +306,18 @@ class ChatController(QObject):
 
     def _at_config_updated(self, option):
         if option == "max_chat_lines":
-            for channel in self._channels.values:
+            for channel in self._channels.values():
                 self._trim_channel_lines(channel)
 
     def _trim_channel_lines(self, channel):
+        # Lines are trimmed in batches of at least trim_count, so that
+        # channels at the limit aren't trimmed after every line
         max_ = self._chat_config.max_chat_lines
         trim_count = self._chat_config.chat_line_trim_count
-        if len(channel.lines) <= max_:
+        excess = len(channel.lines) - max_
+        if excess <= 0:
             return
-        trim_amount = min(len(channel.lines), trim_count)
-        channel.lines.remove_lines(trim_amount)
+        channel.lines.remove_lines(max(excess, trim_count))
 
     # User actions start here.
     def send_message(self, cid, message):
@@ -264,6 +343,7 @@ class ChatController(QObject):
         else:
             pass    # TODO - raise 'Sending failed' error back to the view?
 
+    @_after_joins
     def join_channel(self, cid):
         # Don't join a private channel with ourselves
         if (cid.type == ChannelType.PRIVATE and
@@ -285,6 +365,7 @@ class ChatController(QObject):
     def _user_chat_line(self, msg, type_=ChatLineType.MESSAGE):
         return ChatLine(self._connection.nickname, msg, type_)
 
+    @_after_joins
     def leave_channel(self, cid, reason):
         if cid.type == ChannelType.PRIVATE:
             self._delete_channel_ignoring_connection(cid)
@@ -294,6 +375,7 @@ class ChatController(QObject):
                 self._delete_channel_ignoring_connection(cid)
 
     def _delete_channel_ignoring_connection(self, cid):
+        self._emit_pending_updates()
         self._channels.pop(cid, None)
 
     def _should_ignore_chatter(self, cid, name):
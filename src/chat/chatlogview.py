@@ -0,0 +1,332 @@
+import math
+import re
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QPointF, QRectF, \
+    QSize, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QAbstractTextDocumentLayout, QFontMetrics, QPalette, \
+    QTextDocument
+from PyQt5.QtWidgets import QAbstractItemView, QApplication, QListView, \
+    QStyle, QStyledItemDelegate
+
+
+class ChatLogLine:
+    """
+    A formatted chat line. Remembers its height for the width it was last
+    laid out at.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.width = None
+        self.height = 0
+
+
+class ChatLogModel(QAbstractListModel):
+    """
+    Formatted lines of a channel, one row per line in the channel's Lines.
+    Rows hand out ChatLogLines as DisplayRole data.
+
+    Appended lines are collected for up to INSERT_DELAY milliseconds and
+    inserted with one rowsInserted, so that the view lays out lines arriving
+    in a burst in one pass instead of once per line.
+    """
+    INSERT_DELAY = 30
+
+    def __init__(self):
+        QAbstractListModel.__init__(self)
+        self._lines = []
+        self._pending = []
+        self._insert_timer = QTimer(self)
+        self._insert_timer.setSingleShot(True)
+        self._insert_timer.setInterval(self.INSERT_DELAY)
+        self._insert_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._lines)
+
+    def data(self, index, role):
+        if not index.isValid() or index.row() >= len(self._lines):
+            return None
+        if role != Qt.DisplayRole:
+            return None
+        return self._lines[index.row()]
+
+    def lines(self):
+        return self._lines
+
+    def append_line(self, text):
+        self._pending.append(ChatLogLine(text))
+        if not self._insert_timer.isActive():
+            self._insert_timer.start()
+
+    def flush(self):
+        self._insert_timer.stop()
+        if not self._pending:
+            return
+        first = len(self._lines)
+        self.beginInsertRows(QModelIndex(), first,
+                             first + len(self._pending) - 1)
+        self._lines += self._pending
+        self._pending = []
+        self.endInsertRows()
+
+    def remove_lines(self, number):
+        self.flush()
+        number = min(number, len(self._lines))
+        if number <= 0:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, number - 1)
+        del self._lines[:number]
+        self.endRemoveRows()
+
+    def clear(self):
+        self._insert_timer.stop()
+        self._pending = []
+        self.beginResetModel()
+        self._lines = []
+        self.endResetModel()
+
+
+class _ChatLineDocument(QTextDocument):
+    def __init__(self, images):
+        QTextDocument.__init__(self)
+        self._images = images
+
+    def loadResource(self, type_, url):
+        if type_ == QTextDocument.ImageResource:
+            image = self._images.get(url.toString())
+            if image is not None:
+                return image
+        return QTextDocument.loadResource(self, type_, url)
+
+
+_TAGS = re.compile(r"<[^>]*>")
+
+
+class ChatLineDelegate(QStyledItemDelegate):
+    """
+    Draws formatted chat lines as rich text.
+
+    Laying out rich text is what's expensive, so lines are only laid out
+    when they're drawn, once per view width, and their height remembered.
+    Until then the view gets an estimated height, corrected with
+    sizeHintChanged once the line is drawn. Laid out documents are kept
+    only for the most recently drawn lines, which are the visible ones.
+    """
+    MAX_DOCUMENTS = 128
+
+    def __init__(self, font):
+        QStyledItemDelegate.__init__(self)
+        self._css = ""
+        self._images = {}
+        self._width = 0
+        self._documents = OrderedDict()
+        self.set_font(font)
+
+    @property
+    def width(self):
+        return self._width
+
+    def set_width(self, width):
+        if width != self._width:
+            self._width = width
+            self._documents.clear()
+
+    def set_css(self, css):
+        self._css = css
+        self._documents.clear()
+
+    def set_font(self, font):
+        self._font = font
+        metrics = QFontMetrics(font)
+        self._line_spacing = metrics.lineSpacing()
+        self._char_width = metrics.averageCharWidth()
+        self._documents.clear()
+
+    def add_image(self, url, image):
+        """
+        Returns whether the image is new. Documents of lines using it are
+        dropped.
+        """
+        if url in self._images:
+            return False
+        self._images[url] = image
+        for line in list(self._documents):
+            if url in line.text:
+                del self._documents[line]
+        return True
+
+    def document(self, line):
+        doc = self._documents.get(line)
+        if doc is not None:
+            self._documents.move_to_end(line)
+            return doc
+        doc = _ChatLineDocument(self._images)
+        doc.setDocumentMargin(0)
+        doc.setDefaultFont(self._font)
+        doc.setDefaultStyleSheet(self._css)
+        doc.setHtml(line.text)
+        doc.setTextWidth(self._width)
+        line.width = self._width
+        line.height = int(doc.size().height() + 0.5)
+        self._documents[line] = doc
+        if len(self._documents) > self.MAX_DOCUMENTS:
+            self._documents.popitem(last=False)
+        return doc
+
+    def sizeHint(self, option, index):
+        line = index.data()
+        if line.width != self._width:
+            return QSize(self._width, self._estimate_height(line))
+        return QSize(self._width, line.height)
+
+    def _estimate_height(self, line):
+        if line.width:
+            # Laid out at another width, the text just wraps differently
+            height = line.height * line.width / max(self._width, 1)
+        else:
+            text = _TAGS.sub("", line.text)
+            rows = math.ceil(len(text) * self._char_width
+                             / max(self._width, 1))
+            height = rows * self._line_spacing
+        rows = max(1, round(height / self._line_spacing))
+        return rows * self._line_spacing
+
+    def paint(self, painter, option, index):
+        line = index.data()
+        estimated = line.width != self._width
+        doc = self.document(line)
+        if estimated and line.height != option.rect.height():
+            self.sizeHintChanged.emit(index)
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        painter.translate(option.rect.topLeft())
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette = QPalette(option.palette)
+        context.clip = QRectF(0, 0, option.rect.width(), option.rect.height())
+        painter.setClipRect(context.clip)
+        doc.documentLayout().draw(painter, context)
+        painter.restore()
+
+    def anchor_at(self, line, pos):
+        return self.document(line).documentLayout().anchorAt(QPointF(pos))
+
+
+class ChatLogView(QListView):
+    """
+    Chat log showing a channel's formatted lines. Only lines scrolled into
+    view are drawn, and lines are laid out once, not every time the log
+    changes like a QTextDocument holding the whole log would.
+
+    Links in lines are reported with url_clicked, like QTextBrowser's
+    anchorClicked. Selection works on whole lines, and copy() copies the
+    text of selected lines.
+
+    While the view is being resized, lines are laid out again for a new
+    width only once resizing stops for RESIZE_DELAY milliseconds.
+    """
+    url_clicked = pyqtSignal(QUrl)
+
+    RESIZE_DELAY = 100
+
+    def __init__(self, *args, **kwargs):
+        QListView.__init__(self, *args, **kwargs)
+        self._log = ChatLogModel()
+        self._delegate = ChatLineDelegate(self.font())
+        self.setModel(self._log)
+        self.setItemDelegate(self._delegate)
+        self.setResizeMode(QListView.Adjust)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setMouseTracking(True)
+        self._delegate.set_width(self.viewport().width())
+
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(self.RESIZE_DELAY)
+        self._resize_timer.timeout.connect(self._update_width)
+
+    def append_line(self, text):
+        self._log.append_line(text)
+
+    def remove_lines(self, number):
+        self._log.remove_lines(number)
+
+    def clear_lines(self):
+        self._log.clear()
+
+    def set_css(self, css):
+        self._delegate.set_css(css)
+        self._relayout(self._log.lines())
+
+    def add_image(self, url, image):
+        if self._delegate.add_image(url, image):
+            self._relayout(line for line in self._log.lines()
+                           if url in line.text)
+
+    def _relayout(self, lines=()):
+        for line in lines:
+            line.width = None
+        self.scheduleDelayedItemsLayout()
+        self.viewport().update()
+
+    def changeEvent(self, event):
+        QListView.changeEvent(self, event)
+        if event.type() == event.FontChange:
+            self._delegate.set_font(self.font())
+            self._relayout(self._log.lines())
+
+    def resizeEvent(self, event):
+        QListView.resizeEvent(self, event)
+        if self.viewport().width() == self._delegate.width:
+            return
+        # Take the first width at once, then wait for resizing to stop
+        if not self._resize_timer.isActive():
+            self._update_width()
+        self._resize_timer.start()
+
+    def _update_width(self):
+        width = self.viewport().width()
+        if width != self._delegate.width:
+            # Lines get taller or shorter, not only wider
+            self._delegate.set_width(width)
+            self._relayout()
+
+    def _anchor_at(self, pos):
+        index = self.indexAt(pos)
+        if not index.isValid():
+            return ""
+        rect = self.visualRect(index)
+        return self._delegate.anchor_at(index.data(), pos - rect.topLeft())
+
+    def mouseMoveEvent(self, event):
+        if self._anchor_at(event.pos()):
+            self.viewport().setCursor(Qt.PointingHandCursor)
+        else:
+            self.viewport().unsetCursor()
+        QListView.mouseMoveEvent(self, event)
+
+    def mouseReleaseEvent(self, event):
+        QListView.mouseReleaseEvent(self, event)
+        if event.button() != Qt.LeftButton:
+            return
+        anchor = self._anchor_at(event.pos())
+        if anchor:
+            self.url_clicked.emit(QUrl(anchor))
+
+    def copy(self):
+        rows = sorted(index.row()
+                      for index in self.selectionModel().selectedRows())
+        if not rows:
+            return
+        lines = []
+        for row in rows:
+            doc = self._delegate.document(self._log.index(row).data())
+            # Drop placeholders of images
+            parts = doc.toPlainText().replace("\ufffc", "").split("\n")
+            lines.append(" ".join(part for part in parts if part))
+        QApplication.clipboard().setText("\n".join(lines))
@@ -1,5 +1,5 @@
 from enum import Enum, IntEnum
-from PyQt5.QtCore import QObject, QRectF, QSortFilterProxyModel, Qt, \
+from PyQt5.QtCore import QObject, QRectF, Qt, \
     pyqtSignal
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtGui import QIcon, QColor
@@ -9,6 +9,7 @@ from fa import maps
 from model.game import GameState
 import util
 from util.qt_list_model import QtListModel
+from util.sort_key_model import SortKeyFilterModel
 
 
 class ChatterModel(QtListModel):
@@ -17,22 +18,23 @@ class ChatterModel(QtListModel):
         self._channel = channel
 
         if self._channel is not None:
-            self._channel.added_chatter.connect(self.add_chatter)
-            self._channel.removed_chatter.connect(self.remove_chatter)
+            self._channel.added_chatters.connect(self.add_chatters)
+            self._channel.removed_chatters.connect(self.remove_chatters)
 
-        for chatter in self._channel.chatters:
-            self.add_chatter(chatter)
+        self.add_chatters(self._channel.chatters.values())
 
     @classmethod
     def build(cls, channel, **kwargs):
         builder = ChatterModelItem.builder(**kwargs)
         return cls(channel, builder)
 
-    def add_chatter(self, chatter):
-        self._add_item(chatter, chatter.id_key)
+    def add_chatters(self, chatters):
+        self._add_items((chatter, chatter.id_key) for chatter in chatters)
 
-    def remove_chatter(self, chatter):
-        self._remove_item(chatter.id_key)
+    def remove_chatters(self, chatters):
+        # Signals come in later than model changes, so the channel might
+        # have been shown with some of these chatters already gone
+        self._remove_items([chatter.id_key for chatter in chatters])
 
     def clear_chatters(self):
         self._clear_items()
@@ -53,13 +55,16 @@ class ChatterRank(IntEnum):
     FOE = 5
 
 
-class ChatterSortFilterModel(QSortFilterProxyModel):
+class ChatterSortFilterModel(SortKeyFilterModel):
     def __init__(self, model, me, user_relations, chat_config):
-        QSortFilterProxyModel.__init__(self)
+        SortKeyFilterModel.__init__(self)
         self._me = me
         self._user_relations = user_relations
         self._chat_config = chat_config
         self._chat_config.updated.connect(self._check_sort_changed)
+        # Sort keys depend on who we are
+        self._me.playerChanged.connect(self._at_me_changed)
+        self._me.clan_changed.connect(self._at_me_changed)
         self.setSourceModel(model)
         self.sort(0)
 
@@ -67,32 +72,11 @@ class ChatterSortFilterModel(QSortFilterProxyModel):
     def build(cls, model, me, user_relations, chat_config, **kwargs):
         return cls(model, me, user_relations, chat_config)
 
-    def lessThan(self, leftIndex, rightIndex):
-        source = self.sourceModel()
-        left = source.data(leftIndex, Qt.DisplayRole)
-        right = source.data(rightIndex, Qt.DisplayRole)
-
-        comp_list = [self._lt_me, self._lt_rank, self._lt_alphabetical]
-        for lt in comp_list:
-            if lt(left, right):
-                return True
-            elif lt(right, left):
-                return False
-        return False
-
-    def _lt_me(self, left, right):
-        if self._me.login is None:
-            return False
-        return (left.chatter.name == self._me.login and
-                right.chatter.name != self._me.login)
-
-    def _lt_rank(self, left, right):
-        left_rank = self._get_user_rank(left)
-        right_rank = self._get_user_rank(right)
-        return left_rank < right_rank
-
-    def _lt_alphabetical(self, left, right):
-        return left.chatter.name.lower() < right.chatter.name.lower()
+    def sort_key(self, item):
+        # Me first, then by rank, then alphabetically
+        name = item.chatter.name
+        is_me = self._me.login is not None and name == self._me.login
+        return (0 if is_me else 1, self._get_user_rank(item), name.lower())
 
     def _get_user_rank(self, item):
         pid = item.player.id if item.player is not None else None
@@ -125,6 +109,9 @@ class ChatterSortFilterModel(QSortFilterProxyModel):
         if option == "friendsontop":
             self.invalidate()
 
+    def _at_me_changed(self, *args):
+        self.invalidate()
+
     def invalidate_items(self):
         self.sourceModel().invalidate_items()
 
@@ -1,5 +1,6 @@
 from PyQt5.QtCore import QObject, QSocketNotifier, QTimer, pyqtSignal
 import logging
+import select
 import sys
 import re
 
@@ -68,12 +69,23 @@ class IrcSignals(QObject):
     new_channel_topic = pyqtSignal(object, str)
     connected = pyqtSignal()
     disconnected = pyqtSignal()
+    # Signals above are emitted between these two
+    batch_started = pyqtSignal()
+    batch_finished = pyqtSignal()
 
     def __init__(self):
         QObject.__init__(self)
 
 
 class IrcConnection(IrcSignals, SimpleIRCClient):
+    """
+    Whatever the server sent is processed in one go, as one batch of events.
+    During a netsplit or when joining a big channel, that lets listeners
+    handle hundreds of joins and quits together.
+    """
+    # Reads of up to 16 KB per wakeup, so that a flood can't freeze the UI
+    MAX_READS = 16
+
     def __init__(self, host, port, ssl):
         IrcSignals.__init__(self)
         SimpleIRCClient.__init__(self)
@@ -126,6 +138,23 @@ class IrcConnection(IrcSignals, SimpleIRCClient):
             logger.error("IRC Exception", exc_info=sys.exc_info())
             return False
 
+    def once(self):
+        self.batch_started.emit()
+        try:
+            for _ in range(self.MAX_READS):
+                self.ircobj.process_once()
+                if not self._has_data():
+                    break
+        finally:
+            self.batch_finished.emit()
+
+    def _has_data(self):
+        sock = self.connection._get_socket()
+        if sock is None:
+            return False
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable)
+
     def is_connected(self):
         return self.connection.is_connected()
 
@@ -250,7 +279,7 @@ class IrcConnection(IrcSignals, SimpleIRCClient):
         oldnick = user2name(e.source())
         newnick = e.target()
 
-        self.chatter_renamed(oldnick, newnick)
+        self.chatter_renamed.emit(oldnick, newnick)
         self._log_event(e)
 
     def on_mode(self, c, e):
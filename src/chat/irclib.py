@@ -158,6 +158,8 @@ class IRC:
         self.fn_to_add_timeout = fn_to_add_timeout
         self.connections = []
         self.handlers = {}
+        # Handlers to call for each event type, made when first needed
+        self._event_handlers = {}
         self.delayed_commands = []  # list of tuples in the format (time, function, arguments)
 
         self.add_global_handler("ping", _ping_ponger, -42)
@@ -256,6 +258,7 @@ class IRC:
         if event not in self.handlers:
             self.handlers[event] = []
         bisect.insort(self.handlers[event], (priority, handler))
+        self._event_handlers = {}
 
     def remove_global_handler(self, event, handler):
         """Removes a global handler function.
@@ -273,6 +276,7 @@ class IRC:
         for h in self.handlers[event]:
             if handler == h[1]:
                 self.handlers[event].remove(h)
+        self._event_handlers = {}
         return 1
 
     def execute_at(self, at, function, arguments=()):
@@ -319,9 +323,14 @@ class IRC:
 
     def _handle_event(self, connection, event):
         """[Internal]"""
-        h = self.handlers
-        for handler in h.get("all_events", []) + h.get(event.eventtype(), []):
-            if handler[1](connection, event) == "NO MORE":
+        eventtype = event.eventtype()
+        handlers = self._event_handlers.get(eventtype)
+        if handlers is None:
+            h = self.handlers
+            handlers = h.get("all_events", []) + h.get(eventtype, [])
+            self._event_handlers[eventtype] = handlers
+        for priority, handler in handlers:
+            if handler(connection, event) == "NO MORE":
                 return
 
     def _remove_connection(self, connection):
@@ -330,7 +339,35 @@ class IRC:
         if self.fn_to_remove_socket:
             self.fn_to_remove_socket(connection._get_socket())
 
-_rfc_1459_command_regexp = re.compile("^(:(?P<prefix>[^ ]+) +)?(?P<command>[^ ]+)( *(?P<argument> .+))?")
+
+def _parse_message(line):
+    """[Internal] Split a message into its prefix, command and arguments.
+
+    Returns a (prefix, command, arguments) tuple, or None if there's no
+    command.  The prefix is None if there is none.  The command is
+    lowercased, and the last argument is the trailing one, if any.
+    """
+    prefix = None
+    if line.startswith(":"):
+        prefix, _, rest = line.partition(" ")
+        rest = rest.lstrip(" ")
+        if rest and len(prefix) > 1:
+            prefix = prefix[1:]
+            line = rest
+        else:
+            prefix = None
+
+    command, _, params = line.partition(" ")
+    if not command:
+        return None
+    params = params.lstrip(" ")
+    if params.startswith(":"):
+        return prefix, command.lower(), [params[1:]]
+    middle, sep, trailing = params.partition(" :")
+    arguments = middle.split()
+    if sep:
+        arguments.append(trailing)
+    return prefix, command.lower(), arguments
 
 
 class Connection:
@@ -413,7 +450,7 @@ class ServerConnection(Connection):
         if self.connected:
             self.disconnect("Changing servers")
 
-        self.previous_buffer = b""
+        self.previous_buffer = bytearray()
         self.handlers = {}
         self.real_server_name = ""
         self.real_nickname = nickname
@@ -497,116 +534,116 @@ class ServerConnection(Connection):
                 new_data = self.socket.recv(2**14)
         except socket.timeout:
             # Nothing was interesting
-            pass
+            return
         except socket.error as x:
             # The server hung up.
             self.disconnect("Connection reset by peer")
             return
 
-        lines = _linesep_regexp.split(self.previous_buffer + new_data)
+        # Only complete lines are decoded, in one go. The unfinished last
+        # line stays in the buffer.
+        buf = self.previous_buffer
+        buf += new_data
+        end = buf.rfind(b"\n")
+        if end < 0:
+            return
+        with memoryview(buf) as view:
+            text = str(view[:end], "utf-8", "replace")
+        del buf[:end + 1]
 
-        # Save the last, unfinished line.
-        self.previous_buffer = lines.pop()
+        # Raw message events are made only if someone listens to them
+        raw = bool(self.irclibobj.handlers.get("all_raw_messages")
+                   or self.handlers.get("all_raw_messages"))
 
-        for line in lines:
+        for line in text.split("\n"):
+            if line.endswith("\r"):
+                line = line[:-1]
+            if not line:
+                continue
             if DEBUG:
                 print("FROM SERVER:", line)
 
-            if not line:
+            if raw:
+                self._handle_event(Event("all_raw_messages",
+                                         self.get_server_name(),
+                                         None,
+                                         [line]))
+
+            message = _parse_message(line)
+            if message is None:
                 continue
+            prefix, command, arguments = message
+            self._process_message(prefix, command, arguments)
 
-            try:
-                line = line.decode("utf-8", "replace")   # utf-8 support hacked in by thygrrr (may break in some scenarios - see chardet python package)
-            except:            
-                print("irclib: non-utf-8 line, unexpected encoding error " + line)
-                line = "** encoding error - replaced by irclib.py **"
-                
-            prefix = None
-            command = None
-            arguments = None
-            self._handle_event(Event("all_raw_messages",
-                                     self.get_server_name(),
-                                     None,
-                                     [line]))
-
-            m = _rfc_1459_command_regexp.match(line)
-            if m.group("prefix"):
-                prefix = m.group("prefix")
-                if not self.real_server_name:
-                    self.real_server_name = prefix
-
-            if m.group("command"):
-                command = m.group("command").lower()
-
-            if m.group("argument"):
-                a = m.group("argument").split(" :", 1)
-                arguments = a[0].split()
-                if len(a) == 2:
-                    arguments.append(a[1])
-
-            # Translate numerics into more readable strings.
-            if command in numeric_events:
-                command = numeric_events[command]
-
-            if command == "nick":
-                if nm_to_n(prefix) == self.real_nickname:
-                    self.real_nickname = arguments[0]
-            elif command == "welcome":
-                # Record the nickname in case the client changed nick
-                # in a nicknameinuse callback.
-                self.real_nickname = arguments[0]
+    def _process_message(self, prefix, command, arguments):
+        """[Internal]"""
+        if prefix is not None and not self.real_server_name:
+            self.real_server_name = prefix
 
-            if command in ["privmsg", "notice"]:
-                target, message = arguments[0], arguments[1]
-                messages = _ctcp_dequote(message)
+        # Translate numerics into more readable strings.
+        command = numeric_events.get(command, command)
 
-                if command == "privmsg":
-                    if is_channel(target):
-                        command = "pubmsg"
-                else:
-                    if is_channel(target):
-                        command = "pubnotice"
-                    else:
-                        command = "privnotice"
-
-                for m in messages:
-                    if type(m) is tuple:
-                        if command in ["privmsg", "pubmsg"]:
-                            command = "ctcp"
-                        else:
-                            command = "ctcpreply"
-
-                        m = list(m)
-                        if DEBUG:
-                            print("command: %s, source: %s, target: %s, arguments: %s" % (
-                                command, prefix, target, m))
-                        self._handle_event(Event(command, prefix, target, m))
-                        if command == "ctcp" and m[0] == "ACTION":
-                            self._handle_event(Event("action", prefix, target, m[1:]))
-                    else:
-                        if DEBUG:
-                            print("command: %s, source: %s, target: %s, arguments: %s" % (
-                                command, prefix, target, [m]))
-                        self._handle_event(Event(command, prefix, target, [m]))
+        if command == "nick":
+            if prefix and arguments and nm_to_n(prefix) == self.real_nickname:
+                self.real_nickname = arguments[0]
+        elif command == "welcome" and arguments:
+            # Record the nickname in case the client changed nick
+            # in a nicknameinuse callback.
+            self.real_nickname = arguments[0]
+
+        # Malformed messages without a target or text are passed on like
+        # any other command
+        if command in ("privmsg", "notice") and len(arguments) >= 2:
+            target, message = arguments[0], arguments[1]
+            messages = _ctcp_dequote(message)
+
+            if command == "privmsg":
+                if is_channel(target):
+                    command = "pubmsg"
             else:
-                target = None
+                if is_channel(target):
+                    command = "pubnotice"
+                else:
+                    command = "privnotice"
 
-                if command == "quit":
-                    arguments = [arguments[0]]
-                elif command == "ping":
-                    target = arguments[0]
+            for m in messages:
+                if type(m) is tuple:
+                    if command in ["privmsg", "pubmsg"]:
+                        command = "ctcp"
+                    else:
+                        command = "ctcpreply"
+
+                    m = list(m)
+                    if DEBUG:
+                        print("command: %s, source: %s, target: %s, arguments: %s" % (
+                            command, prefix, target, m))
+                    self._handle_event(Event(command, prefix, target, m))
+                    if command == "ctcp" and m[0] == "ACTION":
+                        self._handle_event(Event("action", prefix, target, m[1:]))
                 else:
-                    target = arguments[0]
-                    arguments = arguments[1:]
+                    if DEBUG:
+                        print("command: %s, source: %s, target: %s, arguments: %s" % (
+                            command, prefix, target, [m]))
+                    self._handle_event(Event(command, prefix, target, [m]))
+        else:
+            target = None
+
+            if command == "quit":
+                arguments = arguments[:1]
+            elif command == "ping":
+                target = arguments[0] if arguments else None
+            else:
+                target = arguments[0] if arguments else None
+                arguments = arguments[1:]
 
-                if command == "mode":
-                    if not is_channel(target):
-                        command = "umode"
+            if command == "mode":
+                if not is_channel(target):
+                    command = "umode"
 
-                if DEBUG:
-                    print("command: %s, source: %s, target: %s, arguments: %s" % (
-                        command, prefix, target, arguments))
-                self._handle_event(Event(command, prefix, target, arguments))
+            if DEBUG:
+                print("command: %s, source: %s, target: %s, arguments: %s" % (
+                    command, prefix, target, arguments))
+            self._handle_event(Event(command, prefix, target, arguments))
 
     def _handle_event(self, event):
         """[Internal]"""
@@ -1053,18 +1090,23 @@ class SimpleIRCClient:
         self.ircobj = IRC()
         self.connection = self.ircobj.server()
         self.dcc_connections = []
+        # Handler methods by event type, looked up when first needed
+        self._event_methods = {}
         self.ircobj.add_global_handler("all_events", self._dispatcher, -10)
         self.ircobj.add_global_handler("dcc_disconnect", self._dcc_disconnect, -10)
 
     def _dispatcher(self, c, e):
         """[Internal]"""
-        m = "on_" + e.eventtype()
-        if hasattr(self, m):
-            getattr(self, m)(c, e)
-        else:
-            if m != "on_all_raw_messages":
-                if hasattr(self, "on_default"):
-                    self.on_default(c, e)
+        eventtype = e.eventtype()
+        method = self._event_methods.get(eventtype)
+        if method is None:
+            method = getattr(self, "on_" + eventtype, None)
+            if method is None and eventtype != "all_raw_messages":
+                method = getattr(self, "on_default", None)
+            if method is None:
+                method = _ignore_event
+            self._event_methods[eventtype] = method
+        method(c, e)
 
     def _dcc_disconnect(self, c, e):
         self.dcc_connections.remove(c)
@@ -1139,6 +1181,10 @@ class SimpleIRCClient:
         self.ircobj.process_once(timeout=0.01)
 
 
+def _ignore_event(c, e):
+    pass
+
+
 class Event:
     """Class representing an IRC event."""
     def __init__(self, eventtype, source, target, arguments=None):
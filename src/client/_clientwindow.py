@@ -48,6 +48,7 @@ from model.chat.chatline import ChatLineMetadataBuilder
 from model.gameset import Gameset, PlayerGameIndex
 from model.player import Player
 from model.playerset import Playerset
+from model.transaction import TransactionScheduler
 from modvault.utils import MODFOLDER
 from power import PowerTools
 from secondaryServer import SecondaryServer
@@ -152,7 +153,11 @@ class ClientWindow(FormClass, BaseClass):
 
         fa.instance.gameset = self.gameset  # FIXME (needed fa/game_process L81 for self.game = self.gameset[uid])
 
-        self.lobby_info = LobbyInfo(self.lobby_dispatch, self.gameset, self.players)
+        # Signals from server updates of players and games are coalesced
+        # and emitted at most once per frame
+        self.model_updates = TransactionScheduler()
+        self.lobby_info = LobbyInfo(self.lobby_dispatch, self.gameset,
+                                    self.players, self.model_updates)
 
         # Handy reference to the User object representing the logged-in user.
         self.me = User(self.players)
@@ -177,14 +182,19 @@ class ClientWindow(FormClass, BaseClass):
                 relation_model, relation_controller, relation_trackers)
         self.me.relations = self.user_relations
 
-        self.map_downloader = PreviewDownloader(util.MAP_PREVIEW_DIR, MAP_PREVIEW_ROOT)
+        self.map_downloader = PreviewDownloader(util.MAP_PREVIEW_DIR, MAP_PREVIEW_ROOT,
+                                                fa.maps.preview_cache)
+        self.map_downloader.preview_downloaded.connect(fa.maps.preview_cache.add)
+        fa.maps.preview_cache.warm()
         self.mod_downloader = PreviewDownloader(util.MOD_PREVIEW_DIR, None)
         self.avatar_downloader = AvatarDownloader()
 
         # Qt model for displaying active games.
-        self.game_model = GameModel(self.me, self.map_downloader, self.gameset)
+        self.game_model = GameModel(self.me, self.map_downloader, self.gameset,
+                                    self.players)
 
         self.gameset.added.connect(self.fill_in_session_info)
+        self.gameset.batch_added.connect(self._at_games_added)
 
         self.lobby_info.serverSession.connect(self.handle_session)
         self.lobby_info.serverUpdate.connect(self.handle_update)
@@ -353,6 +363,7 @@ class ClientWindow(FormClass, BaseClass):
 
     def on_disconnected(self):
         logger.warning("Disconnected from lobby server.")
+        self.model_updates.flush()
         self.gameset.clear()
         self.clear_players()
 
@@ -551,7 +562,8 @@ class ClientWindow(FormClass, BaseClass):
                 user_relations=self.user_relations.model,
                 chat_config=self._chat_config,
                 me=self.me,
-                line_metadata_builder=line_metadata_builder)
+                line_metadata_builder=line_metadata_builder,
+                model_updates=self.model_updates)
 
         target_channel = ChannelID(ChannelType.PUBLIC, '#aeolus')
         chat_view = ChatView.build(
@@ -1346,6 +1358,11 @@ class ClientWindow(FormClass, BaseClass):
 
         fa.run(info, self.game_session.relay_port, self.replayServer.serverPort(), arguments, self.game_session.game_uid)
 
+    def _at_games_added(self, games):
+        for game in games:
+            self.fill_in_session_info(game)
+            fa.instance.newServerGame(game)
+
     def fill_in_session_info(self, game):
         # sometimes we get the game_info message before a game session was created
         if self.game_session and game.uid == self.game_session.game_uid:
@@ -1393,13 +1410,15 @@ class ClientWindow(FormClass, BaseClass):
             player["id_"] = player["id"]
             del player["id"]
 
+        transaction = self.model_updates.transaction()
         for player in players:
             id_ = int(player["id_"])
             logger.debug('Received update about player {}'.format(id_))
             if id_ in self.players:
-                self.players[id_].update(**player)
+                self.players[id_].update(_transaction=transaction, **player)
             else:
-                self.players[id_] = Player(**player)
+                self.players.set_item(id_, Player(**player), transaction)
+        transaction.finalize()
 
     def handle_authentication_failed(self, message):
         QtWidgets.QMessageBox.warning(self, "Authentication failed", message["text"])
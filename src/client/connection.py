@@ -8,6 +8,7 @@ import sys
 from enum import IntEnum
 
 from model.game import Game, message_to_game_args
+from model.transaction import transactional, ModelTransaction
 
 logger = logging.getLogger(__name__)
 
@@ -343,7 +344,7 @@ class LobbyInfo(QtCore.QObject):
     serverSession = QtCore.pyqtSignal(dict)
     serverUpdate = QtCore.pyqtSignal(dict)
 
-    def __init__(self, dispatcher, gameset, playerset):
+    def __init__(self, dispatcher, gameset, playerset, scheduler=None):
         QtCore.QObject.__init__(self)
 
         self._dispatcher = dispatcher
@@ -365,6 +366,8 @@ class LobbyInfo(QtCore.QObject):
 
         self._gameset = gameset
         self._playerset = playerset
+        # Game updates come in bursts, let the scheduler coalesce them
+        self._scheduler = scheduler
 
     def _simple_emit(self, signal):
         def _emit(message):
@@ -375,13 +378,19 @@ class LobbyInfo(QtCore.QObject):
         pass
 
     def handle_game_info(self, message):
+        if self._scheduler is not None:
+            transaction = self._scheduler.transaction()
+        else:
+            transaction = ModelTransaction()
+
         if 'games' in message:  # initial bunch of games from server after client start
-            for game in message['games']:
-                self._update_game(game)
+            self._update_games(message['games'], transaction)
         else:
-            self._update_game(message)
+            self._update_game(message, transaction)
+        transaction.finalize()
 
-    def _update_game(self, m):
+    @transactional
+    def _update_game(self, m, _transaction=None):
         logger.debug('Received info about game {}'.format(m.get("uid", None)))
         if not message_to_game_args(m):
             return
@@ -390,11 +399,28 @@ class LobbyInfo(QtCore.QObject):
         if uid not in self._gameset:
             game = Game(playerset=self._playerset, **m)
             try:
-                self._gameset[uid] = game
+                self._gameset.set_item(uid, game, _transaction)
             except ValueError:  # Closed game!
                 pass
         else:
-            self._gameset[uid].update(**m)
+            self._gameset[uid].update(_transaction=_transaction, **m)
+
+    @transactional
+    def _update_games(self, messages, _transaction=None):
+        # Apply the whole bunch in one transaction, so that views get one
+        # batch of new games instead of hundreds of separate updates
+        logger.debug('Received info about {} games'.format(len(messages)))
+        new_games = {}
+        for m in messages:
+            if not message_to_game_args(m):
+                continue
+            uid = m["uid"]
+            if uid in self._gameset:
+                self._gameset[uid].update(_transaction=_transaction, **m)
+            else:
+                new_games[uid] = Game(playerset=self._playerset, **m)
+        # Closed games are skipped
+        self._gameset.set_items(new_games.values(), _transaction)
 
     def handle_modvault_list_info(self, message):
         modList = message["modList"]
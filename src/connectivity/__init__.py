@@ -1,6 +1,8 @@
 import logging
+import os
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QFileDialog
 
 import util
 
@@ -11,11 +13,16 @@ logger = logging.getLogger(__name__)
 
 
 class ConnectivityDialog(QObject):
+    TELEMETRY_REFRESH_MS = 1000
+
     def __init__(self, connectivity):
         QObject.__init__(self)
         self.connectivity = connectivity
         self.dialog = util.THEME.loadUi('connectivity/connectivity.ui')
         self.dialog.runTestButton.clicked.connect(self.run_relay_test)
+        self.dialog.saveTelemetryButton.clicked.connect(self.save_telemetry)
+        self._telemetry_timer = QTimer(self)
+        self._telemetry_timer.timeout.connect(self.update_telemetry)
 
     def update_relay_info(self):
         if self.connectivity.relay_address:
@@ -35,8 +42,29 @@ class ConnectivityDialog(QObject):
     def end(self):
         self.dialog.runTestButton.setEnabled(True)
 
+    def update_telemetry(self):
+        view = self.dialog.telemetry_view
+        scroll = view.verticalScrollBar().value()
+        view.setPlainText(self.connectivity.telemetry.report())
+        view.verticalScrollBar().setValue(scroll)
+
+    def save_telemetry(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self.dialog, "Save connectivity statistics",
+            os.path.join(util.LOG_DIR, "connectivity.txt"),
+            "Text files (*.txt)")
+        if not filename:
+            return
+        try:
+            self.connectivity.telemetry.dump(filename)
+        except IOError:
+            logger.warning("Failed to save connectivity statistics", exc_info=True)
+
     def exec_(self):
         self.dialog.test_result_label.setText(
                 "State: {}. Resolved address: {}:{}".format(self.connectivity.state, *self.connectivity.mapped_address)
         )
+        self.update_telemetry()
+        self._telemetry_timer.start(self.TELEMETRY_REFRESH_MS)
         self.dialog.exec_()
+        self._telemetry_timer.stop()
@@ -1,5 +1,6 @@
 
 from functools import partial
+import logging
 
 from PyQt5.QtCore import QObject, pyqtSignal, QTimer, Qt
 from PyQt5.QtNetwork import QUdpSocket, QHostAddress, QAbstractSocket
@@ -7,6 +8,7 @@ import time
 
 from connectivity import QTurnSocket
 from connectivity.relay import Relay
+from connectivity.telemetry import ConnectivityTelemetry
 from connectivity.turn import TURNState
 from decorators import with_logger
 
@@ -98,6 +100,7 @@ class ConnectivityHelper(QObject):
 
         self._socket = QTurnSocket(port, self._on_data)
         self._socket.state_changed.connect(self.turn_state_changed)
+        self.telemetry = ConnectivityTelemetry(self._socket.is_relayed)
 
         dispatch = self._client.lobby_dispatch
         dispatch.subscribe_to('connectivity', self.handle_SendNatPacket, "SendNatPacket")
@@ -159,6 +162,7 @@ class ConnectivityHelper(QObject):
         if self.state is None and self._socket.localPort() == self._port:
             self._socket.randomize_port()
         self._socket.writeDatagram(b'\x08'+message.encode(), QHostAddress(host), int(port))
+        self.telemetry.nat_packet_sent((host, int(port)))
 
     def handle_ConnectivityState(self, msg):
         state, addr = msg['args']
@@ -182,10 +186,17 @@ class ConnectivityHelper(QObject):
     def bind(self, addr, login, peer_id):
         (host, port) = addr
         host, port = host, int(port)
-        relay = Relay(self.game_port, login, peer_id, partial(self.send_udp, (host, port)))
+        relay = Relay(self.game_port, login, peer_id,
+                      partial(self._socket.sendto, address=(host, port)),
+                      self.telemetry.peer((host, port), login, peer_id))
         relay.bound.connect(partial(self.peer_bound.emit, login, peer_id))
         relay.listen()
         self._relays[(host, port)] = relay
+        self._socket.add_route((host, port), relay.send)
+
+    @property
+    def relays(self):
+        return list(self._relays.values())
 
     def send(self, command, args):
         self._client.lobby_connection.send({
@@ -212,7 +223,8 @@ class ConnectivityHelper(QObject):
         if not self._process_natpacket(data, addr):
             try:
                 relay = self._relays[(host, int(port))]
-                self._logger.debug('{}<<{} len: {}'.format(relay.peer_id, addr, len(data)))
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug('{}<<{} len: {}'.format(relay.peer_id, addr, len(data)))
                 relay.send(data)
             except KeyError:
                 self._logger.debug("No relay for data from {}:{}".format(host, port))
@@ -230,6 +242,7 @@ class ConnectivityHelper(QObject):
             if data.startswith(b'\x08'):
                 host, port = addr
                 msg = data[1:].decode()
+                self.telemetry.nat_packet_received((host, int(port)))
                 self.send('ProcessNatPacket',
                           ["{}:{}".format(host, port), msg])
                 if msg.startswith('Bind'):
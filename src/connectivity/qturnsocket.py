@@ -1,3 +1,5 @@
+import logging
+
 import config
 
 from PyQt5.QtCore import QTimer, pyqtSignal
@@ -37,6 +39,11 @@ class QTurnSocket(QUdpSocket):
     """
     Qt based TURN client, abstracts a normal socket
     and provides transparent TURN tunnelling functionality.
+
+    Game traffic takes a fast path: data from peers with a route (see
+    add_route) goes straight to the route, skipping STUN parsing and the
+    data callback, and ChannelData from the relay is unpacked without
+    building STUN messages.
     """
     # Emitted when the TURN session changes state
     state_changed = pyqtSignal(TURNState)
@@ -69,6 +76,11 @@ class QTurnSocket(QUdpSocket):
         self._session = QTurnSession(self)
         self._state = TURNState.UNBOUND
         self.bindings = {}
+        self._relayed = set()
+        self._routes = {}
+        self._host_names = {}
+        self._host_addresses = {}
+        self._turn_peer = None
         self.initial_port = port
         self._data_cb = data_cb
         self.turn_host, self.turn_port = config.Settings.get('turn/host', type=str, default='dev.faforever.com'), \
@@ -90,6 +102,7 @@ class QTurnSocket(QUdpSocket):
 
     def _looked_up(self, info):
         self.turn_address = info.addresses()[0]
+        self._turn_peer = (self._host_name(self.turn_address), self.turn_port)
 
     def connect_to_relay(self):
         self._session.start()
@@ -107,23 +120,44 @@ class QTurnSocket(QUdpSocket):
         (host, port) = addr
         self._logger.info("Bound channel {} to {}".format(channel, (host, port)))
         self.bindings[channel] = (host, int(port))
+        self._relayed.add((host, int(port)))
+
+    def is_relayed(self, addr):
+        return addr in self._relayed
+
+    def add_route(self, addr, deliver):
+        """
+        Data from addr will be passed directly to deliver(data), except for
+        NAT packets, which still go to the data callback.
+        """
+        self._routes[addr] = deliver
 
     def call_in(self, func, sec):
         timer = QTimer(self)
-        timer.singleShot(sec * 1000, func)
+        timer.singleShot(int(sec * 1000), func)
 
     def _error(self):
         pass
 
     def recvfrom(self, sender, data):
-        self._data_cb(sender, data)
+        self._deliver(sender, data)
 
     def recv(self, channel, data):
-        self._logger.debug("{}/TURNData<<: {}".format(channel, data))
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("{}/TURNData<<: {}".format(channel, data))
         try:
-            self._data_cb(self.bindings[channel], data)
+            sender = self.bindings[channel]
         except KeyError:
             self._logger.debug("No binding for channel: {}. Known: {}".format(channel, self.bindings))
+            return
+        self._deliver(sender, data)
+
+    def _deliver(self, sender, data):
+        route = self._routes.get(sender)
+        if route is not None and not data.startswith(b'\x08'):
+            route(data)
+        else:
+            self._data_cb(sender, data)
 
     def send(self, data):
         """
@@ -134,28 +168,65 @@ class QTurnSocket(QUdpSocket):
         self.writeDatagram(data, self.turn_address, self.turn_port)
 
     def sendto(self, data, address):
-        if address in list(self.bindings.values()):
-            self._logger.debug("Sending to {} through relay".format(address))
+        debug = self._logger.isEnabledFor(logging.DEBUG)
+        if address in self._relayed:
+            if debug:
+                self._logger.debug("Sending to {} through relay".format(address))
             self._session.send_to(data, address)
         else:
             host, port = address
-            self._logger.debug("Sending to {} directly".format(address))
-            self.writeDatagram(data, QHostAddress(host), port)
+            if debug:
+                self._logger.debug("Sending to {} directly".format(address))
+            self.writeDatagram(data, self._host_address(host), port)
 
     def handle_data(self, addr, data):
-        (host, port) = addr
-        self._logger.debug("{}:{}/UDP<<".format(host, port))
-        if self._session and self._session.is_stun_message(data):
-            self._logger.debug("Handling using turn session")
+        if addr in self._routes and addr != self._turn_peer:
+            self._deliver(addr, data)
+            return
+
+        debug = self._logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self._logger.debug("{}:{}/UDP<<".format(*addr))
+        channel_data = self._session.channel_data(data)
+        if channel_data is not None:
+            self.recv(*channel_data)
+        elif self._session.is_stun_message(data):
+            if debug:
+                self._logger.debug("Handling using turn session")
             response = STUNMessage.from_bytes(data)
             self._session.handle_response(response)
         else:
-            self._logger.debug("Emitting data, len: {}".format(len(data)))
-            self._data_cb((host, port), data)
+            if debug:
+                self._logger.debug("Emitting data, len: {}".format(len(data)))
+            self._deliver(addr, data)
+
+    # Few peers talk to us, so we can remember their addresses instead of
+    # converting them for every packet. If something floods us with many
+    # addresses, we just start over.
+    MAX_CACHED_HOSTS = 1024
+
+    def _host_name(self, host):
+        # host.toString() is expressed as IPv6 otherwise e.g. ::ffff:91.64.56.230
+        ipv4 = host.toIPv4Address()
+        name = self._host_names.get(ipv4)
+        if name is None:
+            if len(self._host_names) >= self.MAX_CACHED_HOSTS:
+                self._host_names.clear()
+            name = QHostAddress(ipv4).toString()
+            self._host_names[ipv4] = name
+        return name
+
+    def _host_address(self, host):
+        address = self._host_addresses.get(host)
+        if address is None:
+            if len(self._host_addresses) >= self.MAX_CACHED_HOSTS:
+                self._host_addresses.clear()
+            address = QHostAddress(host)
+            self._host_addresses[host] = address
+        return address
 
     def _readyRead(self):
         while self.hasPendingDatagrams():
             data, host, port = self.readDatagram(self.pendingDatagramSize())
-            ipv4_address_string = QHostAddress(host.toIPv4Address()).toString() # host.toString() is expressed as IPv6 otherwise e.g. ::ffff:91.64.56.230
             if data is not None:
-                self.handle_data((ipv4_address_string, int(port)), data)
+                self.handle_data((self._host_name(host), port), data)
@@ -1,3 +1,5 @@
+import logging
+
 from PyQt5.QtCore import QObject, pyqtSignal
 from PyQt5.QtNetwork import QUdpSocket, QHostAddress
 
@@ -6,9 +8,15 @@ from decorators import with_logger
 
 @with_logger
 class Relay(QObject):
+    """
+    Local UDP socket the game talks to in place of a peer. Records traffic
+    going each way in the peer's telemetry.
+    """
     bound = pyqtSignal(int)
 
-    def __init__(self, game_port, login, peer_id, recv):
+    _LOCALHOST = QHostAddress(QHostAddress.LocalHost)
+
+    def __init__(self, game_port, login, peer_id, recv, telemetry):
         QObject.__init__(self)
         self._logger.info("Allocating local relay for {}, {}".format(login, peer_id))
         self._socket = QUdpSocket()
@@ -17,13 +25,16 @@ class Relay(QObject):
         self.game_port = game_port
         self.login, self.peer_id = login, peer_id
         self.recv = recv
+        self.telemetry = telemetry
 
     def listen(self):
         self._socket.bind()
 
     def send(self, message):
-        self._logger.debug("game at 127.0.0.1:{}<<{} len: {}".format(self.game_port, self.peer_id, len(message)))
-        self._socket.writeDatagram(message, QHostAddress.LocalHost, self.game_port)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("game at 127.0.0.1:{}<<{} len: {}".format(self.game_port, self.peer_id, len(message)))
+        self.telemetry.packet_in(len(message))
+        self._socket.writeDatagram(message, self._LOCALHOST, self.game_port)
 
     def _state_changed(self, state):
         if state == QUdpSocket.BoundState:
@@ -34,5 +45,7 @@ class Relay(QObject):
             data, host, port = self._socket.readDatagram(self._socket.pendingDatagramSize())
             if data is None:    # Rare race condition when disconnecting
                 continue
-            self._logger.debug("{}>>{}/{}".format(self._socket.localPort(), self.login, self.peer_id))
+            if self._logger.isEnabledFor(logging.DEBUG):
+                self._logger.debug("{}>>{}/{}".format(self._socket.localPort(), self.login, self.peer_id))
+            self.telemetry.packet_out(len(data))
             self.recv(data)
@@ -1,5 +1,5 @@
 import binascii
-import random
+import os
 import struct
 import ipaddress
 
@@ -157,8 +157,7 @@ class STUNMessage:
 
     @staticmethod
     def _make_transaction_id():
-        a = ''.join([random.choice('0123456789ABCDEF') for x in range(24)])
-        return binascii.a2b_hex(a)
+        return os.urandom(12)
 
     @staticmethod
     def parse_header(data):
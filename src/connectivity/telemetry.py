@@ -0,0 +1,190 @@
+import bisect
+import time
+
+
+class Histogram:
+    """
+    Fixed-size histogram of millisecond values. Bucket i counts values up
+    to bounds[i], the last bucket counts everything above.
+    """
+    BOUNDS = (5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 1000)
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """
+        Upper bound of the bucket the p-th percentile falls in. Values past
+        the last bound report the largest value seen.
+        """
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def __str__(self):
+        if not self.count:
+            return "no samples"
+        lower = (0,) + self.bounds
+        buckets = ["{}-{}: {}".format(lo, hi, n)
+                   for lo, hi, n in zip(lower, self.bounds, self.counts) if n]
+        if self.counts[-1]:
+            buckets.append(">{}: {}".format(self.bounds[-1], self.counts[-1]))
+        return "mean {:.1f}ms, p50 {}ms, p95 {}ms, max {:.1f}ms [{}]".format(
+            self.mean, self.percentile(50), self.percentile(95), self.max,
+            ", ".join(buckets))
+
+
+class PeerTelemetry:
+    """
+    Traffic statistics of one peer.
+
+    Per packet we only bump counters and a histogram bucket. Jitter is
+    estimated from how much packet inter-arrival times vary, smoothed like
+    RFC 3550 does it - games send at a steady rate, so that's what lag
+    spikes show up as.
+
+    NAT packets give a rough idea of the path to the peer. Both sides send
+    them when the server asks them to; the peer doesn't echo ours. So
+    nat_delay is not a round trip time, but the time from a NAT packet we
+    sent to the next one we got from the peer. It includes however long
+    the peer took to be asked, and is only comparable between peers.
+    """
+    def __init__(self, address, clock=time.monotonic):
+        self.address = address
+        self.login = None
+        self.peer_id = None
+        self._clock = clock
+
+        # From the peer to the game
+        self.packets_in = 0
+        self.bytes_in = 0
+        # From the game to the peer
+        self.packets_out = 0
+        self.bytes_out = 0
+
+        self.interarrival = Histogram()
+        self.jitter = 0.0
+        self._last_arrival = None
+        self._last_interval = None
+
+        self.nat_delay = Histogram()
+        self.nat_packets_sent = 0
+        self.nat_packets_answered = 0
+        self._nat_sent_at = None
+
+    def packet_in(self, size):
+        self.packets_in += 1
+        self.bytes_in += size
+        now = self._clock()
+        if self._last_arrival is not None:
+            interval = (now - self._last_arrival) * 1000
+            self.interarrival.add(interval)
+            if self._last_interval is not None:
+                variation = abs(interval - self._last_interval)
+                self.jitter += (variation - self.jitter) / 16
+            self._last_interval = interval
+        self._last_arrival = now
+
+    def packet_out(self, size):
+        self.packets_out += 1
+        self.bytes_out += size
+
+    def nat_packet_sent(self):
+        self.nat_packets_sent += 1
+        self._nat_sent_at = self._clock()
+
+    def nat_packet_received(self):
+        if self._nat_sent_at is None:
+            return
+        self.nat_delay.add((self._clock() - self._nat_sent_at) * 1000)
+        self.nat_packets_answered += 1
+        self._nat_sent_at = None
+
+    @property
+    def loss(self):
+        """
+        Percentage of our NAT packets that no NAT packet from the peer
+        followed.
+        """
+        if not self.nat_packets_sent:
+            return 0.0
+        return 100 * (1 - self.nat_packets_answered / self.nat_packets_sent)
+
+
+class ConnectivityTelemetry:
+    """
+    Statistics of all peers we relay game traffic for, keyed by address.
+    Tells whether traffic goes through the TURN relay or directly with the
+    is_relayed callback.
+    """
+    def __init__(self, is_relayed, clock=time.monotonic):
+        self._is_relayed = is_relayed
+        self._clock = clock
+        self.peers = {}
+
+    def peer(self, address, login=None, peer_id=None):
+        peer = self.peers.get(address)
+        if peer is None:
+            peer = PeerTelemetry(address, self._clock)
+            self.peers[address] = peer
+        if login is not None:
+            peer.login, peer.peer_id = login, peer_id
+        return peer
+
+    def nat_packet_sent(self, address):
+        self.peer(address).nat_packet_sent()
+
+    def nat_packet_received(self, address):
+        peer = self.peers.get(address)
+        if peer is not None:
+            peer.nat_packet_received()
+
+    def report(self):
+        if not self.peers:
+            return "No peers yet."
+        return "\n\n".join(self._peer_report(p) for p in self.peers.values())
+
+    def _peer_report(self, peer):
+        host, port = peer.address
+        name = peer.login if peer.login is not None else "unknown peer"
+        path = "relay" if self._is_relayed(peer.address) else "direct"
+        return "\n".join([
+            "{} ({}) at {}:{}, {}".format(name, peer.peer_id, host, port,
+                                          path),
+            "  in: {} packets, {} bytes; out: {} packets, {} bytes".format(
+                peer.packets_in, peer.bytes_in,
+                peer.packets_out, peer.bytes_out),
+            "  NAT packet delay: {}".format(peer.nat_delay),
+            "  NAT packets unanswered: {:.0f}% of {}".format(
+                peer.loss, peer.nat_packets_sent),
+            "  jitter: {:.1f}ms".format(peer.jitter),
+            "  packet intervals: {}".format(peer.interarrival),
+        ])
+
+    def dump(self, filename):
+        with open(filename, "w") as f:
+            f.write(time.strftime(
+                "Connectivity statistics, %Y-%m-%d %H:%M:%S\n\n"))
+            f.write(self.report())
+            f.write("\n")
@@ -19,14 +19,21 @@ class TURNSession(metaclass=ABCMeta):
     Abstract TURN session abstraction.
 
     Handles details of the TURN protocol.
+
+    Permissions are batched - addresses permitted within
+    PERMISSION_BATCH_DELAY go out as one CreatePermission request, and all
+    permissions are renewed with the allocation.
     """
+    PERMISSION_BATCH_DELAY = 0.05
+    MAX_PERMISSIONS_PER_REQUEST = 32
 
     def __init__(self):
         self._pending_tx = {}
         self.logger = logging.getLogger(__name__)
         self.bindings = {}
         self._next_channel = 0x4000
-        self.permissions = {}
+        self.permissions = set()
+        self._pending_permissions = []
         self._pending_bindings = []
         self._state = TURNState.INITIALIZING
         self.mapped_addr = (None, None)
@@ -106,26 +113,60 @@ class TURNSession(metaclass=ABCMeta):
 
     def permit(self, addr):
         self.logger.info("Permitting sends from {}".format(addr))
-        msg = STUNMessage('CreatePermission',
-                          [('XOR-PEER-ADDRESS', addr)])
-        self._send(msg)
+        addr = tuple(addr)
+        self.permissions.add(addr)
+        if addr in self._pending_permissions:
+            return
+        if not self._pending_permissions:
+            self._call_in(self._send_permissions, self.PERMISSION_BATCH_DELAY)
+        self._pending_permissions.append(addr)
+
+    def _send_permissions(self):
+        pending = self._pending_permissions
+        self._pending_permissions = []
+        self._create_permissions(pending)
+
+    def _create_permissions(self, addrs):
+        step = self.MAX_PERMISSIONS_PER_REQUEST
+        for i in range(0, len(addrs), step):
+            msg = STUNMessage('CreatePermission',
+                              [('XOR-PEER-ADDRESS', addr)
+                               for addr in addrs[i:i + step]])
+            self._send(msg)
 
     def _send(self, stun_msg):
         self._pending_tx[stun_msg.transaction_id] = stun_msg
         self._write(stun_msg.to_bytes())
 
     _channeldata_format = struct.Struct('!HH')
+
+    @staticmethod
+    def channel_data(data):
+        """
+        Unpacks a ChannelData message without building a STUNMessage.
+
+        :return: channel number and payload, or None if data isn't one
+        """
+        if len(data) < 4:
+            return None
+        channel, length = TURNSession._channeldata_format.unpack_from(data)
+        if not 0x4000 <= channel <= 0x7FFF:
+            return None
+        return channel, data[4:4 + length]
+
     def send_to(self, data, addr):
         if isinstance(addr, int):
-            msg = struct.pack('!HH', addr, len(data))
-            self._write(msg + data)
+            channel = addr
         elif addr in self.bindings:
-            header = TURNSession._channeldata_format.pack(self.bindings[addr], len(data))
-            self._write(header + data)
+            channel = self.bindings[addr]
         else:
             self._write(STUNMessage('Send',
                                     [('XOR-PEER-ADDRESS', addr),
                                ('DATA', data)]).to_bytes())
+            return
+        # Packing into a reused buffer is slower than this in CPython for
+        # packets of any size we send
+        self._write(self._channeldata_format.pack(channel, len(data)) + data)
 
     def _retransmit(self):
         if not self.state == TURNState.STOPPED:
@@ -187,6 +228,8 @@ class TURNSession(metaclass=ABCMeta):
 
     def refresh(self):
         self._write(STUNMessage('Refresh').to_bytes())
+        # Permissions last 5 minutes and are renewed only by new requests
+        self._create_permissions(list(self.permissions))
         for addr, channel in list(self.bindings.items()):
             self._write(STUNMessage('ChannelBind',
                   [('CHANNEL-NUMBER', channel),
@@ -181,6 +181,51 @@ class PreviewDownload(QtCore.QObject):
         return not self._dl.succeeded()
 
 
+class LocalPreview(QtCore.QObject):
+    """
+    Stands in for a PreviewDownload while a preview source (like the map
+    preview cache) tries to make the preview locally. The source generates
+    previews in the background and tells us about them with preview_ready
+    and preview_failed signals.
+    """
+    done = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, source, name, url):
+        QtCore.QObject.__init__(self)
+        self.requests = set()
+        self.name = name
+        self.url = url
+        self._key = name.lower()
+        self._source = source
+        self._failed = False
+        source.preview_ready.connect(self._ready)
+        source.preview_failed.connect(self._not_generated)
+        source.generate(name)
+
+    def remove_request(self, req):
+        self.requests.remove(req)
+
+    def add_request(self, req):
+        self.requests.add(req)
+
+    def _ready(self, key):
+        if key == self._key:
+            self._finished(self._source.path(key))
+
+    def _not_generated(self, key):
+        if key == self._key:
+            self._failed = True
+            self._finished(None)
+
+    def _finished(self, filepath):
+        self._source.preview_ready.disconnect(self._ready)
+        self._source.preview_failed.disconnect(self._not_generated)
+        self.done.emit(self, (filepath, False))
+
+    def failed(self):
+        return self._failed
+
+
 class DownloadRequest(QtCore.QObject):
     done = QtCore.pyqtSignal(object, object)
 
@@ -212,15 +257,23 @@ class PreviewDownloader(QtCore.QObject):
     we were downloading' issue).
 
     Requests can be resubmitted. That reclassifies them to a new name.
+
+    If given a local preview source, previews are first made from local
+    files and only downloaded if that fails.
     """
+    # Emitted with name and file path of every successful download, before
+    # requests are notified
+    preview_downloaded = QtCore.pyqtSignal(str, str)
+
     PREVIEW_REDOWNLOAD_TIMEOUT = 5 * 60 * 1000
     PREVIEW_DOWN_FAILS_TO_TIMEOUT = 3
 
-    def __init__(self, target_dir, default_url_prefix):
+    def __init__(self, target_dir, default_url_prefix, local_source=None):
         QtCore.QObject.__init__(self)
         self._nam = QNetworkAccessManager(self)
         self._target_dir = target_dir
         self._default_url_prefix = default_url_prefix
+        self._local_source = local_source
         self._downloads = {}
         self._timeouts = DownloadTimeouts(self.PREVIEW_REDOWNLOAD_TIMEOUT,
                                           self.PREVIEW_DOWN_FAILS_TO_TIMEOUT)
@@ -245,7 +298,14 @@ class PreviewDownloader(QtCore.QObject):
         dl = self._downloads[name]
         req.dl = dl
 
-    def _add_download(self, name, url):
+    def _add_download(self, name, url, try_local=True):
+        source = self._local_source
+        if try_local and source is not None and source.can_generate(name):
+            dl = LocalPreview(source, name, url)
+            dl.done.connect(self._finished_local)
+            self._downloads[name] = dl
+            return
+
         if self._timeouts.on_timeout(name):
             delay = self._timeouts.timer
         else:
@@ -254,12 +314,25 @@ class PreviewDownloader(QtCore.QObject):
         dl.done.connect(self._finished_download)
         self._downloads[name] = dl
 
+    def _finished_local(self, dl, result):
+        if not dl.failed():
+            self._finished_download(dl, result)
+            return
+        # Nothing local to make it from, download it after all
+        requests = set(dl.requests)
+        del self._downloads[dl.name]
+        self._add_download(dl.name, dl.url, try_local=False)
+        for req in requests:
+            req.dl = self._downloads[dl.name]
+
     def _finished_download(self, dl, result):
         self._timeouts.update_fail_count(dl.name, dl.failed())
         requests = set(dl.requests)     # Don't change it during iteration
         for req in requests:
             req.dl = None
         del self._downloads[dl.name]
+        if not isinstance(dl, LocalPreview) and not dl.failed():
+            self.preview_downloaded.emit(dl.name, result[0])
         for req in requests:
             req.finished(dl.name, result)
 
@@ -1,9 +1,134 @@
-from PyQt5.QtCore import QObject, pyqtSignal, QDataStream
-from struct import pack, unpack
+from PyQt5.QtCore import QObject, pyqtSignal
+import struct
 
 from decorators import with_logger
 
 
+_uint32 = struct.Struct("<I")
+_int32 = struct.Struct("<i")
+_field = struct.Struct("<bi")
+
+FIELD_INT = 0
+FIELD_STRING = 1
+
+
+def _unescape(value):
+    # The game escapes tabs and newlines in strings it sends us
+    if "/" in value:
+        return value.replace("/t", "\t").replace("/n", "\n")
+    return value
+
+
+def _pack_field(val):
+    if isinstance(val, int):
+        return _field.pack(FIELD_INT, val)
+    elif isinstance(val, str):
+        data = val.encode()
+        return _field.pack(FIELD_STRING, len(data)) + data
+    else:
+        raise Exception("Unknown GameConnection Field Type: %s" % type(val))
+
+
+def encode_message(command, args):
+    """
+    Encodes a GPGNet message - its command followed by a list of int and
+    string arguments - into one buffer.
+    """
+    command = command.encode()
+    parts = [_uint32.pack(len(command)), command, _uint32.pack(len(args))]
+    parts.extend(_pack_field(arg) for arg in args)
+    return b"".join(parts)
+
+
+class GPGNetDecoder:
+    """
+    Incremental decoder of the GPGNet stream the game sends. feed() takes
+    whatever arrived from the socket and returns (command, args) of messages
+    it completed.
+
+    Data is appended to one buffer and parsed in place. Fields of a message
+    that already arrived are kept, so a message trickling in piece by piece
+    isn't parsed from the start every time. Consumed data is dropped from
+    the buffer once the buffer is drained or enough of it piles up.
+    """
+    COMPACT_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0
+        self._command = None
+        self._nargs = None
+        self._args = None
+
+    def feed(self, data):
+        self._buffer += data
+        messages = []
+        while self._parse():
+            messages.append((self._command, self._args))
+            self._command = None
+            self._nargs = None
+            self._args = None
+        self._compact()
+        return messages
+
+    def _compact(self):
+        if self._pos == len(self._buffer):
+            self._buffer.clear()
+            self._pos = 0
+        elif self._pos >= self.COMPACT_SIZE:
+            del self._buffer[:self._pos]
+            self._pos = 0
+
+    def _parse(self):
+        """
+        Parses as much of the current message as there is. Returns whether
+        it's complete.
+        """
+        buf = self._buffer
+        end = len(buf)
+        pos = self._pos
+
+        if self._command is None:
+            if end - pos < 4:
+                return False
+            size, = _uint32.unpack_from(buf, pos)
+            if end - pos < size + 4:
+                return False
+            self._command = buf[pos + 4:pos + 4 + size].decode()
+            pos += 4 + size
+            self._pos = pos
+
+        if self._nargs is None:
+            if end - pos < 4:
+                return False
+            self._nargs, = _uint32.unpack_from(buf, pos)
+            self._args = []
+            pos += 4
+            self._pos = pos
+
+        args = self._args
+        while len(args) < self._nargs:
+            if end - pos < 5:
+                break
+            field_type, value = _field.unpack_from(buf, pos)
+            if field_type == FIELD_INT:
+                args.append(value)
+                pos += 5
+            elif field_type == FIELD_STRING:
+                if value < 0:
+                    raise Exception(
+                        "Bad GameConnection string length: %d" % value)
+                if end - pos < value + 5:
+                    break
+                args.append(_unescape(buf[pos + 5:pos + 5 + value].decode()))
+                pos += 5 + value
+            else:
+                raise Exception(
+                    "Unknown GameConnection Field Type: %d" % field_type)
+        self._pos = pos
+        return len(args) == self._nargs
+
+
 @with_logger
 class GPGNetConnection(QObject):
     """
@@ -18,90 +143,15 @@ class GPGNetConnection(QObject):
         self._socket = tcp_connection
         self._socket.readyRead.connect(self._onReadyRead)
         self._socket.disconnected.connect(lambda: self.closed.emit())
-        self.header = None
-        self.nchunks = -1
-        self.chunks = None
+        self._decoder = GPGNetDecoder()
 
     def send(self, command, *args):
-        self._logger.info("GC<<: {}:{}".format(command, args))
-        ds = QDataStream(self._socket)
-        ds.setByteOrder(QDataStream.LittleEndian)
-
-        # Header
-        ds.writeUInt32(len(command))
-        ds.writeRawData(command.encode())
-
-        # Chunks
-        ds.writeUInt32(len(args))
-
-        for chunk in args:
-            ds.writeRawData(self._packLuaVal(chunk))
-
-    def _packLuaVal(self, val):
-        if isinstance(val, int):
-            return pack("=bi", 0, val)
-        elif isinstance(val, str) or isinstance(val, str):
-            return pack("=bi%ds" % len(val), 1, len(val), val.encode())
-        else:
-            raise Exception("Unknown GameConnection Field Type: %s" % type(val))
-
-    def _readLuaVal(self, ds):
-        if self._socket.bytesAvailable() < 5:
-            return None
-
-        fieldType, fieldSize = unpack('=bl', self._socket.peek(5))
-
-        if fieldType == 0:
-            ds.readRawData(5)
-            return fieldSize
-        elif fieldType == 1:
-            if self._socket.bytesAvailable() < fieldSize + 5:
-                return None
-
-            ds.readRawData(5)
-
-            datastring = ds.readRawData(fieldSize).decode('utf-8')
-            fixedStr = datastring.replace("/t","\t").replace("/n","\n")
-
-            return str(fixedStr)
-        else:
-            raise Exception("Unknown GameConnection Field Type: %d" % fieldType)
+        self._logger.info("GC<<: %s:%s", command, args)
+        self._socket.write(encode_message(command, args))
 
     # Non-reentrant
     def _onReadyRead(self):
-        while self._socket.bytesAvailable() >= 4:
-            ds = QDataStream(self._socket)
-            ds.setByteOrder(QDataStream.LittleEndian)
-
-            # Header packet
-            if self.header is None:
-                size, = unpack('=l', self._socket.peek(4))
-
-                if self._socket.bytesAvailable() < size + 4:
-                    return
-
-                # Omit size
-                ds.readUInt32()
-
-                self.header = ds.readRawData(size).decode()
-
-            # Chunks packet
-            else:
-                if self.nchunks == -1:
-                    self.nchunks = ds.readUInt32()
-                    self.chunks = []
-
-                while len(self.chunks) < self.nchunks:
-                    chunk = self._readLuaVal(ds)
-
-                    if chunk is None:
-                        return
-
-                    self.chunks.append(chunk)
-
-                # Packet pair reading done.
-                self._logger.info("GC >> : %s : %s", self.header, self.chunks)
-                self.messageReceived.emit(self.header, self.chunks)
-                self.header = None
-                self.nchunks = -1
-                self.chunks = None
+        data = self._socket.readAll().data()
+        for command, args in self._decoder.feed(data):
+            self._logger.info("GC >> : %s : %s", command, args)
+            self.messageReceived.emit(command, args)
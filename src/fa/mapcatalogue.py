@@ -0,0 +1,126 @@
+import collections
+import json
+import os
+import re
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# What we know about an installed map, all of it from its folder's name.
+MapInfo = collections.namedtuple("MapInfo", ["name", "folder", "version"])
+
+
+_FOLDER_VERSION = re.compile(r"\.v0*(\d+)$", re.IGNORECASE)
+
+
+def _folder_version(name):
+    match = _FOLDER_VERSION.search(name)
+    return int(match.group(1)) if match else None
+
+
+class MapCatalogue:
+    """
+    Case-insensitive index of maps installed in a list of map folders, saved
+    to a cache file between runs.
+
+    Every lookup checks modification times of the map roots and rescans
+    only roots that changed. Everything we keep comes from map folder names,
+    so changes within a map folder can't make the index stale.
+
+    Roots are given as a function, since they depend on settings that can
+    change. Maps in earlier roots shadow ones with the same name in later
+    roots.
+    """
+    CACHE_VERSION = 2
+
+    def __init__(self, roots, cache_file):
+        self._roots = roots
+        self._cache_file = cache_file
+        self._indexes = None    # root -> (mtime, {lowercase name: MapInfo})
+
+    def _load(self):
+        self._indexes = {}
+        try:
+            with open(self._cache_file, "rt") as fh:
+                data = json.load(fh)
+            if data.get("version") != self.CACHE_VERSION:
+                return
+            for root, index in data["roots"].items():
+                maps = {m["name"].lower(): MapInfo(**m) for m in index["maps"]}
+                self._indexes[root] = (index["mtime"], maps)
+        except (IOError, ValueError, KeyError, TypeError):
+            logger.info("Map catalogue cache unavailable, rebuilding it")
+            self._indexes = {}
+
+    def _save(self):
+        data = {
+            "version": self.CACHE_VERSION,
+            "roots": {
+                root: {"mtime": mtime,
+                       "maps": [info._asdict() for info in maps.values()]}
+                for root, (mtime, maps) in self._indexes.items()
+            }
+        }
+        tmp_file = self._cache_file + ".tmp"
+        try:
+            with open(tmp_file, "wt") as fh:
+                json.dump(data, fh)
+            os.replace(tmp_file, self._cache_file)
+        except (IOError, OSError):
+            logger.warning("Failed to save map catalogue", exc_info=True)
+
+    def refresh(self, force=False):
+        if self._indexes is None:
+            self._load()
+        changed = False
+        for root in self._roots():
+            try:
+                mtime = os.stat(root).st_mtime
+            except OSError:
+                mtime = None
+            if (force or root not in self._indexes
+                    or mtime != self._indexes[root][0]):
+                self._indexes[root] = (mtime, self._scan(root))
+                changed = True
+        if changed:
+            self._save()
+
+    def _scan(self, root):
+        maps = {}
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            return maps
+        for entry in entries:
+            try:
+                if not entry.is_dir():
+                    continue
+            except OSError:
+                continue
+            maps[entry.name.lower()] = MapInfo(entry.name, entry.path,
+                                               _folder_version(entry.name))
+        return maps
+
+    def _root_maps(self):
+        self.refresh()
+        for root in self._roots():
+            yield root, self._indexes[root][1]
+
+    def find(self, name):
+        """
+        Returns the MapInfo of an installed map, or None.
+        """
+        key = name.lower()
+        for _, maps in self._root_maps():
+            if key in maps:
+                return maps[key]
+        return None
+
+    def names(self, root=None):
+        """
+        Names of installed maps, as their folders are named. Optionally only
+        those in the given root.
+        """
+        return [info.name for r, maps in self._root_maps()
+                for info in maps.values() if root is None or r == root]
@@ -14,10 +14,12 @@ import urllib.request, urllib.error, urllib.parse
 import zipfile
 import tempfile
 import re
+import collections
 # module imports
 import fa
 # local imports
 from config import Settings
+from fa.mapcatalogue import MapCatalogue
 from vault.dialogs import downloadVaultAssetNoMsg
 
 logger = logging.getLogger(__name__)
@@ -29,7 +31,9 @@ VAULT_COUNTER_ROOT = "{}/faf/vault/map_vault/inc_downloads.php".format(route)
 
 from model.game import OFFICIAL_MAPS as maps
 
-__exist_maps = None
+map_catalogue = MapCatalogue(
+    lambda: [getUserMapsFolder(), getBaseMapsFolder()],
+    os.path.join(util.CACHE_DIR, "map_catalogue.json"))
 
 
 def isBase(mapname):
@@ -40,10 +44,7 @@ def isBase(mapname):
 
 
 def getUserMaps():
-    maps = []
-    if os.path.isdir(getUserMapsFolder()):
-        maps = os.listdir(getUserMapsFolder())
-    return maps
+    return map_catalogue.names(getUserMapsFolder())
 
 
 def getDisplayName(filename):
@@ -115,17 +116,9 @@ def isMapFolderValid(folder):
 
 
 def existMaps(force=False):
-    global __exist_maps
-    if force or __exist_maps is None:
-
-        __exist_maps = getUserMaps()
-
-        if os.path.isdir(getBaseMapsFolder()):
-            if __exist_maps is None:
-                __exist_maps = os.listdir(getBaseMapsFolder())
-            else:
-                __exist_maps.extend(os.listdir(getBaseMapsFolder()))
-    return __exist_maps
+    if force:
+        map_catalogue.refresh(force=True)
+    return map_catalogue.names()
 
 
 def isMapAvailable(mapname):
@@ -135,12 +128,7 @@ def isMapAvailable(mapname):
     if isBase(mapname):
         return True
 
-    if os.path.isdir(getUserMapsFolder()):
-        for infile in os.listdir(getUserMapsFolder()):
-            if infile.lower() == mapname.lower():
-                return True
-
-    return False
+    return map_catalogue.find(mapname) is not None
 
 
 def folderForMap(mapname):
@@ -150,12 +138,8 @@ def folderForMap(mapname):
     if isBase(mapname):
         return os.path.join(getBaseMapsFolder(), mapname)
 
-    if os.path.isdir(getUserMapsFolder()):
-        for infile in os.listdir(getUserMapsFolder()):
-            if infile.lower() == mapname.lower():
-                return os.path.join(getUserMapsFolder(), mapname)
-
-    return None
+    info = map_catalogue.find(mapname)
+    return info.folder if info is not None else None
 
 
 def getBaseMapsFolder():
@@ -186,30 +170,25 @@ def genPrevFromDDS(sourcename, destname, small=False):
     this opens supcom's dds file (format: bgra8888) and saves to png
     """
     try:
-        img = bytearray()
-        buf = bytearray(16)
-        file = open(sourcename, "rb")
-        file.seek(128)  # skip header
-        while file.readinto(buf):
-            img += buf[:3] + buf[4:7] + buf[8:11] + buf[12:15]
-        file.close()
-
-        size = int((len(img)/3) ** (1.0/2))
+        with open(sourcename, "rb") as file:
+            file.seek(128)  # skip header
+            data = file.read()
+
+        size = int((len(data) // 4) ** (1.0/2))
+        end = size * size * 4
+        # Reorder BGRA into RGB with strided copies of whole channels
+        img = bytearray(size * size * 3)
+        img[0::3] = data[2:end:4]
+        img[1::3] = data[1:end:4]
+        img[2::3] = data[0:end:4]
+
+        imageFile = QtGui.QImage(img, size, size, size * 3,
+                                 QtGui.QImage.Format_RGB888)
         if small:
-            imageFile = QtGui.QImage(
-                img,
-                size,
-                size,
-                QtGui.QImage.Format_RGB888).rgbSwapped().scaled(
-                    100,
-                    100,
-                    transformMode=QtCore.Qt.SmoothTransformation)
-        else:
-            imageFile = QtGui.QImage(
-                img,
-                size,
-                size,
-                QtGui.QImage.Format_RGB888).rgbSwapped()
+            imageFile = imageFile.scaled(
+                100,
+                100,
+                transformMode=QtCore.Qt.SmoothTransformation)
         imageFile.save(destname)
     except IOError:
         logger.debug('IOError exception in genPrevFromDDS', exc_info=True)
@@ -385,26 +364,251 @@ def __exportPreviewFromMap(mapname, positions=None):
 iconExtensions = ["png"]  # "jpg" removed to have fewer of those costly 404 misses.
 
 
-def preview(mapname, pixmap=False):
+class _PreviewSignals(QtCore.QObject):
+    generated = QtCore.pyqtSignal(str, object)
+    scanned = QtCore.pyqtSignal(object)
+
+
+def _scan_previews(preview_dir):
+    paths = {}
     try:
-        # Try to load directly from cache
-        for extension in iconExtensions:
-            img = os.path.join(util.MAP_PREVIEW_DIR, mapname + "." + extension)
-            if os.path.isfile(img):
-                logger.log(5, "Using cached preview image for: " + mapname)
-                return util.THEME.icon(img, False, pixmap)
+        files = os.listdir(preview_dir)
+    except OSError:
+        return paths
+    for filename in files:
+        name, ext = os.path.splitext(filename)
+        if ext[1:].lower() in iconExtensions:
+            paths.setdefault(name.lower(), os.path.join(preview_dir, filename))
+    return paths
 
-        # Try to find in local map folder
-        img = __exportPreviewFromMap(mapname)
 
-        if img and 'cache' in img and img['cache'] and os.path.isfile(img['cache']):
+class _ScanPreviews(QtCore.QRunnable):
+    def __init__(self, signals, preview_dir):
+        QtCore.QRunnable.__init__(self)
+        self._signals = signals
+        self._preview_dir = preview_dir
+
+    def run(self):
+        self._signals.scanned.emit(_scan_previews(self._preview_dir))
+
+
+class _GeneratePreview(QtCore.QRunnable):
+    """
+    Generates a map preview from a map folder on a worker thread. Generating
+    only touches files and QImages, which are safe to use outside the GUI
+    thread.
+    """
+    def __init__(self, signals, mapname, mapdir, generator):
+        QtCore.QRunnable.__init__(self)
+        self._signals = signals
+        self._mapname = mapname
+        self._mapdir = mapdir
+        self._generator = generator
+
+    def run(self):
+        path = None
+        try:
+            img = self._generator(self._mapdir)
+            if img and img['cache'] and os.path.isfile(img['cache']):
+                path = img['cache']
+        except:
+            logger.error("Error generating preview for " + self._mapname)
+            logger.error("Map Preview Exception", exc_info=sys.exc_info())
+        self._signals.generated.emit(self._mapname, path)
+
+
+class MapPreviewCache(QtCore.QObject):
+    """
+    Keeps track of map previews in the preview cache folder, so that looking
+    up a preview (e.g. when painting a game list) never touches the disk.
+
+    The folder is scanned once, and new previews are registered with add()
+    as they're downloaded or generated. Call warm() early to scan it on a
+    worker thread - previews asked for meanwhile are announced when the scan
+    is done. Previews missing from the cache are generated from local maps
+    by a small pool of worker threads, and announced with preview_ready, or
+    preview_failed if there's no local map to generate them from. Local maps
+    are looked up once per name, outside of the caller. Only the most
+    recently used previews are kept decoded in memory.
+    """
+    preview_ready = QtCore.pyqtSignal(str)
+    preview_failed = QtCore.pyqtSignal(str)
+
+    MAX_DECODED = 256
+    MAX_WORKERS = 2
+
+    def __init__(self, preview_dir, generator, locator):
+        QtCore.QObject.__init__(self)
+        self._preview_dir = preview_dir
+        self._generator = generator
+        self._locator = locator
+        self._paths = {}
+        self._scanned = False
+        self._scanning = False
+        self._waiting = set()   # Asked for while scanning
+        self._pending = set()
+        self._failed = set()
+        self._to_locate = {}
+        self._decoded = collections.OrderedDict()
+
+        self._locate_timer = QtCore.QTimer(self)
+        self._locate_timer.setSingleShot(True)
+        self._locate_timer.setInterval(0)
+        self._locate_timer.timeout.connect(self._locate_maps)
+
+        self._workers = QtCore.QThreadPool()
+        self._workers.setMaxThreadCount(self.MAX_WORKERS)
+        self._signals = _PreviewSignals()
+        self._signals.generated.connect(self._at_generated)
+        self._signals.scanned.connect(self._at_scanned)
+
+    def warm(self):
+        """
+        Scans the preview folder on a worker thread, unless it's scanned
+        already.
+        """
+        if self._scanned or self._scanning:
+            return
+        self._scanning = True
+        self._workers.start(_ScanPreviews(self._signals, self._preview_dir))
+
+    def _scan(self):
+        if not self._scanned and not self._scanning:
+            self._at_scanned(_scan_previews(self._preview_dir))
+
+    def _at_scanned(self, paths):
+        # Previews added meanwhile are newer
+        for key, path in paths.items():
+            self._paths.setdefault(key, path)
+        self._scanned = True
+        self._scanning = False
+        waiting, self._waiting = self._waiting, set()
+        for key in waiting:
+            if key in self._paths:
+                self.preview_ready.emit(key)
+            elif key not in self._failed:
+                self._generate(key)
+            else:
+                self.preview_failed.emit(key)
+
+    def path(self, mapname):
+        self._scan()
+        return self._paths.get(mapname.lower())
+
+    def add(self, mapname, path):
+        key = mapname.lower()
+        self._paths[key] = path
+        self._failed.discard(key)
+        for pixmap in (False, True):
+            self._decoded.pop((key, pixmap), None)
+        self.preview_ready.emit(key)
+
+    def preview(self, mapname, pixmap=False):
+        if self._scanning:
+            self._waiting.add(mapname.lower())
+            return None
+        path = self.path(mapname)
+        if path is None:
+            if mapname.lower() not in self._failed:
+                self._generate(mapname)
+            return None
+
+        key = (mapname.lower(), pixmap)
+        if key in self._decoded:
+            self._decoded.move_to_end(key)
+            return self._decoded[key]
+
+        pix = QtGui.QPixmap(path)
+        if pix.isNull():
+            # Don't read a broken preview again, make a new one instead
+            del self._paths[mapname.lower()]
+            return None
+        if pixmap:
+            image = pix
+        else:
+            image = QtGui.QIcon()
+            image.addPixmap(pix, QtGui.QIcon.Normal)
+        self._decoded[key] = image
+        if len(self._decoded) > self.MAX_DECODED:
+            self._decoded.popitem(last=False)
+        return image
+
+    def can_generate(self, mapname):
+        """
+        False if we already know there's no local map to generate the
+        preview from.
+        """
+        return mapname.lower() not in self._failed
+
+    def generate(self, mapname):
+        """
+        Requests a preview of a local map. The outcome is always announced
+        later with preview_ready or preview_failed, even if it's known
+        already.
+        """
+        key = mapname.lower()
+        if self._scanning:
+            self._waiting.add(key)
+        elif self.path(mapname) is not None:
+            QtCore.QTimer.singleShot(0, lambda: self.preview_ready.emit(key))
+        elif key in self._failed:
+            QtCore.QTimer.singleShot(0, lambda: self.preview_failed.emit(key))
+        else:
+            self._generate(mapname)
+
+    def _generate(self, mapname):
+        key = mapname.lower()
+        if key in self._pending:
+            return
+        # Looking for the map touches the disk, so it's left until control
+        # returns to the event loop
+        self._pending.add(key)
+        self._to_locate[key] = mapname
+        if not self._locate_timer.isActive():
+            self._locate_timer.start()
+
+    def _locate_maps(self):
+        to_locate, self._to_locate = self._to_locate, {}
+        for key, mapname in to_locate.items():
+            # Look for the map here, since settings aren't safe to read from
+            # worker threads
+            mapdir = self._locator(mapname)
+            if mapdir is None:
+                self._pending.discard(key)
+                self._failed.add(key)
+                self.preview_failed.emit(key)
+                continue
+            job = _GeneratePreview(self._signals, mapname, mapdir,
+                                   self._generator)
+            self._workers.start(job)
+
+    def _at_generated(self, mapname, path):
+        key = mapname.lower()
+        self._pending.discard(key)
+        if path is not None:
             logger.debug("Using fresh preview image for: " + mapname)
-            return util.THEME.icon(img['cache'], False, pixmap)
+            self.add(mapname, path)
+        else:
+            self._failed.add(key)
+            self.preview_failed.emit(key)
 
-        return None
-    except:
-        logger.error("Error raised in maps.preview(...) for " + mapname)
-        logger.error("Map Preview Exception", exc_info=sys.exc_info())
+
+def _localMapFolder(mapname):
+    info = map_catalogue.find(mapname)
+    return info.folder if info is not None else None
+
+
+preview_cache = MapPreviewCache(util.MAP_PREVIEW_DIR, __exportPreviewFromMap,
+                                _localMapFolder)
+
+
+def preview(mapname, pixmap=False):
+    """
+    Returns a preview icon (or pixmap) for the map, or None if we don't have
+    one yet. Never blocks on the disk - missing previews are generated from
+    local maps in the background.
+    """
+    return preview_cache.preview(mapname, pixmap)
 
 
 def downloadMap(name, silent=False):
@@ -3,7 +3,7 @@ import os
 from PyQt5 import QtCore, QtWidgets
 import fa
 from fa.check import check
-from fa.replayparser import replayParser
+from fa.replayparser import ReplayParseError, open_replay, replay_version
 from util.gameurl import GameUrl, GameUrlType
 
 import util
@@ -54,8 +54,7 @@ def replay(source, detach=False):
                     featured_mod_versions = info.get('featured_mod_versions', None)
                     arg_string = scfa_replay.fileName()
 
-                    parser = replayParser(arg_string)
-                    version = parser.getVersion()
+                    version = replay_version(arg_string)
 
                 elif source.endswith(".scfareplay"):  # compatibility mode
                     filename = os.path.basename(source)
@@ -68,8 +67,15 @@ def replay(source, detach=False):
 
                     mapname = None
                     arg_string = source
-                    parser = replayParser(arg_string)
-                    version = parser.getVersion()
+                    try:
+                        # Legacy replays have no info block, but the map is
+                        # in the replay header
+                        with open_replay(source) as scfa_header:
+                            version = scfa_header.version
+                            mapname = scfa_header.mapname
+                    except (ReplayParseError, OSError):
+                        logger.warning("Couldn't parse header of " + source)
+                        version = replay_version(arg_string)
                 else:
                     QtWidgets.QMessageBox.critical(None, "FA Forever Replay", "Sorry, FAF has no idea how to replay "
                                                                               "this file:<br/><b>" + source + "</b>")
@@ -1,39 +1,201 @@
-
+import contextlib
+import mmap
 import struct
 
+_int = struct.Struct("<i")
+_float = struct.Struct("<f")
+_command_head = struct.Struct("<BH")
+
+LUA_NUMBER = 0
+LUA_STRING = 1
+LUA_NIL = 2
+LUA_BOOL = 3
+LUA_TABLE_START = 4
+LUA_TABLE_END = 5
+
+# We never need more than this to find the game version
+VERSION_PREFIX_SIZE = 256
+
+
+class ReplayParseError(Exception):
+    pass
+
+
+def _version_from_line(line):
+    if not line.startswith("Supreme Commander v1"):
+        return None
+    return line.split(".")[-1]
+
+
+def _first_line(buf):
+    end = len(buf)
+    for sep in (b'\r', b'\x00'):
+        pos = buf.find(sep, 0, end)
+        if pos != -1:
+            end = pos
+    try:
+        return bytes(buf[:end]).decode('utf-8')
+    except UnicodeDecodeError:
+        return ''
+
+
+def replay_version(path):
+    """
+    Returns the game version a .scfareplay was recorded with, or None if it
+    doesn't look like an FA replay. Only reads the first few bytes.
+    """
+    with open(path, 'rb') as f:
+        return _version_from_line(_first_line(f.read(VERSION_PREFIX_SIZE)))
+
+
+class ScfaReplay:
+    """
+    Parser for Supreme Commander replays (.scfareplay), working on top of any
+    buffer - bytes, bytearray or an mmap. The header is parsed on creation;
+    the command stream after it is only walked when iterating commands(),
+    which hands out payloads as memoryview slices of the buffer.
+    """
+    def __init__(self, buf):
+        self._buf = buf
+        self._pos = 0
+
+        self.version_line = self._read_string()
+        self.version = _version_from_line(self.version_line.split("\r")[0])
+        self._skip(3)
+        replay_version, _, self.map = self._read_string().partition("\r\n")
+        self.replay_version = replay_version
+        self._skip(4)
+
+        self._skip(4)   # Size of the mods table
+        self.mods = self._read_lua()
+        self._skip(4)   # Size of the scenario table
+        self.scenario = self._read_lua()
 
-class replayParser:
-    def __init__(self, filepath):
-        self.file = filepath
+        self.sources = []
+        for _ in range(self._read_byte()):
+            name = self._read_string()
+            self.sources.append((name, self._read_int()))
 
-    def __readLine(self, offset, bin):
-        line = b''
-        while True:
+        self.cheats_enabled = self._read_byte() > 0
 
-            char = struct.unpack("s", bin[offset:offset+1])
+        self.armies = {}
+        for _ in range(self._read_byte()):
+            self._skip(4)   # Size of the army table
+            army = self._read_lua()
+            source = self._read_byte()
+            self.armies[source] = army
+            if source != 255:
+                self._skip(1)
 
-            offset = offset + 1
-            if char[0] == b'\r':
-                # offset = offset + 2
-                break
-            elif char[0] == b'\x00':
-                # offset = offset + 3
-                break
-            else:
-                line = line + char[0]
+        self.random_seed = self._read_int()
+        self.header_size = self._pos
+
+    @property
+    def mapname(self):
+        """
+        The map folder name, e.g. "scmp_009" for
+        "/maps/scmp_009/scmp_009.scmap".
+        """
+        parts = self.map.replace("\\", "/").split("/")
+        if len(parts) < 2 or not parts[-2]:
+            return None
+        return parts[-2].lower()
+
+    @property
+    def options(self):
+        if not isinstance(self.scenario, dict):
+            return {}
+        return self.scenario.get("Options", {})
+
+    def commands(self):
+        """
+        Lazily yields (type, payload) for each command after the header.
+        Payloads are views into the buffer, so copy them if you need them
+        after the replay is closed.
+        """
+        buf = self._buf
+        view = memoryview(buf)
+        pos = self.header_size
+        end = len(buf)
         try:
-            line = line.decode('utf-8')
-        except UnicodeDecodeError:
-            line = ''
-        return offset, line
-
-    def getVersion(self):
-        f = open(self.file, 'rb')
-        bin = f.read() 
-        offset = 0
-        offset, supcomVersion = self.__readLine(offset, bin)  
-        f.close()
-        if not supcomVersion.startswith("Supreme Commander v1"):
+            while pos + _command_head.size <= end:
+                ctype, size = _command_head.unpack_from(buf, pos)
+                if size < _command_head.size or pos + size > end:
+                    raise ReplayParseError("Truncated command at offset {}".format(pos))
+                yield ctype, view[pos + _command_head.size:pos + size]
+                pos += size
+        finally:
+            view.release()
+
+    # Low level reads
+
+    def _check(self, size):
+        if self._pos + size > len(self._buf):
+            raise ReplayParseError("Unexpected end of replay at offset {}".format(self._pos))
+
+    def _skip(self, size):
+        self._check(size)
+        self._pos += size
+
+    def _read_byte(self):
+        self._check(1)
+        value = self._buf[self._pos]
+        self._pos += 1
+        return value
+
+    def _read_int(self):
+        self._check(_int.size)
+        value, = _int.unpack_from(self._buf, self._pos)
+        self._pos += _int.size
+        return value
+
+    def _read_float(self):
+        self._check(_float.size)
+        value, = _float.unpack_from(self._buf, self._pos)
+        self._pos += _float.size
+        return value
+
+    def _read_string(self):
+        end = self._buf.find(b'\x00', self._pos)
+        if end == -1:
+            raise ReplayParseError("Unterminated string at offset {}".format(self._pos))
+        value = self._buf[self._pos:end].decode('utf-8', errors='replace')
+        self._pos = end + 1
+        return value
+
+    def _read_lua(self):
+        ltype = self._read_byte()
+        if ltype == LUA_NUMBER:
+            return self._read_float()
+        elif ltype == LUA_STRING:
+            return self._read_string()
+        elif ltype == LUA_NIL:
+            self._skip(1)
             return None
-        else:
-            return supcomVersion.split(".")[-1]
+        elif ltype == LUA_BOOL:
+            return self._read_byte() != 0
+        elif ltype == LUA_TABLE_START:
+            table = {}
+            while True:
+                self._check(1)
+                if self._buf[self._pos] == LUA_TABLE_END:
+                    self._pos += 1
+                    return table
+                key = self._read_lua()
+                table[key] = self._read_lua()
+        raise ReplayParseError("Unknown lua type {} at offset {}".format(ltype, self._pos - 1))
+
+
+@contextlib.contextmanager
+def open_replay(path):
+    """
+    Memory-maps a .scfareplay and yields a ScfaReplay over it, so that only
+    the parts of the file we look at are actually read.
+    """
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            raise ReplayParseError("Empty replay file")
+        with buf:
+            yield ScfaReplay(buf)
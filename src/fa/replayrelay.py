@@ -0,0 +1,196 @@
+from PyQt5 import QtCore, QtNetwork
+
+import collections
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ReplayRelay(QtCore.QObject):
+    """
+    Relays replay data to the internet replay server without ever blocking
+    the caller.
+
+    Data waits in a bounded backlog and is handed to the socket only as fast
+    as the socket drains it. If the backlog overflows, the oldest chunks are
+    dropped. If the connection breaks, we reconnect, post the stream header
+    again and carry on with whatever is still queued. Local recording never
+    depends on any of this.
+    """
+    finished = QtCore.pyqtSignal(object)
+
+    MAX_BACKLOG = 16 * 1024 * 1024
+    SOCKET_CHUNK = 64 * 1024
+    RECONNECT_DELAY = 2000
+    MAX_RECONNECTS = 5
+    FINISH_TIMEOUT = 30 * 1000
+    RATE_WINDOW = 1.0
+
+    def __init__(self, host, port, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._host = host
+        self._port = port
+        self._socket = QtNetwork.QTcpSocket(self)
+        self._socket.connected.connect(self._on_connected)
+        self._socket.disconnected.connect(self._on_connection_lost)
+        self._socket.error.connect(self._on_error)
+        self._socket.bytesWritten.connect(self._on_bytes_written)
+
+        self._reconnect_timer = QtCore.QTimer(self)
+        self._reconnect_timer.setSingleShot(True)
+        self._reconnect_timer.setInterval(self.RECONNECT_DELAY)
+        self._reconnect_timer.timeout.connect(self._connect)
+
+        self._finish_timer = QtCore.QTimer(self)
+        self._finish_timer.setSingleShot(True)
+        self._finish_timer.setInterval(self.FINISH_TIMEOUT)
+        self._finish_timer.timeout.connect(self._on_finish_timeout)
+
+        # The "P/<uid>/<name>.SCFAreplay\0" prefix posting the replay. We
+        # keep it aside so we can post again after reconnecting.
+        self._header = None
+        self._backlog = collections.deque()
+        self._backlog_size = 0
+        self._finishing = False
+        self._closed = False
+        # Reconnects since we were last connected; we only give up on a
+        # server we can't reach, not on a long game with a few hiccups.
+        self._failed_reconnects = 0
+
+        self.bytes_relayed = 0
+        self.bytes_dropped = 0
+        self.chunks_dropped = 0
+        self.reconnects = 0
+        self.send_rate = 0.0
+        self._rate_start = time.time()
+        self._rate_bytes = 0
+
+    @property
+    def bytes_queued(self):
+        return self._backlog_size + self._socket.bytesToWrite()
+
+    def stats(self):
+        return {
+            "bytes_queued": self.bytes_queued,
+            "bytes_relayed": self.bytes_relayed,
+            "send_rate": self.send_rate,
+            "bytes_dropped": self.bytes_dropped,
+            "chunks_dropped": self.chunks_dropped,
+            "reconnects": self.reconnects,
+        }
+
+    def start(self):
+        self._connect()
+
+    def _connect(self):
+        if self._closed:
+            return
+        self._socket.abort()
+        self._socket.connectToHost(self._host, self._port)
+
+    def write(self, data):
+        if self._closed:
+            return
+        if self._header is None:
+            if data.startswith(b"P/") and b"\x00" in data:
+                end = data.index(b"\x00") + 1
+                self._header, data = data[:end], data[end:]
+            else:
+                self._header = b""
+        if data:
+            self._enqueue(data)
+        self._pump()
+
+    def _enqueue(self, data):
+        self._backlog.append(data)
+        self._backlog_size += len(data)
+        while self._backlog_size > self.MAX_BACKLOG and len(self._backlog) > 1:
+            dropped = self._backlog.popleft()
+            self._backlog_size -= len(dropped)
+            self.bytes_dropped += len(dropped)
+            self.chunks_dropped += 1
+
+    def _pump(self):
+        if self._socket.state() != QtNetwork.QAbstractSocket.ConnectedState:
+            return
+        while (self._backlog
+               and self._socket.bytesToWrite() < self.SOCKET_CHUNK):
+            chunk = self._backlog.popleft()
+            self._backlog_size -= len(chunk)
+            self._socket.write(chunk)
+        if self._finishing and not self.bytes_queued:
+            self._close()
+
+    def finish(self):
+        """
+        Called once the game stops sending data. The relay keeps sending its
+        backlog in the background and cleans up after itself.
+        """
+        if self._closed:
+            return
+        self._finishing = True
+        self._finish_timer.start()
+        if self._socket.state() == QtNetwork.QAbstractSocket.UnconnectedState \
+                and not self._reconnect_timer.isActive():
+            self._close()
+        else:
+            self._pump()
+
+    def _on_connected(self):
+        logger.debug("internet replay server " + self._socket.peerName()
+                     + ":" + str(self._socket.peerPort()))
+        self._failed_reconnects = 0
+        if self._header:
+            self._socket.write(self._header)
+        self._pump()
+
+    def _on_bytes_written(self, count):
+        self.bytes_relayed += count
+        self._rate_bytes += count
+        now = time.time()
+        elapsed = now - self._rate_start
+        if elapsed >= self.RATE_WINDOW:
+            self.send_rate = self._rate_bytes / elapsed
+            self._rate_start = now
+            self._rate_bytes = 0
+        self._pump()
+
+    def _on_error(self, error):
+        logger.warning("Replay relay socket error: "
+                       + self._socket.errorString())
+        if self._socket.state() == QtNetwork.QAbstractSocket.UnconnectedState:
+            self._on_connection_lost()
+
+    def _on_connection_lost(self):
+        if self._closed or self._reconnect_timer.isActive():
+            return
+        # Whatever the socket didn't get to send is gone
+        self.bytes_dropped += self._socket.bytesToWrite()
+        if self._failed_reconnects >= self.MAX_RECONNECTS:
+            logger.error("no connection to internet replay server, giving up")
+            self._close()
+            return
+        self._failed_reconnects += 1
+        self.reconnects += 1
+        logger.info("Lost connection to internet replay server, reconnecting")
+        self._reconnect_timer.start()
+
+    def _on_finish_timeout(self):
+        logger.warning("Replay transmission did not finish in time, "
+                       + str(self.bytes_queued) + " bytes left")
+        self._close()
+
+    def _close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._reconnect_timer.stop()
+        self._finish_timer.stop()
+        self.bytes_dropped += self._backlog_size
+        self._backlog.clear()
+        self._backlog_size = 0
+        self._socket.disconnectFromHost()
+        logger.info("Replay relay finished: " + str(self.stats()))
+        self.finished.emit(self)
+        self.deleteLater()
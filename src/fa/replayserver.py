@@ -5,21 +5,20 @@ import os
 import logging
 import util
 import fa
-import json
 import time
 
 from config import Settings
+from .replayrelay import ReplayRelay
+from .replaywriter import ReplayWriter
 
 INTERNET_REPLAY_SERVER_HOST = Settings.get('replay_server/host')
 INTERNET_REPLAY_SERVER_PORT = Settings.get('replay_server/port', type=int)
 
-from . import DEFAULT_LIVE_REPLAY
-from . import DEFAULT_RECORD_REPLAY
 
 class ReplayRecorder(QtCore.QObject):
     """
     This is a simple class that takes all the FA replay data input from its inputSocket, writes it to a file,
-    and relays it to an internet server via its relaySocket.
+    and relays it to an internet server via its relay.
     """
     __logger = logging.getLogger(__name__)
 
@@ -32,25 +31,22 @@ class ReplayRecorder(QtCore.QObject):
         self.inputSocket.disconnected.connect(self.inputDisconnected)
         self.__logger.info("FA connected locally.")  
 
-        # Create a file to write the replay data into
-        self.replayData = QtCore.QByteArray()
+        # Replay data is streamed into a file as it arrives. If the file
+        # can't be written, we keep relaying without a local copy.
+        self.replayWriter = None
+        self.recording = True
         self.replayInfo = fa.instance._info
                  
-        # Open the relay socket to our server
-        self.relaySocket = QtNetwork.QTcpSocket(self.parent)
-        self.relaySocket.connectToHost(INTERNET_REPLAY_SERVER_HOST, INTERNET_REPLAY_SERVER_PORT)
-        
-        if util.settings.value("fa.live_replay", DEFAULT_LIVE_REPLAY, type=bool):
-            if self.relaySocket.waitForConnected(1000):  # Maybe make this asynchronous
-                self.__logger.debug("internet replay server " + self.relaySocket.peerName() + ":" + str(self.relaySocket.peerPort()))
-            else:
-                self.__logger.error("no connection to internet replay server")
+        # Relay to our server. The relay is owned by the replay server, so
+        # it can finish sending in the background after we're done.
+        self.relay = ReplayRelay(INTERNET_REPLAY_SERVER_HOST,
+                                 INTERNET_REPLAY_SERVER_PORT, self.parent)
+        self.relay.start()
 
     def __del__(self):
         # Clean up our socket objects, in accordance to the hint from the Qt docs (recommended practice)
         self.__logger.debug("destructor entered")
         self.inputSocket.deleteLater()
-        self.relaySocket.deleteLater()
 
     def readDatas(self):
         # CAVEAT: readAll() was seemingly truncating data here
@@ -60,26 +56,38 @@ class ReplayRecorder(QtCore.QObject):
             self.__logger.warning("Read failure on inputSocket: " + bytes.decode())
             return
 
-        # Convert data into a bytearray for easier processing
-        data = QtCore.QByteArray(read)
-
         # Record locally
-        if self.replayData.isEmpty():
-            # This prefix means "P"osting replay in the livereplay protocol of FA,
-            # this needs to be stripped from the local file
-            if data.startsWith(b"P/"):
-                rest = data.indexOf(b"\x00") + 1
-                self.__logger.info("Stripping prefix '" + str(data.left(rest - 1)) + "' from replay.")
-                self.replayData.append(data.right(data.size() - rest))
-            else:
-                self.replayData.append(data)
-        else:
-            # Write to buffer
-            self.replayData.append(data)
+        if self.recording:
+            self.recordData(read)
 
         # Relay to faforever.com
-        if self.relaySocket.isOpen():
-            self.relaySocket.write(data)
+        self.relay.write(read)
+
+    def recordData(self, data):
+        try:
+            if self.replayWriter is None:
+                self.replayWriter = ReplayWriter(self.replayFilename(),
+                                                 self.replayInfo)
+                # This prefix means "P"osting replay in the livereplay
+                # protocol of FA, this needs to be stripped from the local
+                # file
+                if data.startswith(b"P/"):
+                    rest = data.find(b"\x00") + 1
+                    self.__logger.info("Stripping prefix '"
+                                       + str(data[:rest - 1])
+                                       + "' from replay.")
+                    data = data[rest:]
+            self.replayWriter.write(data)
+        except OSError:
+            self.__logger.exception("Cannot write local replay, "
+                                    "relaying without a local copy")
+            self.abortRecording()
+
+    def abortRecording(self):
+        self.recording = False
+        if self.replayWriter is not None:
+            self.replayWriter.abort()
+            self.replayWriter = None
 
     def done(self):
         self.__logger.info("closing replay file")
@@ -94,24 +102,21 @@ class ReplayRecorder(QtCore.QObject):
             self.__logger.info("Relaying remaining bytes:" + str(self.inputSocket.bytesAvailable()))
             self.readDatas()
             
-        # Part of the hardening - ensure successful sending of the rest of the replay to the server
-        if self.relaySocket.bytesToWrite():
-            self.__logger.info("Waiting for replay transmission to finish: " + str(self.relaySocket.bytesToWrite()) + " bytes")
-
-            progress = QtWidgets.QProgressDialog("Finishing Replay Transmission", "Cancel", 0, 0)
-            progress.show()
-
-            while self.relaySocket.bytesToWrite() and progress.isVisible():
-                QtWidgets.QApplication.processEvents()
-
-            progress.close()
+        # The rest of the replay is sent to the server in the background
+        if self.relay.bytes_queued:
+            self.__logger.info("Finishing replay transmission in background: "
+                               + str(self.relay.bytes_queued) + " bytes")
+        self.relay.finish()
 
-        self.relaySocket.disconnectFromHost()
-        
         self.writeReplayFile()
         
         self.done()
 
+    def replayFilename(self):
+        name = (str(self.replayInfo['uid']) + "-"
+                + self.replayInfo['recorder'] + ".fafreplay")
+        return os.path.join(util.REPLAY_DIR, name)
+
     def writeReplayFile(self):
         # Update info block if possible.
         if fa.instance._info and fa.instance._info['uid'] == self.replayInfo['uid']:
@@ -123,16 +128,24 @@ class ReplayRecorder(QtCore.QObject):
             self.replayInfo = fa.instance._info
                  
         self.replayInfo['game_end'] = time.time()
-        
-        filename = os.path.join(util.REPLAY_DIR, str(self.replayInfo['uid']) + "-" + self.replayInfo['recorder'] + ".fafreplay")
-        self.__logger.info("Writing local replay as " + filename + ", containing " + str(self.replayData.size()) + " bytes of replay data.")
-               
-        replay = QtCore.QFile(filename)
-        replay.open(QtCore.QIODevice.WriteOnly | QtCore.QIODevice.Text)
-        replay.write(json.dumps(self.replayInfo).encode('utf-8'))
-        replay.write(b'\n')
-        replay.write(QtCore.qCompress(self.replayData).toBase64())
-        replay.close()
+
+        if not self.recording:
+            self.__logger.warning("No local replay was recorded")
+            return
+
+        try:
+            if self.replayWriter is None:
+                self.replayWriter = ReplayWriter(self.replayFilename(),
+                                                 self.replayInfo)
+
+            self.__logger.info("Writing local replay as "
+                               + self.replayWriter.filename + ", containing "
+                               + str(self.replayWriter.size)
+                               + " bytes of replay data.")
+            self.replayWriter.finish(self.replayInfo)
+        except OSError:
+            self.__logger.exception("Failed to write local replay")
+            self.abortRecording()
         
 
 class ReplayServer(QtNetwork.QTcpServer):
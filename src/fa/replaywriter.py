@@ -0,0 +1,108 @@
+import base64
+import json
+import os
+import shutil
+import struct
+import zlib
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ReplayWriter:
+    """
+    Writes a .fafreplay file while the game is still running.
+
+    A .fafreplay is a JSON header line followed by
+    qCompress(data).toBase64(), i.e. the base64 of a 4-byte big-endian
+    uncompressed size and a zlib stream. We compress and encode replay data
+    as it arrives into a temporary file next to the target, so memory use
+    stays flat regardless of game length. The header is written up front
+    into a space-padded slot and rewritten once the game ends; the size
+    prefix is patched in at the same time.
+    """
+    TEMP_SUFFIX = ".part"
+    HEADER_SLOT = 4096
+    # The size prefix and the first two zlib bytes share the first 8
+    # base64 characters, so those are written last.
+    PREFIX_CHARS = 8
+
+    def __init__(self, filename, info):
+        self.filename = filename
+        self._tempname = filename + self.TEMP_SUFFIX
+        self._compressor = zlib.compressobj()
+        self._raw_size = 0
+        self._zlib_head = b''
+        self._pending = b''    # Compressed bytes not yet base64-aligned
+
+        header = self._encode_header(info)
+        self._header_slot = max(self.HEADER_SLOT, 2 * len(header))
+        self._file = open(self._tempname, "w+b")
+        self._write_header_slot(header)
+        self._file.write(b'A' * self.PREFIX_CHARS)
+
+    @property
+    def size(self):
+        return self._raw_size
+
+    @staticmethod
+    def _encode_header(info):
+        return json.dumps(info).encode('utf-8')
+
+    def _write_header_slot(self, header):
+        self._file.seek(0)
+        padding = self._header_slot - len(header) - 1
+        self._file.write(header + b' ' * padding + b'\n')
+
+    def write(self, data):
+        self._raw_size += len(data)
+        self._add_compressed(self._compressor.compress(data))
+
+    def _add_compressed(self, chunk):
+        if len(self._zlib_head) < 2:
+            missing = 2 - len(self._zlib_head)
+            self._zlib_head += chunk[:missing]
+            chunk = chunk[missing:]
+        data = self._pending + chunk
+        aligned = len(data) - len(data) % 3
+        if aligned:
+            self._file.write(base64.b64encode(data[:aligned]))
+        self._pending = data[aligned:]
+
+    def finish(self, info):
+        """
+        Flushes remaining data, stores the final header and moves the replay
+        into place. Returns the replay filename.
+        """
+        self._add_compressed(self._compressor.flush())
+        self._file.write(base64.b64encode(self._pending))
+        self._pending = b''
+
+        self._file.seek(self._header_slot)
+        prefix = struct.pack(">I", self._raw_size) + self._zlib_head
+        self._file.write(base64.b64encode(prefix))
+
+        header = self._encode_header(info)
+        if len(header) < self._header_slot:
+            self._write_header_slot(header)
+            self._file.close()
+            os.replace(self._tempname, self.filename)
+        else:
+            self._rewrite_with_header(header)
+        return self.filename
+
+    def _rewrite_with_header(self, header):
+        logger.info("Replay header outgrew its slot, rewriting replay file")
+        self._file.seek(self._header_slot)
+        with open(self.filename, "wb") as replay:
+            replay.write(header + b'\n')
+            shutil.copyfileobj(self._file, replay)
+        self._file.close()
+        os.remove(self._tempname)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tempname)
+        except OSError:
+            pass
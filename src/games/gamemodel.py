@@ -1,35 +1,65 @@
-from PyQt5.QtCore import Qt, QSortFilterProxyModel
 from .gamemodelitem import GameModelItem
 from enum import Enum
 
+from fa import maps
 from games.moditem import mod_invisible
 from model.game import GameState
 from util.qt_list_model import QtListModel
+from util.sort_key_model import SortKeyFilterModel
 
 
 class GameModel(QtListModel):
-    def __init__(self, me, preview_dler, gameset=None):
+    def __init__(self, me, preview_dler, gameset=None, playerset=None):
         builder = GameModelItem.builder(me, preview_dler)
         QtListModel.__init__(self, builder)
 
+        # One connection for all games, since the cache outlives them
+        maps.preview_cache.preview_ready.connect(self._at_preview_ready)
+
+        # Games look up their host by login, so the host can connect or
+        # leave without the game changing
+        self._playerset = playerset
+        if self._playerset is not None:
+            self._playerset.added.connect(self._at_player_changed)
+            self._playerset.batch_added.connect(self._at_players_changed)
+            self._playerset.removed.connect(self._at_player_changed)
+
         self._gameset = gameset
         if self._gameset is not None:
             self._gameset.added.connect(self.add_game)
+            self._gameset.batch_added.connect(self.add_games)
             self._gameset.newClosedGame.connect(self.remove_game)
-            for game in self._gameset.values():
-                self.add_game(game)
+            self.add_games(self._gameset.values())
 
     def add_game(self, game):
         self._add_item(game, game.uid)
 
+    def add_games(self, games):
+        self._add_items((game, game.uid) for game in games)
+
     def remove_game(self, game):
         self._remove_item(game.uid)
 
     def clear_games(self):
         self._clear_items()
 
+    def _at_preview_ready(self, mapname):
+        for item in self._itemlist:
+            game = item.game
+            if game.mapname is not None and game.mapname.lower() == mapname:
+                item.preview_ready()
+
+    def _at_player_changed(self, player):
+        self._at_players_changed([player])
+
+    def _at_players_changed(self, players):
+        logins = {p.login for p in players}
+        for item in self._itemlist:
+            if item.game.host in logins:
+                item.host_connection_changed()
 
-class GameSortModel(QSortFilterProxyModel):
+
+class GameSortModel(SortKeyFilterModel):
     class SortType(Enum):
         PLAYER_NUMBER = 0
         AVERAGE_RATING = 1
@@ -38,48 +68,34 @@ class GameSortModel(QSortFilterProxyModel):
         AGE = 4
 
     def __init__(self, me, model):
-        QSortFilterProxyModel.__init__(self)
+        SortKeyFilterModel.__init__(self)
         self._sort_type = self.SortType.AGE
         self._me = me
         self.setSourceModel(model)
         self.sort(0)
 
-    def lessThan(self, leftIndex, rightIndex):
-        left = self.sourceModel().data(leftIndex, Qt.DisplayRole).game
-        right = self.sourceModel().data(rightIndex, Qt.DisplayRole).game
-
-        comp_list = [self._lt_friend, self._lt_type, self._lt_fallback]
-
-        for lt in comp_list:
-            if lt(left, right):
-                return True
-            elif lt(right, left):
-                return False
-        return False
+    def sort_key(self, item):
+        game = item.game
+        # Games hosted by friends go first, then by sort type, then by age
+        host = game.host_player
+        hostid = -1 if host is None else host.id
+        friend = 0 if self._me.relations.model.is_friend(hostid) else 1
+        return (friend, self._type_key(game), game.uid)
 
-    def _lt_friend(self, left, right):
-        hostl = -1 if left.host_player is None else left.host_player.id
-        hostr = -1 if right.host_player is None else right.host_player.id
-        return (self._me.relations.model.is_friend(hostl) and
-                not self._me.relations.model.is_friend(hostr))
-
-    def _lt_type(self, left, right):
+    def _type_key(self, game):
         stype = self._sort_type
         stypes = self.SortType
 
         if stype == stypes.PLAYER_NUMBER:
-            return len(left.players) > len(right.players)
+            return -len(game.players)
         elif stype == stypes.AVERAGE_RATING:
-            return left.average_rating > right.average_rating
+            return -game.average_rating
         elif stype == stypes.MAPNAME:
-            return left.mapdisplayname.lower() < right.mapdisplayname.lower()
+            return game.mapdisplayname.lower()
         elif stype == stypes.HOSTNAME:
-            return left.host.lower() < right.host.lower()
+            return game.host.lower()
         elif stype == stypes.AGE:
-            return left.uid < right.uid
-
-    def _lt_fallback(self, left, right):
-        return left.uid < right.uid
+            return game.uid
 
     @property
     def sort_type(self):
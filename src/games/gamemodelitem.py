@@ -15,6 +15,13 @@ class GameModelItem(QObject):
 
         self.game = game
         self.game.updated.connect(self._game_updated)
+        self.game.ingamePlayerAdded.connect(self._ingame_player_added)
+        self.game.ingamePlayerRemoved.connect(self._ingame_player_removed)
+        # Ratings of players in the game go into its average rating
+        self._rated_players = set()
+        for name in self.game.players:
+            if self.game.is_ingame(name):
+                self._track_rating(self.game.to_player(name))
         self._me = me
         self._me.relations.trackers.players.updated.connect(
                 self._host_relation_changed)
@@ -33,6 +40,29 @@ class GameModelItem(QObject):
         self.updated.emit(self)
         self._download_preview_if_needed()
 
+    def _ingame_player_added(self, game, player):
+        self._track_rating(player)
+        self.updated.emit(self)
+
+    def _ingame_player_removed(self, game, player):
+        if player in self._rated_players:
+            self._rated_players.remove(player)
+            player.updated.disconnect(self._player_updated)
+        self.updated.emit(self)
+
+    def _track_rating(self, player):
+        if player in self._rated_players:
+            return
+        self._rated_players.add(player)
+        player.updated.connect(self._player_updated)
+
+    def _player_updated(self, player, old):
+        if "global_rating" in old.changed:
+            self.updated.emit(self)
+
+    def host_connection_changed(self):
+        self.updated.emit(self)
+
     def _host_relation_changed(self):
         # This should never happen bar server screwups.
         if self.game.host_player is None:
@@ -43,10 +73,14 @@ class GameModelItem(QObject):
         if self.game.mapname is None:
             return
         name = self.game.mapname.lower()
-        if self.game.password_protected or maps.preview(name) is not None:
+        if (self.game.password_protected
+                or maps.preview_cache.path(name) is not None):
             return
         self._preview_dler.download_preview(name, self._preview_dl_request)
 
     def _at_preview_downloaded(self, mapname):
-        if mapname == self.game.mapname:
+        if self.game.mapname is not None and mapname == self.game.mapname.lower():
             self.updated.emit(self)
+
+    def preview_ready(self):
+        self.updated.emit(self)
@@ -26,39 +26,81 @@ class ChannelID:
 
 
 class Lines(QObject):
+    """
+    Chat lines of a channel, oldest first.
+
+    Lines are kept in a ring buffer, so removing old lines only moves the
+    start of the buffer instead of shifting all remaining lines. The buffer
+    doubles when it fills up, which stops happening once the controller
+    keeps the number of lines bounded.
+    """
     added = pyqtSignal()
     removed = pyqtSignal(int)
 
+    INITIAL_CAPACITY = 64
+
     def __init__(self):
         QObject.__init__(self)
-        self._lines = []
+        self._buffer = [None] * self.INITIAL_CAPACITY
+        self._start = 0
+        self._count = 0
 
     def add_line(self, line):
-        self._lines.append(line)
+        if self._count == len(self._buffer):
+            self._grow()
+        end = (self._start + self._count) % len(self._buffer)
+        self._buffer[end] = line
+        self._count += 1
         self.added.emit()
 
+    def _grow(self):
+        lines = list(self)
+        self._buffer = lines + [None] * len(lines)
+        self._start = 0
+
     def remove_lines(self, number):
         number = min(number, len(self))
         if number < 0:
             raise ValueError
         if number == 0:
             return
-        del self._lines[0:number]
+        capacity = len(self._buffer)
+        end = self._start + number
+        # Drop references to removed lines
+        if end <= capacity:
+            self._buffer[self._start:end] = [None] * number
+        else:
+            self._buffer[self._start:] = [None] * (capacity - self._start)
+            self._buffer[:end - capacity] = [None] * (end - capacity)
+        self._start = end % capacity
+        self._count -= number
         self.removed.emit(number)
 
     def __getitem__(self, n):
-        return self._lines[n]
+        if n < 0:
+            n += self._count
+        if not 0 <= n < self._count:
+            raise IndexError("line index out of range")
+        return self._buffer[(self._start + n) % len(self._buffer)]
 
     def __iter__(self):
-        return iter(self._lines)
+        end = self._start + self._count
+        capacity = len(self._buffer)
+        if end <= capacity:
+            return iter(self._buffer[self._start:end])
+        return iter(self._buffer[self._start:] + self._buffer[:end - capacity])
 
     def __len__(self):
-        return len(self._lines)
+        return self._count
 
 
 class Channel(ModelItem):
-    added_chatter = pyqtSignal(object)
-    removed_chatter = pyqtSignal(object)
+    """
+    Chatters joining and leaving are reported in batches, with lists of
+    their ChannelChatters.
+    """
+    added_chatters = pyqtSignal(object)
+    removed_chatters = pyqtSignal(object)
 
     def __init__(self, id_, lines, topic, is_base=False):
         ModelItem.__init__(self)
@@ -90,9 +132,9 @@ class Channel(ModelItem):
     @transactional
     def add_chatter(self, cc, _transaction=None):
         self.chatters[cc.id_key] = cc
-        _transaction.emit(self.added_chatter, cc)
+        _transaction.emit_batched(self.added_chatters, self, [cc])
 
     @transactional
     def remove_chatter(self, cc, _transaction=None):
         del self.chatters[cc.id_key]
-        _transaction.emit(self.removed_chatter, cc)
+        _transaction.emit_batched(self.removed_chatters, self, [cc])
@@ -8,7 +8,7 @@ import html
 import string
 
 from model.transaction import transactional
-from model.modelitem import ModelItem
+from model.modelitem import ModelItem, ItemSnapshot
 from util.gameurl import GameUrl, GameUrlType
 
 class GameState(Enum):
@@ -100,13 +100,16 @@ class Game(ModelItem):
         old.has_live_replay = self.has_live_replay
         return old
 
+    def snapshot(self, changed=frozenset()):
+        return GameSnapshot(self, changed)
+
     @transactional
     def update(self, **kwargs):
         if self._aborted:
             return
 
         _transaction = kwargs.pop("_transaction")
-        old = self.copy()
+        old = self.snapshot(self.changed_fields(kwargs))
         ModelItem.update(self, **kwargs)
         self._check_live_replay_timer()
         self.emit_update(old, _transaction)
@@ -141,7 +144,7 @@ class Game(ModelItem):
         if self.closed():
             return
 
-        old = self.copy()
+        old = self.snapshot(self.changed_fields({"state": GameState.CLOSED}))
         self.state = GameState.CLOSED
         self._aborted = True
         self.emit_update(old, _transaction)
@@ -243,6 +246,32 @@ class Game(ModelItem):
         return pretty
 
 
+class GameSnapshot(ItemSnapshot):
+    """
+    Game state from before an update. Has the game helpers that only depend
+    on game fields.
+    """
+    __slots__ = ("uid", "_aborted", "has_live_replay")
+
+    def __init__(self, game, changed=frozenset()):
+        ItemSnapshot.__init__(self, game, changed)
+        self.uid = game.uid
+        self._aborted = game._aborted
+        self.has_live_replay = game.has_live_replay
+
+    @property
+    def id_key(self):
+        return self.uid
+
+    OBSERVER_TEAMS = Game.OBSERVER_TEAMS
+    closed = Game.closed
+    players = Game.players
+    observers = Game.observers
+    playing_teams = Game.playing_teams
+    playing_players = Game.playing_players
+    mapdisplayname = Game.mapdisplayname
+
+
 def message_to_game_args(m):
     # FIXME - this should be fixed on the server
     if 'featured_mod' in m and m["featured_mod"] == "coop":
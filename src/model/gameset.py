@@ -103,6 +103,8 @@ class PlayerGameIndex:
             self._remove_relation(p, game, _transaction)
 
     def _at_game_update(self, new, old, _transaction=None):
+        if "teams" not in old.changed and new.closed() == old.closed():
+            return
         news = set() if new.closed() else set(new.players)
         olds = set() if old.closed() else set(old.players)
         removed = olds - news
@@ -1,8 +1,46 @@
+import copy
+
 from model.qobjectmapping import QObject
 from PyQt5.QtCore import pyqtSignal
 from model.transaction import transactional
 
 
+class ItemSnapshot:
+    """
+    Read-only record of a model item's fields from before an update, handed
+    to update listeners as 'old'. Field values live in a tuple that shares
+    the field index of the item, so taking one is cheap. 'changed' holds
+    names of fields that the update actually changed.
+    """
+    __slots__ = ("_index", "_values", "changed")
+
+    def __init__(self, item, changed=frozenset()):
+        self._index = item._field_index
+        self._values = tuple(getattr(item, f) for f in item._data_fields)
+        self.changed = changed
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def field_dict(self):
+        return {f: self._values[i] for f, i in self._index.items()}
+
+    def merged(self, later):
+        """
+        Combines this snapshot with one taken later, for when listeners get
+        only one update for both.
+        """
+        snapshot = copy.copy(self)
+        snapshot.changed = self.changed | later.changed
+        return snapshot
+
+
 class ModelItem(QObject):
     updated = pyqtSignal(object, object)
     before_updated = pyqtSignal(object, object, object)
@@ -10,8 +48,10 @@ class ModelItem(QObject):
     def __init__(self):
         QObject.__init__(self)
         self._data_fields = []
+        self._field_index = {}
 
     def add_field(self, name, default):
+        self._field_index[name] = len(self._data_fields)
         self._data_fields.append(name)
         setattr(self, name, default)
 
@@ -22,6 +62,13 @@ class ModelItem(QObject):
     def copy(self):
         raise NotImplementedError
 
+    def snapshot(self, changed=frozenset()):
+        return ItemSnapshot(self, changed)
+
+    def changed_fields(self, kwargs):
+        return frozenset(f for f, v in kwargs.items()
+                         if f in self._field_index and getattr(self, f) != v)
+
     def update(self, **kwargs):
         # Ignore unknown fields for convenience
         for f in self._data_fields:
@@ -30,7 +77,7 @@ class ModelItem(QObject):
 
     @transactional
     def emit_update(self, old, _transaction=None):
-        _transaction.emit(self.updated, self, old)
+        _transaction.emit_update(self.updated, self, old)
         self.before_updated.emit(self, old, _transaction)
 
     @property
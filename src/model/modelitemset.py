@@ -4,7 +4,13 @@ from model.transaction import transactional
 
 
 class ModelItemSet(QObjectMapping):
+    """
+    Items added with set_items are reported with a single batch_added signal
+    carrying a list of them, instead of an added signal for each one. Views
+    listening to added should listen to batch_added too.
+    """
     added = pyqtSignal(object)
+    batch_added = pyqtSignal(object)
     removed = pyqtSignal(object)
     before_added = pyqtSignal(object, object)
     before_removed = pyqtSignal(object, object)
@@ -13,6 +19,7 @@ class ModelItemSet(QObjectMapping):
         QObjectMapping.__init__(self)
 
         self._items = {}
+        self._batch = None
 
     def __getitem__(self, item):
         return self._items[item]
@@ -24,7 +31,10 @@ class ModelItemSet(QObjectMapping):
         return iter(self._items)
 
     def emit_added(self, value, _transaction=None):
-        _transaction.emit(self.added, value)
+        if self._batch is not None:
+            self._batch.append(value)
+        else:
+            _transaction.emit(self.added, value)
         self.before_added.emit(value, _transaction)
 
     def emit_removed(self, value, _transaction=None):
@@ -39,6 +49,26 @@ class ModelItemSet(QObjectMapping):
             raise ValueError
         self._items[key] = value
 
+    @transactional
+    def set_items(self, values, _transaction=None):
+        """
+        Adds many items in one go. Items that can't be added are skipped.
+        Returns the list of added items.
+        """
+        self._batch = []
+        try:
+            for value in values:
+                try:
+                    self.set_item(value.id_key, value, _transaction)
+                except ValueError:
+                    pass
+            batch = self._batch
+        finally:
+            self._batch = None
+        if batch:
+            _transaction.emit(self.batch_added, batch)
+        return batch
+
     def __setitem__(self, key, value):
         # CAVEAT: use only as an entry point for model changes.
         self.set_item(key, value)
@@ -1,6 +1,6 @@
 from PyQt5.QtCore import pyqtSignal
 from model.transaction import transactional
-from model.modelitem import ModelItem
+from model.modelitem import ModelItem, ItemSnapshot
 
 
 class Player(ModelItem):
@@ -48,11 +48,14 @@ class Player(ModelItem):
         p.currentGame = self.currentGame
         return p
 
+    def snapshot(self, changed=frozenset()):
+        return PlayerSnapshot(self, changed)
+
     @transactional
     def update(self, **kwargs):
         _transaction = kwargs.pop("_transaction")
 
-        old_data = self.copy()
+        old_data = self.snapshot(self.changed_fields(kwargs))
         ModelItem.update(self, **kwargs)
         self.emit_update(old_data, _transaction)
 
@@ -123,3 +126,24 @@ class Player(ModelItem):
     def currentGame(self, val):
         # CAVEAT: this will emit signals immediately!
         self.set_currentGame(val)
+
+
+class PlayerSnapshot(ItemSnapshot):
+    """
+    Player state from before an update.
+    """
+    __slots__ = ("id", "login", "currentGame")
+
+    def __init__(self, player, changed=frozenset()):
+        ItemSnapshot.__init__(self, player, changed)
+        self.id = player.id
+        self.login = player.login
+        self.currentGame = player.currentGame
+
+    @property
+    def id_key(self):
+        return self.id
+
+    rating_estimate = Player.rating_estimate
+    rounded_rating_estimate = Player.rounded_rating_estimate
+    ladder_estimate = Player.ladder_estimate
@@ -1,18 +1,121 @@
+from PyQt5.QtCore import QObject, QTimer
+
+
+# Key of batched signals in a transaction's signal list
+_BATCH = object()
+
+
 class ModelTransaction:
     """
     Allows model classes to postpone side effects of a model update (such as
     emitting signals) until after the model is in a consistent state.
+
+    A coalescing transaction emits only one update signal per item - later
+    updates of an item replace earlier ones, and listeners get the item state
+    from before the first of them. A transaction with a scheduler hands its
+    signals over to the scheduler instead of emitting them.
+
+    Batched signals carry a list of items. Items an object batches one after
+    another are emitted in one list; batching a different signal of the same
+    object starts a new list, so that listeners see changes in order.
     """
-    def __init__(self):
+    def __init__(self, coalesce=False, scheduler=None):
         self._signals = []
+        self._coalesce = coalesce
+        self._scheduler = scheduler
+        self._update_pos = {}
+        self._batch_pos = {}
 
     def emit(self, *args):
-        self._signals.append(args)
+        self._signals.append((None, args))
+
+    def emit_batched(self, signal, owner, items):
+        pos = self._batch_pos.get(id(owner))
+        if pos is not None:
+            _, (batch_signal, _, batch) = self._signals[pos]
+            if batch_signal == signal:
+                batch.extend(items)
+                return
+        self._batch_pos[id(owner)] = len(self._signals)
+        # The owner is kept so that its id isn't reused by another object
+        self._signals.append((_BATCH, (signal, owner, list(items))))
+
+    def emit_update(self, signal, item, old):
+        if not self._coalesce:
+            self._signals.append((None, (signal, item, old)))
+            return
+
+        key = (id(item), signal.signal)
+        pos = self._update_pos.get(key)
+        if pos is None:
+            self._update_pos[key] = len(self._signals)
+            self._signals.append((key, (signal, item, old)))
+            return
+
+        _, (_, _, first_old) = self._signals[pos]
+        self._signals[pos] = (key, (signal, item, _merge_old(first_old, old)))
 
     def finalize(self):
-        for s in self._signals:
-            s[0].emit(*s[1:])
+        signals = self._signals
         self._signals = []
+        self._update_pos = {}
+        self._batch_pos = {}
+        if self._scheduler is not None:
+            self._scheduler.schedule(signals)
+            return
+        for key, s in signals:
+            if key is _BATCH:
+                signal, _, items = s
+                signal.emit(items)
+            else:
+                s[0].emit(*s[1:])
+
+
+def _merge_old(first, later):
+    # Snapshots know which fields changed, so remember changes from both
+    if hasattr(first, "merged"):
+        return first.merged(later)
+    return first
+
+
+class TransactionScheduler(QObject):
+    """
+    Collects signals from its transactions and emits them at most once per
+    frame, coalescing item updates in between. Good for bursts of updates
+    from the server, where views only care about the latest state.
+
+    The model itself is updated immediately - only signals are deferred, and
+    they keep their order.
+    """
+    FRAME_MS = 16
+
+    def __init__(self, interval=FRAME_MS):
+        QObject.__init__(self)
+        self._pending = ModelTransaction(coalesce=True)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+
+    def transaction(self):
+        return ModelTransaction(coalesce=True, scheduler=self)
+
+    def schedule(self, signals):
+        if not signals:
+            return
+        for key, s in signals:
+            if key is None:
+                self._pending.emit(*s)
+            elif key is _BATCH:
+                self._pending.emit_batched(*s)
+            else:
+                self._pending.emit_update(*s)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        self._timer.stop()
+        self._pending.finalize()
 
 
 # An easy way for a function to create a transaction if it's called without one
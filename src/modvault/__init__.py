@@ -96,6 +96,11 @@ class ModVault(FormClass, BaseClass, BusyWidget):
         self.mods = {}
         self.uids = [mod.uid for mod in getInstalledMods()]
 
+        # Zipped mods are verified in the background once the tab is opened
+        self.zipChecker = ZippedModChecker()
+        self.zipChecker.checked.connect(self.zipChecked)
+        self.zipsChecked = False
+
     @QtCore.pyqtSlot(dict)
     def modInfo(self, message):  # this is called when the database has send a mod to us
         """
@@ -199,6 +204,19 @@ class ModVault(FormClass, BaseClass, BusyWidget):
     @QtCore.pyqtSlot()
     def busy_entered(self):
         self.client.lobby_connection.send(dict(command="modvault", type="start"))
+        if not self.zipsChecked:
+            self.zipsChecked = True
+            self.zipChecker.checkInstalledMods()
+
+    @QtCore.pyqtSlot(str, object)
+    def zipChecked(self, path, bad):
+        if bad is None:
+            return
+        logger.warning("Zipped mod %s is corrupt (%s), ignoring it"
+                       % (path, bad))
+        forgetCorruptZip(path)
+        self.uids = [m.uid for m in installedMods]
+        self.updateVisibilities()
 
     def updateVisibilities(self):
         logger.debug("Updating visibilities with sort '%s' and visibility '%s'" % (self.sortType, self.showType))
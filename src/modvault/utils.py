@@ -3,6 +3,7 @@ import sys
 import urllib.request, urllib.error, urllib.parse
 import re
 import shutil
+import json
 
 from PyQt5 import QtCore, QtWidgets, QtGui
 
@@ -14,6 +15,7 @@ import warnings
 
 import io
 import zipfile
+import zlib
 from config import Settings
 from downloadManager import FileDownload
 from vault.dialogs import VaultDownloadDialog, downloadVaultAsset
@@ -72,6 +74,7 @@ def getAllModFolders():  # returns a list of names of installed mods
 
 def getInstalledMods():
     installedMods[:] = []
+    zips = []
     for f in getAllModFolders():
         m = None
         if os.path.isdir(os.path.join(MODFOLDER, f)):
@@ -80,12 +83,14 @@ def getInstalledMods():
             except:
                 continue
         else:
+            zips.append(os.path.join(MODFOLDER, f))
             try:
                 m = getModInfoFromZip(f)
             except:
                 continue
         if m:
             installedMods.append(m)
+    zippedModCache.save(keep=zips)
     logger.debug("getting installed mods. Count: %d" % len(installedMods))
     return installedMods
 
@@ -150,33 +155,121 @@ def parseModInfo(folder):
     modinfofile = luaparser.luaParser(os.path.join(folder,"mod_info.lua"))
     return getModInfo(modinfofile)
 
+
 modCache = {}
 
 
+class ZippedModCache(object):
+    """
+    mod_info.lua contents of zipped mods, saved to a file between runs.
+
+    Entries are keyed by the zip's path and only used while its size and
+    modification time stay the same. Zips without a usable mod_info.lua are
+    remembered too, so that they aren't read again on every scan.
+    """
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file):
+        self._cache_file = cache_file
+        # path -> [size, mtime, mod info dict or None]
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        self._entries = {}
+        try:
+            with open(self._cache_file, "rt") as fh:
+                data = json.load(fh)
+            if data.get("version") == self.CACHE_VERSION:
+                self._entries = data["mods"]
+        except (IOError, ValueError, KeyError, AttributeError):
+            logger.info("Zipped mod cache unavailable, rebuilding it")
+
+    def get(self, path, stat):
+        """
+        Returns (found, mod info) for the zip at path with the given stat
+        result.
+        """
+        if self._entries is None:
+            self._load()
+        entry = self._entries.get(path)
+        if entry is None or entry[:2] != [stat.st_size, stat.st_mtime]:
+            return False, None
+        return True, entry[2]
+
+    def set(self, path, stat, info):
+        if self._entries is None:
+            self._load()
+        self._entries[path] = [stat.st_size, stat.st_mtime, info]
+        self._dirty = True
+
+    def save(self, keep=None):
+        """
+        Saves the cache if it changed. If keep is given, forgets zips not in
+        it.
+        """
+        if self._entries is None:
+            return
+        if keep is not None:
+            keep = set(keep)
+            for path in [p for p in self._entries if p not in keep]:
+                del self._entries[path]
+                self._dirty = True
+        if not self._dirty:
+            return
+        tmp_file = self._cache_file + ".tmp"
+        try:
+            with open(tmp_file, "wt") as fh:
+                json.dump({"version": self.CACHE_VERSION,
+                           "mods": self._entries}, fh)
+            os.replace(tmp_file, self._cache_file)
+            self._dirty = False
+        except (IOError, OSError):
+            logger.warning("Failed to save zipped mod cache", exc_info=True)
+
+
+zippedModCache = ZippedModCache(os.path.join(util.CACHE_DIR,
+                                             "zipped_mods.json"))
+
+
+def readModInfoFromZip(path):
+    """
+    Parses mod_info.lua of a zipped mod. Only reads the zip's central
+    directory and that one file, the archive isn't verified - see
+    ZippedModChecker for that. Returns the mod info dict, or None if there's
+    no usable mod_info.lua.
+    """
+    with zipfile.ZipFile(path, "r") as zip:
+        for member in zip.namelist():
+            if os.path.basename(member) == "mod_info.lua":
+                break
+        else:
+            return None
+        modinfofile = luaparser.luaParser(member)
+        modinfofile.iszip = True
+        modinfofile.zip = zip
+        r = getModInfo(modinfofile)
+    if r is None or r[0].error:
+        return None
+    return r[1]
+
+
 def getModInfoFromZip(zfile):
     """get the mod info from a zip file"""
     if zfile in modCache:
         return modCache[zfile]
 
-    r = None
-    if zipfile.is_zipfile(os.path.join(MODFOLDER, zfile)):
-        zip = zipfile.ZipFile(os.path.join(MODFOLDER,zfile), "r", zipfile.ZIP_DEFLATED)
-        if zip.testzip() is None:
-            for member in zip.namelist():
-                filename = os.path.basename(member)
-                if not filename:
-                    continue
-                if filename == "mod_info.lua":
-                    modinfofile = luaparser.luaParser("mod_info.lua")
-                    modinfofile.iszip = True
-                    modinfofile.zip = zip
-                    r = getModInfo(modinfofile)
-    if r is None:
-        logger.debug("mod_info.lua not found in zip file %s" % zfile)
-        return None
-    f, info = r
-    if f.error:
-        logger.debug("Error in parsing mod_info.lua in %s" % zfile)
+    path = os.path.join(MODFOLDER, zfile)
+    stat = os.stat(path)
+    found, info = zippedModCache.get(path, stat)
+    if not found:
+        try:
+            info = readModInfoFromZip(path)
+        except zipfile.BadZipFile:
+            info = None
+        zippedModCache.set(path, stat, info)
+    if info is None:
+        logger.debug("No valid mod_info.lua in zip file %s" % zfile)
         return None
     m = ModInfo(**info)
     m.setFolder(zfile)
@@ -185,6 +278,90 @@ def getModInfoFromZip(zfile):
     return m
 
 
+def checkZip(path):
+    """
+    Decompresses and CRC-checks every file in a zip. Returns the name of the
+    first corrupt one, or None.
+    """
+    with zipfile.ZipFile(path, "r") as zip:
+        for info in zip.infolist():
+            try:
+                with zip.open(info) as fh:
+                    while fh.read(1 << 20):
+                        pass
+            except (zipfile.BadZipFile, zlib.error, EOFError):
+                return info.filename
+    return None
+
+
+class _ZipCheckSignals(QtCore.QObject):
+    checked = QtCore.pyqtSignal(str, object)
+
+
+class _CheckZip(QtCore.QRunnable):
+    def __init__(self, signals, path):
+        QtCore.QRunnable.__init__(self)
+        self._signals = signals
+        self._path = path
+
+    def run(self):
+        try:
+            bad = checkZip(self._path)
+        except Exception:
+            logger.info("Failed to check " + self._path, exc_info=True)
+            bad = os.path.basename(self._path)
+        self._signals.checked.emit(self._path, bad)
+
+
+class ZippedModChecker(QtCore.QObject):
+    """
+    Verifies zipped mods by decompressing and CRC-checking all their files
+    on a worker thread. That takes a while for big mods, so scanning
+    installed mods doesn't do it - it has to be asked for with check().
+
+    Emits checked with the zip's path and the name of its first corrupt
+    file, or the zip's own name if it can't be read at all, or None if the
+    zip is fine.
+    """
+    checked = QtCore.pyqtSignal(str, object)
+
+    def __init__(self):
+        QtCore.QObject.__init__(self)
+        self._signals = _ZipCheckSignals()
+        self._signals.checked.connect(self.checked)
+        # Not parented, deleting a pool waits for its workers
+        self._pool = QtCore.QThreadPool()
+        self._pool.setMaxThreadCount(1)
+
+    def check(self, path):
+        self._pool.start(_CheckZip(self._signals, path))
+
+    def checkInstalledMods(self):
+        """
+        Checks all installed zipped mods. Returns paths of the zips checked.
+        """
+        paths = [m.absfolder for m in installedMods
+                 if os.path.isfile(m.absfolder)]
+        for path in paths:
+            self.check(path)
+        return paths
+
+
+def forgetCorruptZip(path):
+    """
+    Drops a zipped mod ZippedModChecker found corrupt from the installed
+    mods. The zip is remembered as unusable until it changes, like zips
+    without a mod_info.lua.
+    """
+    try:
+        zippedModCache.set(path, os.stat(path), None)
+        zippedModCache.save()
+    except OSError:
+        pass
+    modCache.pop(os.path.basename(path), None)
+    installedMods[:] = [m for m in installedMods if m.absfolder != path]
+
+
 def getModInfoFromFolder(modfolder):  # modfolder must be local to MODFOLDER
     if modfolder in modCache:
         return modCache[modfolder]
@@ -7,11 +7,14 @@ import util
 import os
 import fa
 import time
+import html
 import client
-import json
-import jsonschema
 
 from replays.replayitem import ReplayItem, ReplayItemDelegate
+from replays.replayindex import LocalReplayIndex, ReplayStatus
+from replays.localreplaymodel import LocalReplayModel
+from replays.replayloader import ReplayHeaderLoader
+from replays.replaystats import ReplayStats
 from model.game import GameState
 from replays.connection import ReplaysConnection
 from downloadManager import DownloadRequest
@@ -253,224 +256,42 @@ class LiveReplaysWidgetHandler(object):
         del self.games[game]
 
 
-class ReplayMetadata:
-    def __init__(self, data):
-        self.raw_data = data
-        self.data = None
-        self.is_broken = False
-        self.is_incomplete = False
-
-        try:
-            self.data = json.loads(data)
-        except json.decoder.JSONDecodeError:
-            self.is_broken = True
-            return
-
-        self._validate_data()
-
-    # FIXME - this is what the widget uses so far, we should define this
-    # schema precisely in the future
-    def _validate_data(self):
-        if not isinstance(self.data, dict):
-            self.is_broken = True
-            return
-        if not self.data.get('complete', False):
-            self.is_incomplete = True
-            return
-
-        replay_schema = {
-            "type": "object",
-            "properties": {
-                "num_players": {"type": "number"},
-                "launched_at": {"type": "number"},
-                "game_time": {
-                    "type": "number",
-                    "minimum": 0
-                },
-                "mapname": {"type": "string"},
-                "title": {"type": "string"},
-                "teams": {
-                    "type": "object",
-                    "patternProperties": {
-                        ".*": {
-                            "type": "array",
-                            "items": {"type": "string"}
-                            }
-                        }
-                    },
-                "featured_mod": {"type": "string"}
-                },
-            "required": ["num_players", "mapname", "title", "teams",
-                         "featured_mod"]
-        }
-        try:
-            jsonschema.validate(self.data, replay_schema)
-        except jsonschema.ValidationError:
-            self.is_broken = True
-
-    def launch_time(self):
-        if 'launched_at' in self.data:
-            return self.data['launched_at']
-        elif 'game_time' in self.data:
-            return self.data['game_time']
-        else:
-            return time.time()  # FIXME
-
-
-class LocalReplayItem(QtWidgets.QTreeWidgetItem):
-    def __init__(self, replay_file, metadata=None):
-        QtWidgets.QTreeWidgetItem.__init__(self)
-        self._replay_file = replay_file
-        self._metadata = metadata
-        self._map_dl_request = DownloadRequest()
-        self._map_dl_request.done.connect(self._map_preview_downloaded)
-        self._setup_appearance()
-
-    def replay_path(self):
-        return os.path.join(util.REPLAY_DIR, self._replay_file)
-
-    def _setup_appearance(self):
-        if self._metadata is None:
-            self._setup_no_metadata_appearance()
-        elif self._metadata.is_broken:
-            self._setup_broken_appearance()
-        elif self._metadata.is_incomplete:
-            self._setup_incomplete_appearance()
-        else:
-            self._setup_complete_appearance()
-
-    def _setup_no_metadata_appearance(self):
-        self.setText(1, self._replay_file)
-        self.setIcon(0, util.THEME.icon("replays/replay.png"))
-        colors = client.instance.player_colors
-        self.setForeground(0, QtGui.QColor(colors.get_color("default")))
-
-    def _setup_broken_appearance(self):
-        self.setIcon(0, util.THEME.icon("replays/broken.png"))
-        self.setText(1, self._replay_file)
-        self.setForeground(1, QtGui.QColor("red"))   # FIXME: Needs to come from theme
-        self.setText(2, "(replay parse error)")
-        self.setForeground(2, QtGui.QColor("gray"))  # FIXME: Needs to come from theme
-
-    def _setup_incomplete_appearance(self):
-        self.setIcon(0, util.THEME.icon("replays/replay.png"))
-        self.setText(1, self._replay_file)
-        self.setText(2, "(replay doesn't have complete metadata)")
-        self.setForeground(1, QtGui.QColor("yellow"))  # FIXME: Needs to come from theme
-
-    def _setup_complete_appearance(self):
-        data = self._metadata.data
-        launch_time = time.localtime(self._metadata.launch_time())
-        try:
-            game_time = time.strftime("%H:%M", launch_time)
-        except ValueError:
-            game_time = "Unknown"
-
-        icon = fa.maps.preview(data['mapname'])
-        if icon:
-            self.setIcon(0, icon)
-        else:
-            dler = client.instance.map_downloader
-            dler.download_preview(data['mapname'], self._map_dl_request)
-            self.setIcon(0, util.THEME.icon("games/unknown_map.png"))
-
-        self.setToolTip(0, fa.maps.getDisplayName(data['mapname']))
-        self.setText(0, game_time)
-        self.setForeground(0, QtGui.QColor(client.instance.player_colors.get_color("default")))
-        self.setText(1, data['title'])
-        self.setToolTip(1, self._replay_file)
-
-        playerlist = []
-        for players in list(data['teams'].values()):
-            playerlist.extend(players)
-        self.setText(2, ", ".join(playerlist))
-        self.setToolTip(2, ", ".join(playerlist))
-
-        self.setText(3, data['featured_mod'])
-        self.setTextAlignment(3, QtCore.Qt.AlignCenter)
-
-    def replay_bucket(self):
-        if self._metadata is None:
-            return "legacy"
-        if self._metadata.is_broken:
-            return "broken"
-        if self._metadata.is_incomplete:
-            return "incomplete"
-        try:
-            t = time.localtime(self._metadata.launch_time())
-            return time.strftime("%Y-%m-%d", t)
-        except ValueError:
-            return "broken"
-
-    def _map_preview_downloaded(self):
-        self._setup_appearance()
-
-
-class LocalReplayBucketItem(QtWidgets.QTreeWidgetItem):
-    def __init__(self, kind, children):
-        QtWidgets.QTreeWidgetItem.__init__(self)
-        self._setup_appearance(kind, children)
-
-    def _setup_appearance(self, kind, children):
-        if kind == "broken":
-            self._setup_broken_appearance()
-        elif kind == "incomplete":
-            self._setup_incomplete_appearance()
-        elif kind == "legacy":
-            self._setup_legacy_appearance()
-        else:
-            self._setup_date_appearance()
-
-        self.setIcon(0, util.THEME.icon("replays/bucket.png"))
-        self.setText(0, kind)
-        self.setText(3, "{} replays".format(len(children)))
-        self.setForeground(3, QtGui.QColor(client.instance.player_colors.get_color("default")))
-
-        for item in children:
-            self.addChild(item)
-
-    def _setup_broken_appearance(self):
-        self.setForeground(0, QtGui.QColor("red"))  # FIXME: Needs to come from theme
-        self.setText(1, "(not watchable)")
-        self.setForeground(1, QtGui.QColor(client.instance.player_colors.get_color("default")))
-
-    def _setup_incomplete_appearance(self):
-        self.setForeground(0, QtGui.QColor("yellow"))  # FIXME: Needs to come from theme
-        self.setText(1, "(watchable)")
-        self.setForeground(1, QtGui.QColor(client.instance.player_colors.get_color("default")))
-
-    def _setup_legacy_appearance(self):
-        self.setForeground(0, QtGui.QColor(client.instance.player_colors.get_color("default")))
-        self.setForeground(1, QtGui.QColor(client.instance.player_colors.get_color("default")))
-        self.setText(1, "(old replay system)")
-
-    def _setup_date_appearance(self):
-        self.setForeground(0, QtGui.QColor(client.instance.player_colors.get_color("player")))
-
-
 class LocalReplaysWidgetHandler(object):
-    def __init__(self, myTree):
+    def __init__(self, myTree, progress, cancelButton):
         self.myTree = myTree
-        self.myTree.itemDoubleClicked.connect(self.myTreeDoubleClicked)
-        self.myTree.itemPressed.connect(self.myTreePressed)
+        self.myTree.doubleClicked.connect(self.myTreeDoubleClicked)
+        self.myTree.pressed.connect(self.myTreePressed)
+        self.myTree.collapsed.connect(self.myTreeCollapsed)
+        self.myTree.modification_time = 0
+
+        replay_index = os.path.join(util.CACHE_DIR, "local_replays.sqlite")
+        self.replay_index = LocalReplayIndex(util.REPLAY_DIR, replay_index)
+        self.model = LocalReplayModel(self.replay_index)
+        self.myTree.setModel(self.model)
+        # Statistics are built on first use and dropped when replays change
+        self.stats = None
+
+        # Replay headers are read in the background
+        self.progress = progress
+        self.cancelButton = cancelButton
+        self.cancelButton.clicked.connect(self.cancelLoading)
+        self.loader = ReplayHeaderLoader(util.REPLAY_DIR)
+        self.loader.batch_loaded.connect(self._replays_loaded)
+        self.loader.progress.connect(self._loading_progress)
+        self.loader.finished.connect(self._loading_finished)
+        self._loading_finished()
+
         self.myTree.header().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeToContents)
         self.myTree.header().setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeToContents)
         self.myTree.header().setSectionResizeMode(2, QtWidgets.QHeaderView.Stretch)
         self.myTree.header().setSectionResizeMode(3, QtWidgets.QHeaderView.ResizeToContents)
-        self.myTree.modification_time = 0
-
-        replay_cache = os.path.join(util.CACHE_DIR, "local_replays_metadata")
-        self.replay_files = LocalReplayMetadataCache(util.REPLAY_DIR,
-                                                     replay_cache)
 
-    def myTreePressed(self, item):
+    def myTreePressed(self, index):
         if QtWidgets.QApplication.mouseButtons() != QtCore.Qt.RightButton:
             return
 
-        if item.isDisabled():
-            return
-
-        if self.myTree.indexOfTopLevelItem(item) != -1:
+        path = self.model.replay_path(index)
+        if path is None:
             return
 
         menu = QtWidgets.QMenu(self.myTree)
@@ -484,102 +305,75 @@ class LocalReplaysWidgetHandler(object):
         menu.addAction(actionExplorer)
 
         # Triggers
-        actionReplay.triggered.connect(lambda: self.myTreeDoubleClicked(item))
-        actionExplorer.triggered.connect(lambda: util.showFileInFileBrowser(item.replay_path()))
+        actionReplay.triggered.connect(lambda: replay(path))
+        actionExplorer.triggered.connect(lambda: util.showFileInFileBrowser(path))
 
-        # Adding to menu
-        menu.addAction(actionReplay)
-        menu.addAction(actionExplorer)
+        record = self.model.record(index)
+        if record.status == ReplayStatus.COMPLETE:
+            actionStats = QtWidgets.QAction("Map Statistics", menu)
+            menu.addAction(actionStats)
+            actionStats.triggered.connect(lambda: self.showMapStats(record.mapname))
 
         # Finally: Show the popup
         menu.popup(QtGui.QCursor.pos())
 
-    def myTreeDoubleClicked(self, item):
-        if item.isDisabled():
-            return
+    def myTreeDoubleClicked(self, index):
+        path = self.model.replay_path(index)
+        if path is not None:
+            replay(path)
 
-        if self.myTree.indexOfTopLevelItem(item) == -1:
-            replay(item.replay_path())
+    def myTreeCollapsed(self, index):
+        self.model.release(index)
 
     def updatemyTree(self):
         modification_time = os.path.getmtime(util.REPLAY_DIR)
         if self.myTree.modification_time == modification_time:  # anything changed?
             return  # nothing changed -> don't redo
         self.myTree.modification_time = modification_time
-        self.myTree.clear()
-
-        # We put the replays into buckets by day first, then we add them to the treewidget.
-        buckets = {}
 
-        if not self.replay_files.cache_loaded:
-            self.replay_files.load_cache()
-
-        # Iterate
-        for infile in os.listdir(util.REPLAY_DIR):
-            if infile.endswith(".scfareplay"):
-                metadata = None
-            elif infile.endswith(".fafreplay"):
-                metadata = self.replay_files[infile]
-            else:
-                continue
-            item = LocalReplayItem(infile, metadata)
-            bucket = item.replay_bucket()
-            buckets.setdefault(bucket, [])
-            buckets[bucket].append(item)
-
-        self.replay_files.save_cache()
-        # Now, create a top level treeWidgetItem for every bucket, and put the bucket's contents into them
-        for bucket, items in buckets.items():
-            bucket_item = LocalReplayBucketItem(bucket, items)
-            self.myTree.addTopLevelItem(bucket_item)
-
-
-class LocalReplayMetadataCache:
-    CACHE_DIFF_THRESHOLD = 20
-
-    def __init__(self, cache_dir, cache_file):
-        self._cache_dir = cache_dir
-        self._cache_file = cache_file
-        self._cache = {}
-        self._new_cache_entries = set()
-        self._used_cache_entries = set()
-        self.cache_loaded = False
-
-    def load_cache(self):
-        if os.path.exists(self._cache_file):
-            with open(self._cache_file, "rt") as fh:
-                for line in fh:
-                    filename, metadata = line.split(':', 1)
-                    self._cache[filename] = ReplayMetadata(metadata)
-        self.cache_loaded = True
-
-    def save_cache(self):
-        if not self._cache_differs_much_from_files():
-            return
-        with open(self._cache_file, "wt") as fh:
-            for filename in self._used_cache_entries:
-                fh.write(filename + ":" + self._cache[filename].raw_data)
-
-    def _cache_differs_much_from_files(self):
-        new_entries = len(self._new_cache_entries)
-        all_entries = len(self._cache)
-        all_used_entries = len(self._used_cache_entries)
-        unused_entries = all_entries - all_used_entries
-        return new_entries + unused_entries > self.CACHE_DIFF_THRESHOLD
-
-    def __getitem__(self, filename):
-        if filename not in self._cache:
-            try:
-                target_file = os.path.join(self._cache_dir, filename)
-                with open(target_file, "rt") as fh:
-                    metadata = fh.readline()
-                    self._cache[filename] = ReplayMetadata(metadata)
-                self._new_cache_entries.add(filename)
-            except IOError:
-                raise KeyError
-
-        self._used_cache_entries.add(filename)
-        return self._cache[filename]
+        changed, removed = self.replay_index.scan()
+        self.replay_index.forget(removed)
+        self.model.update([], removed)
+        if removed:
+            self.stats = None
+        self.loader.load(changed)
+
+    def _replays_loaded(self, records):
+        added = self.replay_index.store(records)
+        self.model.update(added, [])
+        if added:
+            self.stats = None
+
+    def showMapStats(self, mapname):
+        if self.stats is None:
+            self.stats = ReplayStats.from_index(self.replay_index)
+        rows = self.stats.select(mapname=mapname)
+
+        def most_common(grouping, count):
+            counts = self.stats.count_by(grouping, rows).most_common(count)
+            return ", ".join("{} ({})".format(html.escape(name), n)
+                             for name, n in counts)
+
+        text = "<b>{}</b> local replays on <b>{}</b>".format(
+            len(rows), html.escape(fa.maps.getDisplayName(mapname)))
+        text += "<br/>Mods: " + most_common("featured_mod", 3)
+        text += "<br/>Players: " + most_common("player", 10)
+        QtWidgets.QMessageBox.information(self.myTree, "Map Statistics", text)
+
+    def _loading_progress(self, loaded, total):
+        self.progress.setMaximum(total)
+        self.progress.setValue(loaded)
+        self.progress.show()
+        self.cancelButton.show()
+
+    def _loading_finished(self):
+        self.progress.hide()
+        self.cancelButton.hide()
+
+    def cancelLoading(self):
+        self.loader.cancel()
+        # Make the next update look for replays we didn't get to
+        self.myTree.modification_time = 0
 
 
 class ReplayVaultWidgetHandler(object):
@@ -814,7 +608,7 @@ class ReplaysWidget(BaseClass, FormClass):
         self.setupUi(self)
 
         self.liveManager = LiveReplaysWidgetHandler(self.liveTree, client, gameset)
-        self.localManager = LocalReplaysWidgetHandler(self.myTree)
+        self.localManager = LocalReplaysWidgetHandler(self.myTree, self.myTreeProgress, self.myTreeCancelButton)
         self.vaultManager = ReplayVaultWidgetHandler(self, dispatcher, client, gameset, playerset)
 
         logger.info("Replays Widget instantiated.")
@@ -0,0 +1,357 @@
+from PyQt5 import QtCore, QtGui
+
+import bisect
+import os
+import time
+
+import client
+import fa
+import util
+from downloadManager import DownloadRequest
+from replays.replayindex import ReplayStatus, replay_bucket
+
+
+class LocalReplayBucket:
+    """
+    Replays from one day (or of one status). We keep cheap sort keys for all
+    of them, but full records only for the rows fetched into the view.
+    """
+    SPECIAL_ORDER = [ReplayStatus.INCOMPLETE, ReplayStatus.BROKEN,
+                     ReplayStatus.LEGACY]
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.keys = []          # Sorted (-launch_time, filename)
+        self.records = []       # Records of the first len(records) keys
+
+    @property
+    def sort_key(self):
+        if self.kind in self.SPECIAL_ORDER:
+            return (1, self.SPECIAL_ORDER.index(self.kind))
+        return (0, -int(self.kind.replace("-", "")))
+
+    @staticmethod
+    def entry_key(filename, launch_time):
+        return (-(launch_time or 0), filename)
+
+    @property
+    def fetched(self):
+        return len(self.records)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class LocalReplayModel(QtCore.QAbstractItemModel):
+    """
+    Tree model of local replays, grouped into buckets by day.
+
+    Buckets know only which replays they contain. Full replay records are
+    read from the index in batches when the view asks for more rows of an
+    expanded bucket, and dropped again when the bucket is collapsed. Map
+    previews are only looked up when a row is actually drawn.
+    """
+    COLUMNS = 4
+    FETCH_BATCH = 50
+
+    def __init__(self, replay_index):
+        QtCore.QAbstractItemModel.__init__(self)
+        self._index = replay_index
+        self._buckets = []
+        self._bucket_keys = []
+        self._bucket_of = {}    # filename -> (bucket, key)
+        self._map_icons = {}
+        self._map_dl_requests = {}
+        self._load_entries()
+
+    # Model updates
+
+    def _load_entries(self):
+        # Replays indexed in earlier sessions; nobody is watching yet, so we
+        # build the buckets in one go instead of row by row.
+        buckets = {}
+        for filename, status, launch_time in self._index.entries():
+            kind = replay_bucket(status, launch_time)
+            bucket = buckets.get(kind)
+            if bucket is None:
+                bucket = buckets[kind] = LocalReplayBucket(kind)
+            key = bucket.entry_key(filename, launch_time)
+            bucket.keys.append(key)
+            self._bucket_of[filename] = (bucket, key)
+        for bucket in buckets.values():
+            bucket.keys.sort()
+        self._buckets = sorted(buckets.values(), key=lambda b: b.sort_key)
+        self._bucket_keys = [bucket.sort_key for bucket in self._buckets]
+
+    def update(self, added, removed):
+        for filename in removed:
+            self._remove_replay(filename)
+        for filename, status, launch_time in self._index.entries(added):
+            self._add_replay(filename, status, launch_time)
+
+    def _add_replay(self, filename, status, launch_time):
+        bucket = self._bucket(replay_bucket(status, launch_time))
+        key = bucket.entry_key(filename, launch_time)
+        row = bisect.bisect(bucket.keys, key)
+        self._bucket_of[filename] = (bucket, key)
+
+        if row >= bucket.fetched:
+            bucket.keys.insert(row, key)
+            self._bucket_size_changed(bucket)
+            return
+        record, = self._index.records([filename])
+        parent = self._bucket_index(bucket)
+        self.beginInsertRows(parent, row, row)
+        bucket.keys.insert(row, key)
+        bucket.records.insert(row, record)
+        self.endInsertRows()
+        self._bucket_size_changed(bucket)
+
+    def _remove_replay(self, filename):
+        bucket, key = self._bucket_of.pop(filename, (None, None))
+        if bucket is None:
+            return
+        row = bisect.bisect_left(bucket.keys, key)
+        if row < bucket.fetched:
+            self.beginRemoveRows(self._bucket_index(bucket), row, row)
+            del bucket.keys[row]
+            del bucket.records[row]
+            self.endRemoveRows()
+        else:
+            del bucket.keys[row]
+
+        if not bucket.keys:
+            self._remove_bucket(bucket)
+        else:
+            self._bucket_size_changed(bucket)
+
+    def _bucket(self, kind):
+        for bucket in self._buckets:
+            if bucket.kind == kind:
+                return bucket
+        bucket = LocalReplayBucket(kind)
+        row = bisect.bisect(self._bucket_keys, bucket.sort_key)
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._buckets.insert(row, bucket)
+        self._bucket_keys.insert(row, bucket.sort_key)
+        self.endInsertRows()
+        return bucket
+
+    def _remove_bucket(self, bucket):
+        row = self._buckets.index(bucket)
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._buckets[row]
+        del self._bucket_keys[row]
+        self.endRemoveRows()
+
+    def _bucket_size_changed(self, bucket):
+        index = self._bucket_index(bucket, self.COLUMNS - 1)
+        self.dataChanged.emit(index, index)
+
+    def _bucket_index(self, bucket, column=0):
+        return self.index(self._buckets.index(bucket), column)
+
+    # Lazy loading
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return bool(self._buckets)
+        return parent.internalPointer() is None
+
+    def canFetchMore(self, parent):
+        bucket = self._bucket_at(parent)
+        return bucket is not None and bucket.fetched < len(bucket)
+
+    def fetchMore(self, parent):
+        bucket = self._bucket_at(parent)
+        if bucket is None:
+            return
+        start = bucket.fetched
+        keys = bucket.keys[start:start + self.FETCH_BATCH]
+        if not keys:
+            return
+        records = {r.filename: r for r in self._index.records(k[1] for k in keys)}
+        self.beginInsertRows(parent, start, start + len(keys) - 1)
+        bucket.records += [records[k[1]] for k in keys]
+        self.endInsertRows()
+
+    def release(self, parent):
+        """
+        Forgets fetched rows of a bucket, e.g. when it's collapsed.
+        """
+        bucket = self._bucket_at(parent)
+        if bucket is None or not bucket.fetched:
+            return
+        self.beginRemoveRows(parent, 0, bucket.fetched - 1)
+        bucket.records = []
+        self.endRemoveRows()
+
+    def _bucket_at(self, index):
+        if not index.isValid() or index.internalPointer() is not None:
+            return None
+        return self._buckets[index.row()]
+
+    # Structure
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QtCore.QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, None)
+        return self.createIndex(row, column, self._buckets[parent.row()])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        bucket = index.internalPointer()
+        if bucket is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(self._buckets.index(bucket), 0, None)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return len(self._buckets)
+        if parent.internalPointer() is not None or parent.column() != 0:
+            return 0
+        return self._buckets[parent.row()].fetched
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return self.COLUMNS
+
+    def record(self, index):
+        bucket = index.internalPointer() if index.isValid() else None
+        if bucket is None:
+            return None
+        return bucket.records[index.row()]
+
+    def replay_path(self, index):
+        record = self.record(index)
+        if record is None:
+            return None
+        return os.path.join(util.REPLAY_DIR, record.filename)
+
+    # Data
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        bucket = index.internalPointer()
+        if bucket is None:
+            return self._bucket_data(self._buckets[index.row()], index.column(), role)
+        return self._replay_data(bucket.records[index.row()], index.column(), role)
+
+    def _color(self, name):
+        return QtGui.QColor(client.instance.player_colors.get_color(name))
+
+    def _bucket_data(self, bucket, column, role):
+        kind = bucket.kind
+        if role == QtCore.Qt.DisplayRole:
+            if column == 0:
+                return kind
+            if column == 1:
+                return {
+                    ReplayStatus.BROKEN: "(not watchable)",
+                    ReplayStatus.INCOMPLETE: "(watchable)",
+                    ReplayStatus.LEGACY: "(old replay system)",
+                }.get(kind)
+            if column == 3:
+                return "{} replays".format(len(bucket))
+        elif role == QtCore.Qt.DecorationRole and column == 0:
+            return util.THEME.icon("replays/bucket.png")
+        elif role == QtCore.Qt.ForegroundRole:
+            if column == 0:
+                if kind == ReplayStatus.BROKEN:
+                    return QtGui.QColor("red")  # FIXME: Needs to come from theme
+                if kind == ReplayStatus.INCOMPLETE:
+                    return QtGui.QColor("yellow")  # FIXME: Needs to come from theme
+                if kind == ReplayStatus.LEGACY:
+                    return self._color("default")
+                return self._color("player")
+            return self._color("default")
+        return None
+
+    def _replay_data(self, record, column, role):
+        status = record.status
+        if status == ReplayStatus.COMPLETE:
+            return self._complete_replay_data(record, column, role)
+
+        if role == QtCore.Qt.DisplayRole:
+            if column == 1:
+                return record.filename
+            if column == 2 and status == ReplayStatus.BROKEN:
+                return "(replay parse error)"
+            if column == 2 and status == ReplayStatus.INCOMPLETE:
+                return "(replay doesn't have complete metadata)"
+        elif role == QtCore.Qt.DecorationRole and column == 0:
+            if status == ReplayStatus.BROKEN:
+                return util.THEME.icon("replays/broken.png")
+            return util.THEME.icon("replays/replay.png")
+        elif role == QtCore.Qt.ForegroundRole:
+            if status == ReplayStatus.LEGACY and column == 0:
+                return self._color("default")
+            if status == ReplayStatus.BROKEN and column == 1:
+                return QtGui.QColor("red")   # FIXME: Needs to come from theme
+            if status == ReplayStatus.BROKEN and column == 2:
+                return QtGui.QColor("gray")  # FIXME: Needs to come from theme
+            if status == ReplayStatus.INCOMPLETE and column == 1:
+                return QtGui.QColor("yellow")  # FIXME: Needs to come from theme
+        return None
+
+    def _complete_replay_data(self, record, column, role):
+        if role == QtCore.Qt.DisplayRole:
+            if column == 0:
+                try:
+                    return time.strftime("%H:%M", time.localtime(record.launch_time))
+                except ValueError:
+                    return "Unknown"
+            if column == 1:
+                return record.title
+            if column == 2:
+                return self._player_list(record)
+            if column == 3:
+                return record.featured_mod
+        elif role == QtCore.Qt.DecorationRole and column == 0:
+            return self._map_icon(record.mapname)
+        elif role == QtCore.Qt.ToolTipRole:
+            if column == 0:
+                return fa.maps.getDisplayName(record.mapname)
+            if column == 1:
+                return record.filename
+            if column == 2:
+                return self._player_list(record)
+        elif role == QtCore.Qt.ForegroundRole and column == 0:
+            return self._color("default")
+        elif role == QtCore.Qt.TextAlignmentRole and column == 3:
+            return QtCore.Qt.AlignCenter
+        return None
+
+    @staticmethod
+    def _player_list(record):
+        return ", ".join(name for team in record.teams.values() for name in team)
+
+    def _map_icon(self, mapname):
+        # Only called for rows the view draws
+        if mapname in self._map_icons:
+            return self._map_icons[mapname]
+        icon = fa.maps.preview(mapname)
+        if not icon:
+            request = DownloadRequest()
+            request.done.connect(self._map_preview_downloaded)
+            self._map_dl_requests[mapname] = request
+            client.instance.map_downloader.download_preview(mapname, request)
+            icon = util.THEME.icon("games/unknown_map.png")
+        self._map_icons[mapname] = icon
+        return icon
+
+    def _map_preview_downloaded(self, mapname, result):
+        self._map_dl_requests.pop(mapname, None)
+        path, is_local = result
+        self._map_icons[mapname] = util.THEME.icon(path, is_local)
+        for row, bucket in enumerate(self._buckets):
+            if not bucket.fetched:
+                continue
+            parent = self.index(row, 0)
+            rows = [i for i, r in enumerate(bucket.records) if r.mapname == mapname]
+            if rows:
+                self.dataChanged.emit(self.index(rows[0], 0, parent),
+                                      self.index(rows[-1], 0, parent))
@@ -0,0 +1,356 @@
+import collections
+import json
+import jsonschema
+import os
+import sqlite3
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# FIXME - this is what the widget uses so far, we should define this
+# schema precisely in the future
+REPLAY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "num_players": {"type": "number"},
+        "launched_at": {"type": "number"},
+        "game_time": {
+            "type": "number",
+            "minimum": 0
+        },
+        "mapname": {"type": "string"},
+        "title": {"type": "string"},
+        "teams": {
+            "type": "object",
+            "patternProperties": {
+                ".*": {
+                    "type": "array",
+                    "items": {"type": "string"}
+                    }
+                }
+            },
+        "featured_mod": {"type": "string"}
+        },
+    "required": ["num_players", "mapname", "title", "teams",
+                 "featured_mod"]
+}
+# Building a validator is much more expensive than running it
+REPLAY_VALIDATOR = jsonschema.Draft4Validator(REPLAY_SCHEMA)
+
+
+class ReplayMetadata:
+    def __init__(self, data):
+        self.raw_data = data
+        self.data = None
+        self.is_broken = False
+        self.is_incomplete = False
+
+        try:
+            self.data = json.loads(data)
+        except json.decoder.JSONDecodeError:
+            self.is_broken = True
+            return
+
+        self._validate_data()
+
+    def _validate_data(self):
+        if not isinstance(self.data, dict):
+            self.is_broken = True
+            return
+        if not self.data.get('complete', False):
+            self.is_incomplete = True
+            return
+
+        if not REPLAY_VALIDATOR.is_valid(self.data):
+            self.is_broken = True
+
+    def launch_time(self):
+        if 'launched_at' in self.data:
+            return self.data['launched_at']
+        elif 'game_time' in self.data:
+            return self.data['game_time']
+        else:
+            return time.time()  # FIXME
+
+    @property
+    def status(self):
+        if self.is_broken:
+            return ReplayStatus.BROKEN
+        if self.is_incomplete:
+            return ReplayStatus.INCOMPLETE
+        return ReplayStatus.COMPLETE
+
+
+class ReplayStatus:
+    LEGACY = "legacy"
+    BROKEN = "broken"
+    INCOMPLETE = "incomplete"
+    COMPLETE = "complete"
+
+
+# What the local replay list needs to know about a replay, without parsing
+# the replay header again.
+ReplayRecord = collections.namedtuple(
+    "ReplayRecord",
+    ["filename", "status", "launch_time", "mapname", "title",
+     "featured_mod", "teams"])
+
+
+def _replay_record(filename, status, launch_time=None, mapname=None,
+                   title=None, featured_mod=None, teams=None):
+    return ReplayRecord(filename, status, launch_time, mapname, title,
+                        featured_mod, teams if teams is not None else {})
+
+
+def replay_bucket(status, launch_time):
+    """
+    Local replays are grouped by day, or by status if they lack metadata.
+    """
+    if status != ReplayStatus.COMPLETE:
+        return status
+    try:
+        return time.strftime("%Y-%m-%d", time.localtime(launch_time))
+    except (ValueError, OverflowError, OSError):
+        return ReplayStatus.BROKEN
+
+
+def read_replay_header(path):
+    """
+    Reads the metadata header of a .fafreplay - its first line.
+    """
+    with open(path, "rt") as fh:
+        return fh.readline()
+
+
+def read_replay_record(replay_dir, filename):
+    """
+    Returns the record of a replay file, or None if it can't be read.
+    """
+    if filename.endswith(".scfareplay"):
+        return _replay_record(filename, ReplayStatus.LEGACY)
+    try:
+        header = read_replay_header(os.path.join(replay_dir, filename))
+    except (IOError, UnicodeDecodeError):
+        return None
+    return record_from_header(filename, header)
+
+
+def record_from_header(filename, header):
+    metadata = ReplayMetadata(header)
+    if metadata.status != ReplayStatus.COMPLETE:
+        return _replay_record(filename, metadata.status)
+    data = metadata.data
+    return _replay_record(filename, ReplayStatus.COMPLETE,
+                          metadata.launch_time(), data['mapname'],
+                          data['title'], data['featured_mod'],
+                          data['teams'])
+
+
+class LocalReplayIndex:
+    """
+    Persistent index of the local replay folder, kept in an SQLite database.
+
+    Entries are keyed by file name, size and modification time, so a refresh
+    only reads headers of replays that are new or changed. Players are kept
+    in a separate table so we can query replays by player.
+    """
+    SCHEMA_VERSION = 1
+    REPLAY_EXTENSIONS = (".fafreplay", ".scfareplay")
+
+    def __init__(self, replay_dir, db_file):
+        self._replay_dir = replay_dir
+        self._db_file = db_file
+        self._db = None
+        self._file_keys = {}
+
+    def _open(self):
+        if self._db is not None:
+            return
+        try:
+            self._db = sqlite3.connect(self._db_file)
+            self._init_schema()
+        except sqlite3.DatabaseError:
+            logger.warning("Replay index is corrupted, rebuilding it")
+            if self._db is not None:
+                self._db.close()
+            os.remove(self._db_file)
+            self._db = sqlite3.connect(self._db_file)
+            self._init_schema()
+
+    def _init_schema(self):
+        version, = self._db.execute("PRAGMA user_version").fetchone()
+        if version == self.SCHEMA_VERSION:
+            return
+        with self._db:
+            self._db.execute("DROP TABLE IF EXISTS replays")
+            self._db.execute("DROP TABLE IF EXISTS players")
+            self._db.execute("""
+                CREATE TABLE replays (
+                    filename TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime REAL,
+                    status TEXT,
+                    launch_time REAL,
+                    mapname TEXT COLLATE NOCASE,
+                    title TEXT,
+                    featured_mod TEXT COLLATE NOCASE)""")
+            self._db.execute("""
+                CREATE TABLE players (
+                    filename TEXT,
+                    team TEXT,
+                    name TEXT COLLATE NOCASE)""")
+            self._db.execute("CREATE INDEX players_filename ON players (filename)")
+            self._db.execute("CREATE INDEX players_name ON players (name)")
+            self._db.execute("CREATE INDEX replays_mapname ON replays (mapname)")
+            self._db.execute("PRAGMA user_version = {}".format(self.SCHEMA_VERSION))
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _files_on_disk(self):
+        files = {}
+        for entry in os.scandir(self._replay_dir):
+            if not entry.name.endswith(self.REPLAY_EXTENSIONS):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            files[entry.name] = (stat.st_size, stat.st_mtime)
+        return files
+
+    def scan(self):
+        """
+        Compares the index with the replay folder. Returns lists of files
+        whose headers need to be read and of files that are gone or changed;
+        changed files show up in both. Read records are added with store().
+        """
+        self._open()
+        on_disk = self._files_on_disk()
+        indexed = {filename: (size, mtime) for filename, size, mtime
+                   in self._db.execute("SELECT filename, size, mtime FROM replays")}
+
+        removed = [f for f, key in indexed.items() if on_disk.get(f) != key]
+        changed = [f for f, key in on_disk.items() if indexed.get(f) != key]
+        self._file_keys = on_disk
+        return changed, removed
+
+    def forget(self, filenames):
+        self._open()
+        with self._db:
+            self._remove(filenames)
+
+    def store(self, records):
+        """
+        Adds records read after the last scan(). Returns their file names.
+        """
+        self._open()
+        records = [r for r in records if r.filename in self._file_keys]
+        with self._db:
+            self._insert(records, self._file_keys)
+        return [r.filename for r in records]
+
+    def refresh(self):
+        """
+        Brings the index up to date with the replay folder, reading headers
+        right away. Returns lists of added and removed file names; changed
+        files show up in both.
+        """
+        changed, removed = self.scan()
+        self.forget(removed)
+        records = (read_replay_record(self._replay_dir, f) for f in changed)
+        return self.store(r for r in records if r is not None), removed
+
+    def _remove(self, filenames):
+        rows = [(f,) for f in filenames]
+        self._db.executemany("DELETE FROM replays WHERE filename = ?", rows)
+        self._db.executemany("DELETE FROM players WHERE filename = ?", rows)
+
+    def _insert(self, records, file_keys):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO replays VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((r.filename,) + file_keys[r.filename] +
+             (r.status, r.launch_time, r.mapname, r.title, r.featured_mod)
+             for r in records))
+        self._db.executemany(
+            "INSERT INTO players VALUES (?, ?, ?)",
+            ((r.filename, team, name) for r in records
+             for team, names in r.teams.items() for name in names))
+
+    def _records(self, where="", params=()):
+        self._open()
+        query = ("SELECT filename, status, launch_time, mapname, title, featured_mod"
+                 " FROM replays " + where)
+        rows = self._db.execute(query, params).fetchall()
+
+        teams = {}
+        player_query = "SELECT filename, team, name FROM players"
+        if where:
+            player_query += " WHERE filename IN (SELECT filename FROM replays " + where + ")"
+        for filename, team, name in self._db.execute(player_query, params):
+            teams.setdefault(filename, {}).setdefault(team, []).append(name)
+
+        return [_replay_record(*row, teams=teams.get(row[0])) for row in rows]
+
+    @staticmethod
+    def _in_chunks(filenames):
+        # Stay below SQLite's limit on query parameters
+        filenames = list(filenames)
+        for i in range(0, len(filenames), 500):
+            chunk = filenames[i:i + 500]
+            yield "WHERE filename IN ({})".format(", ".join("?" * len(chunk))), chunk
+
+    def records(self, filenames=None):
+        if filenames is None:
+            return self._records()
+        records = []
+        for where, chunk in self._in_chunks(filenames):
+            records += self._records(where, chunk)
+        return records
+
+    def entries(self, filenames=None):
+        """
+        Like records, but returns only (filename, status, launch_time) tuples.
+        Cheap enough to load for the whole replay folder.
+        """
+        self._open()
+        query = "SELECT filename, status, launch_time FROM replays "
+        if filenames is None:
+            return self._db.execute(query).fetchall()
+        entries = []
+        for where, chunk in self._in_chunks(filenames):
+            entries += self._db.execute(query + where, chunk).fetchall()
+        return entries
+
+    def query(self, mapname=None, featured_mod=None, player=None,
+              since=None, until=None):
+        """
+        Returns records of replays matching all given criteria. Map, mod and
+        player names are compared case-insensitively; since and until bound
+        the launch time.
+        """
+        conditions = []
+        params = []
+        if mapname is not None:
+            conditions.append("mapname = ?")
+            params.append(mapname)
+        if featured_mod is not None:
+            conditions.append("featured_mod = ?")
+            params.append(featured_mod)
+        if player is not None:
+            conditions.append("filename IN (SELECT filename FROM players WHERE name = ?)")
+            params.append(player)
+        if since is not None:
+            conditions.append("launch_time >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("launch_time < ?")
+            params.append(until)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self._records(where, params)
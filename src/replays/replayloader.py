@@ -0,0 +1,91 @@
+from PyQt5 import QtCore
+
+from replays.replayindex import read_replay_record
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class _BatchSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(object, object)
+
+
+class _ReadBatch(QtCore.QRunnable):
+    def __init__(self, loader, job, replay_dir, filenames):
+        QtCore.QRunnable.__init__(self)
+        self._loader = loader
+        self._job = job
+        self._replay_dir = replay_dir
+        self._filenames = filenames
+
+    def run(self):
+        if self._loader.is_cancelled(self._job):
+            return
+        records = [read_replay_record(self._replay_dir, f) for f in self._filenames]
+        self._loader.signals.done.emit(self._job, records)
+
+
+class ReplayHeaderLoader(QtCore.QObject):
+    """
+    Reads replay headers on a thread pool, so the replay tab stays responsive
+    while a big replay folder is indexed for the first time. Records are
+    delivered in batches in the GUI thread. Starting a new load cancels the
+    previous one.
+    """
+    batch_loaded = QtCore.pyqtSignal(object)
+    progress = QtCore.pyqtSignal(int, int)
+    finished = QtCore.pyqtSignal()
+
+    BATCH_SIZE = 100
+    MAX_THREADS = 4
+
+    def __init__(self, replay_dir):
+        QtCore.QObject.__init__(self)
+        self._replay_dir = replay_dir
+        self._pool = QtCore.QThreadPool()
+        self._pool.setMaxThreadCount(self.MAX_THREADS)
+        self.signals = _BatchSignals()
+        self.signals.done.connect(self._batch_done)
+
+        self._job = 0
+        self._cancelled_job = 0
+        self._total = 0
+        self._loaded = 0
+
+    def is_cancelled(self, job):
+        return job <= self._cancelled_job
+
+    @property
+    def running(self):
+        return self._loaded < self._total
+
+    def load(self, filenames):
+        self.cancel()
+        self._job += 1
+        self._total = len(filenames)
+        self._loaded = 0
+        if not filenames:
+            self.finished.emit()
+            return
+        self.progress.emit(0, self._total)
+        for i in range(0, len(filenames), self.BATCH_SIZE):
+            batch = filenames[i:i + self.BATCH_SIZE]
+            self._pool.start(_ReadBatch(self, self._job, self._replay_dir, batch))
+
+    def cancel(self):
+        if not self.running:
+            return
+        logger.info("Cancelled reading replays, {} of {} done".format(self._loaded, self._total))
+        self._cancelled_job = self._job
+        self._total = 0
+        self._loaded = 0
+        self.finished.emit()
+
+    def _batch_done(self, job, records):
+        if job != self._job or self.is_cancelled(job):
+            return
+        self._loaded += len(records)
+        self.batch_loaded.emit([r for r in records if r is not None])
+        self.progress.emit(self._loaded, self._total)
+        if not self.running:
+            self.finished.emit()
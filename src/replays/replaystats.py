@@ -0,0 +1,198 @@
+import array
+import collections
+import time
+
+from model.game import Game
+from replays.replayindex import ReplayStatus
+
+
+class _Interner:
+    """
+    Maps strings to small integer codes, case-insensitively.
+    """
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+
+    def code(self, name):
+        key = name.lower()
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.names)
+            self._codes[key] = code
+            self.names.append(name)
+        return code
+
+    def find(self, name):
+        return self._codes.get(name.lower())
+
+
+class ReplayStats:
+    """
+    Column store of local replay metadata for answering statistics queries.
+
+    Built once from replay records (e.g. LocalReplayIndex.records()). Every
+    replay becomes a row; maps, mods, players and teams are stored as integer
+    codes in flat arrays, and per-map and per-player row lists make filters
+    cheap even for tens of thousands of replays. Only replays with complete
+    metadata are included, and observers are left out.
+    """
+    # Players in this team are on their own
+    NO_TEAM = "1"
+
+    def __init__(self, records):
+        self._maps = _Interner()
+        self._mods = _Interner()
+        self._players = _Interner()
+        self._teams = _Interner()
+
+        self.filenames = []
+        self._map_col = array.array('I')
+        self._mod_col = array.array('I')
+        self._time_col = array.array('d')
+        # Players of row i are at _player_col[_player_start[i]:_player_start[i + 1]]
+        self._player_start = array.array('I', [0])
+        self._player_col = array.array('I')
+        self._team_col = array.array('I')
+
+        self._rows_by_map = collections.defaultdict(lambda: array.array('I'))
+        self._rows_by_player = collections.defaultdict(lambda: array.array('I'))
+
+        for record in records:
+            if record.status == ReplayStatus.COMPLETE:
+                self._add(record)
+
+    @classmethod
+    def from_index(cls, index):
+        return cls(index.records())
+
+    def _add(self, record):
+        row = len(self.filenames)
+        self.filenames.append(record.filename)
+        map_code = self._maps.code(record.mapname)
+        self._map_col.append(map_code)
+        self._mod_col.append(self._mods.code(record.featured_mod))
+        self._time_col.append(record.launch_time or 0)
+        self._rows_by_map[map_code].append(row)
+
+        for team, names in record.teams.items():
+            if team in Game.OBSERVER_TEAMS:
+                continue
+            team_code = self._teams.code(team)
+            for name in names:
+                player_code = self._players.code(name)
+                self._player_col.append(player_code)
+                self._team_col.append(team_code)
+                postings = self._rows_by_player[player_code]
+                if not postings or postings[-1] != row:
+                    postings.append(row)
+        self._player_start.append(len(self._player_col))
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def select(self, mapname=None, featured_mod=None, players=(),
+               since=None, until=None):
+        """
+        Returns a sorted list of rows of replays matching all criteria.
+        Names compare case-insensitively; all given players must have
+        played in the replay.
+        """
+        candidates = None
+        if mapname is not None:
+            code = self._maps.find(mapname)
+            if code is None:
+                return []
+            candidates = self._rows_by_map[code]
+        for player in players:
+            code = self._players.find(player)
+            if code is None:
+                return []
+            postings = self._rows_by_player[code]
+            if candidates is None:
+                candidates = postings
+            else:
+                # Intersect, walking the shorter list
+                if len(postings) < len(candidates):
+                    candidates, postings = postings, candidates
+                present = set(postings)
+                candidates = [r for r in candidates if r in present]
+        if candidates is None:
+            candidates = range(len(self))
+
+        mod_code = None
+        if featured_mod is not None:
+            mod_code = self._mods.find(featured_mod)
+            if mod_code is None:
+                return []
+
+        mods = self._mod_col
+        times = self._time_col
+        return [r for r in candidates
+                if (mod_code is None or mods[r] == mod_code)
+                and (since is None or times[r] >= since)
+                and (until is None or times[r] < until)]
+
+    def _players_of(self, row):
+        return range(self._player_start[row], self._player_start[row + 1])
+
+    def count_by(self, grouping, rows=None):
+        """
+        Counts replays per map, mod, player, day, month or weekday. Rows
+        restrict the count to a selection.
+        """
+        if rows is None:
+            rows = range(len(self))
+        if grouping == "mapname":
+            counts = collections.Counter(self._map_col[r] for r in rows)
+            return self._named(counts, self._maps)
+        if grouping == "featured_mod":
+            counts = collections.Counter(self._mod_col[r] for r in rows)
+            return self._named(counts, self._mods)
+        if grouping == "player":
+            counts = collections.Counter(self._player_col[i] for r in rows
+                                         for i in self._players_of(r))
+            return self._named(counts, self._players)
+        if grouping in ("day", "month", "weekday"):
+            fmt = {"day": "%Y-%m-%d", "month": "%Y-%m", "weekday": "%A"}[grouping]
+            return collections.Counter(self._format_time(self._time_col[r], fmt)
+                                       for r in rows)
+        raise ValueError("Unknown grouping: {}".format(grouping))
+
+    def co_players(self, player, rows=None, same_team=None):
+        """
+        Counts in how many replays others played with (same_team=True),
+        against (same_team=False) or alongside (None) the given player.
+        """
+        code = self._players.find(player)
+        if code is None:
+            return collections.Counter()
+        if rows is None:
+            rows = self._rows_by_player[code]
+        counts = collections.Counter()
+        players = self._player_col
+        teams = self._team_col
+        no_team = self._teams.find(self.NO_TEAM)
+        for row in rows:
+            slots = self._players_of(row)
+            my_teams = {teams[i] for i in slots if players[i] == code}
+            if not my_teams:
+                continue
+            my_teams.discard(no_team)
+            others = {players[i] for i in slots
+                      if players[i] != code
+                      and (same_team is None or (teams[i] in my_teams) == same_team)}
+            counts.update(others)
+        return self._named(counts, self._players)
+
+    @staticmethod
+    def _named(counts, interner):
+        return collections.Counter({interner.names[code]: count
+                                    for code, count in counts.items()})
+
+    @staticmethod
+    def _format_time(timestamp, fmt):
+        try:
+            return time.strftime(fmt, time.localtime(timestamp))
+        except (ValueError, OverflowError, OSError):
+            return "unknown"
@@ -1,13 +1,30 @@
-from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
 
 
 class QtListModel(QAbstractListModel):
+    """
+    List model of items built from data objects, identified by ids.
+
+    Row order is arbitrary, since views sort and filter items through proxy
+    models anyway. Items are appended at the end, and removed items are
+    reported as blocks of removed rows. We never move rows or change the
+    layout, since proxy models answer that by sorting all their rows again.
+    Item updates are collected and reported with one dataChanged per range
+    of rows once control returns to the event loop.
+    """
     def __init__(self, item_builder):
         QAbstractListModel.__init__(self)
         self._items = {}
         self._itemlist = []  # For queries
+        self._rows = {}     # item -> row in _itemlist
         self._item_builder = item_builder
 
+        self._updated_items = set()
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(0)
+        self._update_timer.timeout.connect(self._emit_item_updates)
+
     def rowCount(self, parent):
         if parent.isValid():
             return 0
@@ -20,36 +37,78 @@ class QtListModel(QAbstractListModel):
             return None
         return self._itemlist[index.row()]
 
-    # TODO - insertion and removal are O(n).
     def _add_item(self, data, id_):
-        assert id_ not in self._items
-        next_index = len(self._itemlist)
-        self.beginInsertRows(QModelIndex(), next_index, next_index)
-        item = self._item_builder(data)
-        item.updated.connect(self._at_item_updated)
-        self._items[id_] = item
-        self._itemlist.append(item)
+        self._add_items([(data, id_)])
+
+    def _add_items(self, datas_and_ids):
+        datas_and_ids = [(d, i) for d, i in datas_and_ids if i not in self._items]
+        if not datas_and_ids:
+            return
+        first = len(self._itemlist)
+        self.beginInsertRows(QModelIndex(), first, first + len(datas_and_ids) - 1)
+        for data, id_ in datas_and_ids:
+            item = self._item_builder(data)
+            item.updated.connect(self._at_item_updated)
+            self._items[id_] = item
+            self._rows[item] = len(self._itemlist)
+            self._itemlist.append(item)
         self.endInsertRows()
 
     def _remove_item(self, id_):
         assert id_ in self._items
-        item = self._items[id_]
-        item_index = self._itemlist.index(item)
-        self.beginRemoveRows(QModelIndex(), item_index, item_index)
-        item.updated.disconnect(self._at_item_updated)
-        del self._items[id_]
-        self._itemlist.pop(item_index)
-        self.endRemoveRows()
+        self._remove_items([id_])
+
+    def _remove_items(self, ids):
+        removed = [self._items.pop(id_) for id_ in set(ids) if id_ in self._items]
+        if not removed:
+            return
+        for item in removed:
+            item.updated.disconnect(self._at_item_updated)
+            self._updated_items.discard(item)
+
+        # Remove blocks of adjacent rows from the end, so rows of blocks
+        # still to go stay valid
+        rows = sorted(self._rows.pop(item) for item in removed)
+        end = len(rows)
+        for i in range(len(rows) - 1, -1, -1):
+            if i == 0 or rows[i - 1] != rows[i] - 1:
+                first, last = rows[i], rows[end - 1]
+                self.beginRemoveRows(QModelIndex(), first, last)
+                del self._itemlist[first:last + 1]
+                self.endRemoveRows()
+                end = i
+
+        for row in range(rows[0], len(self._itemlist)):
+            self._rows[self._itemlist[row]] = row
 
     def _clear_items(self):
-        self.beginRemoveRows(QModelIndex(), 0, len(self._items) - 1)
-        for item in self._items.values():
+        if not self._itemlist:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, len(self._itemlist) - 1)
+        for item in self._itemlist:
             item.updated.disconnect(self._at_item_updated)
         self._items.clear()
         self._itemlist.clear()
+        self._rows.clear()
+        self._updated_items.clear()
         self.endRemoveRows()
 
     def _at_item_updated(self, item):
-        item_index = self._itemlist.index(item)
-        index = self.index(item_index, 0)
-        self.dataChanged.emit(index, index)
+        self._updated_items.add(item)
+        if not self._update_timer.isActive():
+            self._update_timer.start()
+
+    def _emit_item_updates(self):
+        rows = sorted(self._rows[item] for item in self._updated_items)
+        self._updated_items.clear()
+        self._emit_rows_changed(rows)
+
+    def _emit_rows_changed(self, rows):
+        # Rows are sorted. Emit one signal per range of adjacent rows.
+        start = None
+        for i, row in enumerate(rows):
+            if start is None:
+                start = row
+            if i + 1 == len(rows) or rows[i + 1] != row + 1:
+                self.dataChanged.emit(self.index(start), self.index(row))
+                start = None
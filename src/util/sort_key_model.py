@@ -0,0 +1,67 @@
+from PyQt5.QtCore import QSortFilterProxyModel, Qt
+
+
+class SortKeyFilterModel(QSortFilterProxyModel):
+    """
+    Sorting proxy for item models like QtListModel, which hand out items as
+    DisplayRole data. Sorts by sort_key(item), which subclasses implement.
+
+    Keys are computed once per item and kept until the source model reports
+    the item changed or invalidate() is called, so re-sorting only compares
+    ready tuples instead of running expensive comparisons over and over.
+    """
+    def __init__(self):
+        QSortFilterProxyModel.__init__(self)
+        self._sort_keys = {}
+
+    def sort_key(self, item):
+        raise NotImplementedError
+
+    def setSourceModel(self, model):
+        old = self.sourceModel()
+        if old is not None:
+            old.dataChanged.disconnect(self._drop_sort_keys)
+            old.modelAboutToBeReset.disconnect(self._clear_sort_keys)
+        self._clear_sort_keys()
+        # Connect before the proxy does, so that we drop keys before it
+        # re-sorts changed rows
+        if model is not None:
+            model.dataChanged.connect(self._drop_sort_keys)
+            model.modelAboutToBeReset.connect(self._clear_sort_keys)
+        QSortFilterProxyModel.setSourceModel(self, model)
+
+    def invalidate(self):
+        self._clear_sort_keys()
+        QSortFilterProxyModel.invalidate(self)
+
+    def _clear_sort_keys(self):
+        self._sort_keys.clear()
+
+    def lessThan(self, leftIndex, rightIndex):
+        return self._item_sort_key(leftIndex) < self._item_sort_key(rightIndex)
+
+    def _item_sort_key(self, index):
+        item = self.sourceModel().data(index, Qt.DisplayRole)
+        key = self._sort_keys.get(item)
+        if key is None:
+            self._prune_sort_keys()
+            key = self.sort_key(item)
+            self._sort_keys[item] = key
+        return key
+
+    def _drop_sort_keys(self, top_left, bottom_right, roles=None):
+        source = self.sourceModel()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            item = source.data(source.index(row, 0), Qt.DisplayRole)
+            self._sort_keys.pop(item, None)
+
+    def _prune_sort_keys(self):
+        # Keys of removed items are dropped once they pile up
+        source = self.sourceModel()
+        size = source.rowCount(source.index(-1, 0))
+        if len(self._sort_keys) <= 2 * size + 16:
+            return
+        items = {source.data(source.index(row, 0), Qt.DisplayRole)
+                 for row in range(size)}
+        self._sort_keys = {item: key for item, key in self._sort_keys.items()
+                           if item in items}
@@ -34,6 +34,7 @@ If there is default value for a search entry, error will not be generated. Defau
         __parent__ - returns item parent
     destination - you can specify a dictionary for matched items in the resulting array
 """
+import io
 import re
 import zipfile
 import os
@@ -229,17 +230,17 @@ class luaParser:
 
     def __parseLua(self):
         # open file
+        f = None
         if not self.iszip:
             f = open(self.__path, "r")
         else:
-            if self.zip.testzip() is None:
-                for member in self.zip.namelist() :
-                    filename = os.path.basename(member)
-                    if not filename:
-                        continue
-                    if filename == self.__path:
-                        f = self.zip.open(member)
-                        break
+            # Only the central directory is read to find the member, the
+            # archive isn't verified
+            for member in self.zip.namelist():
+                if member == self.__path or os.path.basename(member) == self.__path:
+                    f = io.TextIOWrapper(self.zip.open(member),
+                                         encoding="utf-8", errors="replace")
+                    break
         if not f:
             return
 
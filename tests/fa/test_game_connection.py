@@ -0,0 +1,80 @@
+import random
+import struct
+
+import pytest
+
+from fa.game_connection import GPGNetDecoder, encode_message
+
+
+MESSAGES = [
+    ("GameState", ["Idle"]),
+    ("GameOption", ["Victory", "demoralization"]),
+    ("PlayerOption", [2, "Team", 3]),
+    ("Chat", ["gl hf, ünits ☢"]),
+    ("Desync", [-1, 0, 2 ** 31 - 1, -2 ** 31]),
+    ("Rehost", []),
+    ("JsonStats", ['{"stats": [' + ", ".join(["1"] * 5000) + "]}"]),
+    ("", ["", 0]),
+]
+
+
+def _decode_in_pieces(data, sizes):
+    decoder = GPGNetDecoder()
+    messages = []
+    pos = 0
+    for size in sizes:
+        messages += decoder.feed(data[pos:pos + size])
+        pos += size
+    messages += decoder.feed(data[pos:])
+    return messages
+
+
+def test_encoding_matches_the_wire_format():
+    data = encode_message("Chat", ["hi", 7])
+    assert data == (b"\x04\x00\x00\x00Chat" b"\x02\x00\x00\x00"
+                    b"\x01\x02\x00\x00\x00hi" b"\x00\x07\x00\x00\x00")
+
+
+def test_round_trip():
+    data = b"".join(encode_message(c, a) for c, a in MESSAGES)
+    assert GPGNetDecoder().feed(data) == MESSAGES
+
+
+def test_decoding_byte_by_byte():
+    data = b"".join(encode_message(c, a) for c, a in MESSAGES[:6])
+    assert _decode_in_pieces(data, [1] * len(data)) == MESSAGES[:6]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_decoding_random_splits(seed):
+    rng = random.Random(seed)
+    messages = [rng.choice(MESSAGES) for _ in range(50)]
+    data = b"".join(encode_message(c, a) for c, a in messages)
+    sizes = [rng.randint(0, 300) for _ in range(len(data) // 100)]
+    assert _decode_in_pieces(data, sizes) == messages
+
+
+def test_decoder_compacts_its_buffer():
+    decoder = GPGNetDecoder()
+    message = encode_message(*MESSAGES[6])
+    for _ in range(20):
+        assert decoder.feed(message + message[:10]) != []
+        decoder.feed(message[10:])
+        assert len(decoder._buffer) < GPGNetDecoder.COMPACT_SIZE + 2 * len(message)
+
+
+def test_game_escapes_are_undone():
+    data = (b"\x04\x00\x00\x00Chat\x01\x00\x00\x00"
+            b"\x01\x0a\x00\x00\x00a/tb/nc//n")
+    assert GPGNetDecoder().feed(data) == [("Chat", ["a\tb\nc/\n"])]
+
+
+def test_unknown_field_type_is_an_error():
+    data = b"\x04\x00\x00\x00Chat\x01\x00\x00\x00" + struct.pack("<bi", 2, 0)
+    with pytest.raises(Exception):
+        GPGNetDecoder().feed(data)
+
+
+def test_unknown_argument_type_cannot_be_sent():
+    with pytest.raises(Exception):
+        encode_message("Chat", [1.5])
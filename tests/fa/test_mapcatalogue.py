@@ -0,0 +1,114 @@
+import os
+
+from fa.mapcatalogue import MapCatalogue
+
+
+SCENARIO = """version = 3
+ScenarioInfo = {
+    name = 'Some Map',
+    description = 'A map',
+    type = 'skirmish',
+    map_version = 4,
+    size = {256, 256},
+    Configurations = {
+        ['standard'] = {
+            teams = {
+                { name = 'FFA', armies = {'ARMY_1', 'ARMY_2'} },
+            },
+        },
+    }
+}
+"""
+
+
+def _add_map(root, name):
+    folder = os.path.join(root, name)
+    os.makedirs(folder)
+    basename = name.split(".")[0].lower()
+    with open(os.path.join(folder, basename + "_scenario.lua"), "w") as f:
+        f.write(SCENARIO)
+    return folder
+
+
+def _touch(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def _catalogue(tmpdir, *roots):
+    return MapCatalogue(lambda: list(roots), str(tmpdir.join("maps.json")))
+
+
+def test_catalogue_finds_maps_case_insensitively(tmpdir):
+    root = str(tmpdir.mkdir("maps"))
+    folder = _add_map(root, "Some_Map.v0004")
+    catalogue = _catalogue(tmpdir, root)
+
+    info = catalogue.find("some_map.V0004")
+    assert info.name == "Some_Map.v0004"
+    assert info.folder == folder
+    assert info.version == 4
+    assert catalogue.find("other_map") is None
+    assert catalogue.names() == ["Some_Map.v0004"]
+
+
+def test_earlier_roots_shadow_later_ones(tmpdir):
+    user = str(tmpdir.mkdir("user"))
+    base = str(tmpdir.mkdir("base"))
+    user_folder = _add_map(user, "scmp_009")
+    _add_map(base, "SCMP_009")
+    _add_map(base, "scmp_010")
+    catalogue = _catalogue(tmpdir, user, base)
+
+    assert catalogue.find("scmp_009").folder == user_folder
+    assert catalogue.names(user) == ["scmp_009"]
+    assert sorted(catalogue.names()) == ["SCMP_009", "scmp_009", "scmp_010"]
+
+
+def test_catalogue_rescans_only_changed_roots(tmpdir, mocker):
+    root = str(tmpdir.mkdir("maps"))
+    _add_map(root, "map_a")
+    _touch(root, 1000)
+    catalogue = _catalogue(tmpdir, root)
+    assert catalogue.find("map_a") is not None
+
+    scandir = mocker.spy(os, "scandir")
+    assert catalogue.find("map_b") is None
+    assert not scandir.called
+
+    _add_map(root, "map_b")
+    _touch(root, 2000)
+    assert catalogue.find("map_b") is not None
+    assert scandir.call_count == 1
+
+
+def test_catalogue_is_kept_between_runs(tmpdir, mocker):
+    root = str(tmpdir.mkdir("maps"))
+    _add_map(root, "map_a")
+    _touch(root, 1000)
+    info = _catalogue(tmpdir, root).find("map_a")
+
+    scandir = mocker.spy(os, "scandir")
+    catalogue = _catalogue(tmpdir, root)
+    assert catalogue.find("map_a") == info
+    assert not scandir.called
+
+
+def test_catalogue_forgets_removed_maps(tmpdir):
+    root = str(tmpdir.mkdir("maps"))
+    folder = _add_map(root, "map_a")
+    _touch(root, 1000)
+    catalogue = _catalogue(tmpdir, root)
+    assert catalogue.find("map_a") is not None
+
+    os.remove(os.path.join(folder, "map_a_scenario.lua"))
+    os.rmdir(folder)
+    _touch(root, 2000)
+    assert catalogue.find("map_a") is None
+
+
+def test_broken_cache_file_is_rebuilt(tmpdir):
+    root = str(tmpdir.mkdir("maps"))
+    _add_map(root, "map_a")
+    tmpdir.join("maps.json").write("{not json")
+    catalogue = _catalogue(tmpdir, root)
+    assert catalogue.find("map_a") is not None
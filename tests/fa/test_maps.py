@@ -0,0 +1,166 @@
+import os
+import threading
+
+from PyQt5 import QtGui
+from downloadManager import DownloadRequest, PreviewDownloader
+from fa.maps import MapPreviewCache, genPrevFromDDS
+
+
+def _write_preview(directory, name):
+    path = os.path.join(directory, name + ".png")
+    image = QtGui.QImage(4, 4, QtGui.QImage.Format_RGB32)
+    image.fill(0)
+    image.save(path)
+    return path
+
+
+def test_preview_cache_scans_folder_once(application, tmpdir, mocker):
+    _write_preview(str(tmpdir), "scmp_009")
+    cache = MapPreviewCache(str(tmpdir), mocker.Mock(), mocker.Mock())
+    assert cache.preview("SCMP_009") is not None
+
+    listdir = mocker.patch("os.listdir")
+    _write_preview(str(tmpdir), "scmp_010")
+    assert cache.path("scmp_009") is not None
+    assert cache.path("scmp_010") is None
+    assert not listdir.called
+
+
+def test_preview_cache_warms_on_worker_thread(application, qtbot, tmpdir,
+                                              mocker):
+    _write_preview(str(tmpdir), "scmp_009")
+    cache = MapPreviewCache(str(tmpdir), mocker.Mock(), mocker.Mock())
+    threads = []
+    listdir = os.listdir
+
+    def scan(path):
+        threads.append(threading.current_thread())
+        return listdir(path)
+    mocker.patch("os.listdir", side_effect=scan)
+
+    cache.warm()
+    with qtbot.waitSignal(cache.preview_ready) as blocker:
+        assert cache.preview("SCMP_009") is None
+    assert blocker.args == ["scmp_009"]
+    assert cache.preview("scmp_009") is not None
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
+
+
+def test_preview_cache_forgets_broken_previews(application, tmpdir, mocker):
+    with open(os.path.join(str(tmpdir), "broken.png"), "wb") as f:
+        f.write(b"not a png")
+    cache = MapPreviewCache(str(tmpdir), mocker.Mock(), mocker.Mock())
+    assert cache.preview("broken") is None
+    assert cache.path("broken") is None
+
+
+def test_preview_cache_add_announces_preview(application, tmpdir, mocker):
+    cache = MapPreviewCache(str(tmpdir), mocker.Mock(return_value=None), mocker.Mock())
+    ready = mocker.Mock()
+    cache.preview_ready.connect(ready)
+
+    path = _write_preview(str(tmpdir), "Some_Map")
+    cache.add("Some_Map", path)
+    ready.assert_called_once_with("some_map")
+    assert cache.preview("some_map", pixmap=True) is not None
+
+
+def test_preview_cache_generates_missing_previews_later(application, qtbot, tmpdir):
+    generated = []
+
+    def generator(mapdir):
+        generated.append(mapdir)
+        name = os.path.basename(mapdir).lower()
+        return {"cache": _write_preview(str(tmpdir), name), "tozip": []}
+
+    def locator(mapname):
+        return os.path.join("maps", mapname)
+
+    cache = MapPreviewCache(str(tmpdir), generator, locator)
+    with qtbot.waitSignal(cache.preview_ready) as blocker:
+        assert cache.preview("Local_Map") is None
+        assert cache.preview("local_map") is None
+    assert blocker.args == ["local_map"]
+    assert generated == [os.path.join("maps", "Local_Map")]
+    assert cache.preview("local_map") is not None
+
+
+def test_preview_cache_reports_maps_it_cannot_generate(application, qtbot, tmpdir, mocker):
+    generator = mocker.Mock()
+    locator = mocker.Mock(return_value=None)
+    cache = MapPreviewCache(str(tmpdir), generator, locator)
+    assert cache.can_generate("missing_map")
+
+    with qtbot.waitSignal(cache.preview_failed) as blocker:
+        cache.generate("Missing_Map")
+    assert blocker.args == ["missing_map"]
+    assert not cache.can_generate("missing_map")
+    assert not generator.called
+
+    # Repeated requests are answered without looking again
+    with qtbot.waitSignal(cache.preview_failed):
+        cache.generate("missing_map")
+    assert locator.call_count == 1
+
+
+def test_preview_downloader_uses_local_previews(application, qtbot, tmpdir, mocker):
+    def generator(mapdir):
+        return {"cache": _write_preview(str(tmpdir), "local_map"), "tozip": []}
+
+    cache = MapPreviewCache(str(tmpdir), generator, lambda name: name)
+    downloader = PreviewDownloader(str(tmpdir), None, cache)
+    downloaded = mocker.Mock()
+    downloader.preview_downloaded.connect(downloaded)
+    req = DownloadRequest()
+
+    with qtbot.waitSignal(req.done) as blocker:
+        downloader.download_preview("local_map", req, "http://example.com/local_map.png")
+    name, (path, is_local) = blocker.args
+    assert name == "local_map"
+    assert path == cache.path("local_map")
+    assert not is_local
+    assert not downloaded.called
+
+
+def test_preview_downloader_downloads_previews_missing_locally(application, qtbot, tmpdir, mocker):
+    download = mocker.patch("downloadManager.PreviewDownload")
+    cache = MapPreviewCache(str(tmpdir), mocker.Mock(), mocker.Mock(return_value=None))
+    downloader = PreviewDownloader(str(tmpdir), None, cache)
+    req = DownloadRequest()
+
+    url = "http://example.com/remote_map.png"
+    with qtbot.waitSignal(cache.preview_failed):
+        downloader.download_preview("remote_map", req, url)
+    qtbot.waitUntil(lambda: download.called)
+    assert download.call_args[0][1:3] == ("remote_map", url)
+    assert req.dl is download.return_value
+
+
+def test_preview_cache_keeps_few_decoded_previews(application, tmpdir, mocker):
+    cache = MapPreviewCache(str(tmpdir), mocker.Mock(), mocker.Mock())
+    cache.MAX_DECODED = 2
+    for name in ["a", "b", "c"]:
+        _write_preview(str(tmpdir), name)
+    for name in ["a", "b", "c"]:
+        cache.preview(name)
+    assert len(cache._decoded) == 2
+
+
+def test_gen_prev_from_dds_converts_bgra_to_rgb(application, tmpdir):
+    size = 3
+    pixels = [(10 * i, 10 * i + 1, 10 * i + 2) for i in range(size * size)]
+    dds = os.path.join(str(tmpdir), "map.dds")
+    with open(dds, "wb") as f:
+        f.write(bytes(128))
+        for r, g, b in pixels:
+            f.write(bytes([b, g, r, 255]))
+    png = os.path.join(str(tmpdir), "map.png")
+
+    genPrevFromDDS(dds, png)
+
+    image = QtGui.QImage(png)
+    assert (image.width(), image.height()) == (size, size)
+    for i, (r, g, b) in enumerate(pixels):
+        color = image.pixelColor(i % size, i // size)
+        assert (color.red(), color.green(), color.blue()) == (r, g, b)
@@ -0,0 +1,87 @@
+import struct
+
+import pytest
+from fa.replayparser import ScfaReplay, ReplayParseError, open_replay, replay_version
+
+
+def _string(s):
+    return s.encode('utf-8') + b'\x00'
+
+
+def _lua(value):
+    if value is None:
+        return b'\x02\x00'
+    if isinstance(value, bool):
+        return b'\x03' + bytes([value])
+    if isinstance(value, (int, float)):
+        return b'\x00' + struct.pack("<f", value)
+    if isinstance(value, str):
+        return b'\x01' + _string(value)
+    data = b'\x04'
+    for k, v in value.items():
+        data += _lua(k) + _lua(v)
+    return data + b'\x05'
+
+
+def _sized_lua(value):
+    data = _lua(value)
+    return struct.pack("<i", len(data)) + data
+
+
+def _replay(commands=()):
+    data = _string("Supreme Commander v1.50.3599")
+    data += b'\r\n\x00'
+    data += _string("Replay v1.9\r\n/maps/scmp_009/scmp_009.scmap")
+    data += b'\r\n\x1a\x00'
+    data += _sized_lua({"a-mod-uid": {"name": "A mod"}})
+    data += _sized_lua({"Options": {"Victory": "demoralization", "Share": True}})
+    data += bytes([2]) + _string("Alice") + struct.pack("<i", 1) + _string("Bob") + struct.pack("<i", 2)
+    data += bytes([0])
+    data += bytes([2])
+    data += _sized_lua({"PlayerName": "Alice", "Team": 2.0}) + bytes([0, 0])
+    data += _sized_lua({"PlayerName": "Bob", "Team": 3.0}) + bytes([1, 0])
+    data += struct.pack("<i", 1234)
+    for ctype, payload in commands:
+        data += struct.pack("<BH", ctype, len(payload) + 3) + payload
+    return data
+
+
+def test_parses_header():
+    replay = ScfaReplay(_replay())
+    assert replay.version == "3599"
+    assert replay.replay_version == "Replay v1.9"
+    assert replay.map == "/maps/scmp_009/scmp_009.scmap"
+    assert replay.mapname == "scmp_009"
+    assert replay.mods == {"a-mod-uid": {"name": "A mod"}}
+    assert replay.options == {"Victory": "demoralization", "Share": True}
+    assert replay.sources == [("Alice", 1), ("Bob", 2)]
+    assert not replay.cheats_enabled
+    assert replay.armies[0]["PlayerName"] == "Alice"
+    assert replay.armies[1]["Team"] == 3.0
+    assert replay.random_seed == 1234
+
+
+def test_iterates_commands_lazily():
+    replay = ScfaReplay(_replay([(0, b'\x01\x02'), (3, b''), (1, b'abc')]))
+    commands = [(ctype, bytes(payload)) for ctype, payload in replay.commands()]
+    assert commands == [(0, b'\x01\x02'), (3, b''), (1, b'abc')]
+
+
+def test_truncated_header_raises():
+    with pytest.raises(ReplayParseError):
+        ScfaReplay(_replay()[:100])
+
+
+def test_reads_version_and_header_from_file(tmpdir):
+    path = tmpdir.join("test.scfareplay")
+    path.write_binary(_replay([(0, b'xy')]))
+    assert replay_version(str(path)) == "3599"
+    with open_replay(str(path)) as replay:
+        assert replay.map == "/maps/scmp_009/scmp_009.scmap"
+        assert [bytes(p) for _, p in replay.commands()] == [b'xy']
+
+
+def test_version_of_unknown_file_is_none(tmpdir):
+    path = tmpdir.join("test.scfareplay")
+    path.write_binary(b"Something else\x00")
+    assert replay_version(str(path)) is None
@@ -0,0 +1,135 @@
+import pytest
+from PyQt5 import QtNetwork
+
+from fa.replayrelay import ReplayRelay
+
+HEADER = b"P/1/test.SCFAreplay\x00"
+
+
+class ReplayServer:
+    def __init__(self, qtbot):
+        self.qtbot = qtbot
+        self.server = QtNetwork.QTcpServer()
+        self.server.listen(QtNetwork.QHostAddress.LocalHost, 0)
+        self.connections = []
+        self.received = []
+        self.server.newConnection.connect(self._accept)
+
+    @property
+    def port(self):
+        return self.server.serverPort()
+
+    def _accept(self):
+        socket = self.server.nextPendingConnection()
+        index = len(self.received)
+        self.connections.append(socket)
+        self.received.append(b"")
+        socket.readyRead.connect(lambda: self._read(index))
+
+    def _read(self, index):
+        socket = self.connections[index]
+        self.received[index] += bytes(socket.readAll())
+
+    def wait_for(self, index, data):
+        self.qtbot.waitUntil(lambda: len(self.received) > index
+                             and self.received[index] == data)
+
+    def drop(self, index):
+        self.connections[index].abort()
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def server(application, qtbot):
+    server = ReplayServer(qtbot)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def relay_class(mocker):
+    mocker.patch.object(ReplayRelay, "RECONNECT_DELAY", 10)
+    return ReplayRelay
+
+
+def test_relay_backlog_drops_oldest_chunks(application, relay_class):
+    relay = relay_class("localhost", 0)
+    relay.MAX_BACKLOG = 10
+
+    relay.write(HEADER + b"aaaa")
+    relay.write(b"bbbb")
+    relay.write(b"cccc")
+
+    assert list(relay._backlog) == [b"bbbb", b"cccc"]
+    stats = relay.stats()
+    assert stats["bytes_queued"] == 8
+    assert stats["bytes_dropped"] == 4
+    assert stats["chunks_dropped"] == 1
+
+
+def test_relay_keeps_a_single_oversized_chunk(application, relay_class):
+    relay = relay_class("localhost", 0)
+    relay.MAX_BACKLOG = 10
+
+    relay.write(HEADER + b"x" * 20)
+
+    assert relay.bytes_queued == 20
+    assert relay.chunks_dropped == 0
+
+
+def test_relay_sends_header_and_data(server, qtbot, relay_class):
+    relay = relay_class("localhost", server.port)
+    relay.write(HEADER + b"abc")
+    relay.start()
+    server.wait_for(0, HEADER + b"abc")
+
+    relay.write(b"def")
+    server.wait_for(0, HEADER + b"abcdef")
+
+    with qtbot.waitSignal(relay.finished):
+        relay.finish()
+    stats = relay.stats()
+    assert stats["bytes_relayed"] == len(HEADER) + 6
+    assert stats["bytes_queued"] == 0
+    assert stats["bytes_dropped"] == 0
+    assert stats["reconnects"] == 0
+
+
+def test_relay_posts_header_again_after_reconnect(server, qtbot,
+                                                  relay_class):
+    relay = relay_class("localhost", server.port)
+    relay.start()
+    relay.write(HEADER + b"abc")
+    server.wait_for(0, HEADER + b"abc")
+
+    server.drop(0)
+    server.wait_for(1, HEADER)
+    relay.write(b"def")
+    server.wait_for(1, HEADER + b"def")
+
+    assert relay.reconnects == 1
+    with qtbot.waitSignal(relay.finished):
+        relay.finish()
+
+
+def test_relay_only_gives_up_after_consecutive_failures(server, qtbot,
+                                                        relay_class, mocker):
+    mocker.patch.object(ReplayRelay, "MAX_RECONNECTS", 1)
+    relay = relay_class("localhost", server.port)
+    relay.start()
+    relay.write(HEADER)
+    server.wait_for(0, HEADER)
+
+    # Each drop is followed by a successful reconnect
+    for index in range(3):
+        server.drop(index)
+        server.wait_for(index + 1, HEADER)
+    assert relay.reconnects == 3
+
+    # Once the server is gone, we give up after MAX_RECONNECTS attempts
+    server.close()
+    with qtbot.waitSignal(relay.finished):
+        server.drop(3)
+    assert relay.reconnects == 4
@@ -0,0 +1,48 @@
+import json
+import os
+
+from PyQt5 import QtCore
+from fa.replaywriter import ReplayWriter
+
+
+def _read_replay(filename):
+    with open(filename, "rt") as replay:
+        info = json.loads(replay.readline())
+        body = replay.read().encode('utf-8')
+    return info, bytes(QtCore.qUncompress(QtCore.QByteArray.fromBase64(body)))
+
+
+def _write_replay(filename, chunks, info):
+    writer = ReplayWriter(filename, {"uid": 1, "complete": False})
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.finish(info)
+
+
+def test_replay_writer_output_matches_qcompress(tmpdir):
+    filename = str(tmpdir.join("1-test.fafreplay"))
+    data = b"".join(bytes([i % 251, i % 7]) * 50 for i in range(1000))
+    chunks = [data[i:i + 1234] for i in range(0, len(data), 1234)]
+    info = {"uid": 1, "complete": True}
+    _write_replay(filename, chunks, info)
+
+    assert _read_replay(filename) == (info, data)
+    assert not os.path.exists(filename + ReplayWriter.TEMP_SUFFIX)
+
+
+def test_replay_writer_handles_empty_replay(tmpdir):
+    filename = str(tmpdir.join("1-test.fafreplay"))
+    info = {"uid": 1, "complete": True}
+    _write_replay(filename, [], info)
+
+    assert _read_replay(filename) == (info, b"")
+
+
+def test_replay_writer_rewrites_header_bigger_than_slot(tmpdir):
+    filename = str(tmpdir.join("1-test.fafreplay"))
+    info = {"uid": 1, "complete": True,
+            "title": "x" * (2 * ReplayWriter.HEADER_SLOT)}
+    _write_replay(filename, [b"abc", b"defg"], info)
+
+    assert _read_replay(filename) == (info, b"abcdefg")
+    assert not os.path.exists(filename + ReplayWriter.TEMP_SUFFIX)
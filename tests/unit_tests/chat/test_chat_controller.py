@@ -0,0 +1,147 @@
+import pytest
+
+from chat.chat_controller import ChatController
+from chat.ircconnection import ChatterInfo, IrcSignals
+from model.chat.channel import ChannelID, ChannelType
+from model.chat.chat import Chat
+from model.transaction import TransactionScheduler
+
+
+AEOLUS = ChannelID(ChannelType.PUBLIC, "#aeolus")
+
+
+@pytest.fixture
+def connection():
+    c = IrcSignals()
+    c.nickname = "me"
+    return c
+
+
+@pytest.fixture
+def model(playerset):
+    return Chat.build(playerset=playerset, base_channels=["#aeolus"])
+
+
+@pytest.fixture
+def scheduler():
+    return TransactionScheduler()
+
+
+@pytest.fixture
+def controller(connection, model, scheduler, mocker):
+    chat_config = mocker.Mock(joinsparts=True, ignore_foes=False,
+                              max_chat_lines=1000, chat_line_trim_count=100)
+    metadata = mocker.Mock()
+    metadata.get_meta.side_effect = lambda channel, line: line
+    return ChatController(connection, model, mocker.Mock(), chat_config,
+                          metadata, scheduler)
+
+
+def _chatter(name):
+    return ChatterInfo(name, "host", "")
+
+
+def _join(connection, *names, cid=AEOLUS):
+    for name in names:
+        connection.channel_chatter_joined.emit(cid, _chatter(name))
+
+
+def _watch(channel):
+    events = []
+    channel.added_chatters.connect(
+        lambda ccs: events.append(("added", [cc.chatter.name for cc in ccs])))
+    channel.removed_chatters.connect(
+        lambda ccs: events.append(("removed", [cc.chatter.name for cc in ccs])))
+    return events
+
+
+def test_joins_of_a_batch_are_added_at_once(controller, connection, model,
+                                            scheduler):
+    _join(connection, "me")
+    scheduler.flush()
+    channel = model.channels[AEOLUS]
+    events = _watch(channel)
+
+    names = ["chatter{}".format(i) for i in range(100)]
+    connection.batch_started.emit()
+    _join(connection, *names)
+    connection.batch_finished.emit()
+
+    assert len(channel.chatters) == 101
+    assert len(channel.lines) == 101
+    assert events == []
+    scheduler.flush()
+    assert events == [("added", names)]
+
+
+def test_batch_keeps_order_of_joins_and_parts(controller, connection, model,
+                                              scheduler):
+    _join(connection, "me", "a")
+    scheduler.flush()
+    channel = model.channels[AEOLUS]
+    events = _watch(channel)
+
+    connection.batch_started.emit()
+    _join(connection, "b", "c")
+    connection.channel_chatter_left.emit(AEOLUS, _chatter("b"))
+    connection.chatter_quit.emit(_chatter("a"), "a")
+    _join(connection, "b")
+    connection.batch_finished.emit()
+    scheduler.flush()
+
+    assert events == [("added", ["b", "c"]), ("removed", ["b", "a"]),
+                      ("added", ["b"])]
+    assert sorted(cc.chatter.name for cc in channel.chatters.values()) == \
+        ["b", "c", "me"]
+    assert "a" not in model.chatters
+    assert [line.text for line in channel.lines][-5:] == [
+        "joined the channel.", "joined the channel.", "left the channel.",
+        "quit.", "joined the channel."]
+
+
+def test_names_are_merged_per_channel(controller, connection, model,
+                                      scheduler):
+    other = ChannelID(ChannelType.PUBLIC, "#other")
+    connection.batch_started.emit()
+    connection.new_channel_chatters.emit(AEOLUS, [_chatter("a")])
+    connection.new_channel_chatters.emit(other, [_chatter("b")])
+    connection.new_channel_chatters.emit(AEOLUS, [_chatter("c")])
+    connection.batch_finished.emit()
+
+    assert len(model.channels[AEOLUS].chatters) == 2
+    assert len(model.channels[other].chatters) == 1
+    assert len(model.channels[AEOLUS].lines) == 0
+
+
+def test_channels_are_added_before_their_chatters(controller, connection,
+                                                  model, scheduler, mocker):
+    events = []
+
+    def added(channel):
+        events.append(channel.id_key)
+        channel.added_chatters.connect(
+            lambda ccs: events.append([cc.chatter.name for cc in ccs]))
+    model.channels.added.connect(added)
+
+    connection.batch_started.emit()
+    _join(connection, "me", "a")
+    connection.batch_finished.emit()
+    scheduler.flush()
+    assert events == [AEOLUS, ["me", "a"]]
+
+
+def test_leaving_a_channel_emits_pending_updates(controller, connection,
+                                                 model, scheduler):
+    _join(connection, "me")
+    channel = model.channels[AEOLUS]
+    events = _watch(channel)
+
+    connection.batch_started.emit()
+    _join(connection, "a")
+    connection.channel_chatter_left.emit(AEOLUS, _chatter("me"))
+    connection.quit_channel.emit(AEOLUS)
+    connection.batch_finished.emit()
+
+    assert AEOLUS not in model.channels
+    assert events == [("added", ["me", "a"]), ("removed", ["me"]),
+                      ("removed", ["a"])]
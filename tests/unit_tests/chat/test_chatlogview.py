@@ -0,0 +1,103 @@
+from PyQt5.QtCore import QPoint, Qt
+
+from chat.chatlogview import ChatLogView
+
+LINE = ('<tr class="player"><td width=100>{0}:</td>'
+        '<td width=100%>{1}</td></tr>')
+LINK = 'see <a href="http://faforever.com">faforever.com</a>'
+
+
+def _view(qtbot):
+    view = ChatLogView()
+    qtbot.addWidget(view)
+    view.resize(400, 300)
+    view.show()
+    qtbot.waitExposed(view)
+    return view
+
+
+def test_burst_of_lines_is_inserted_at_once(qtbot, mocker):
+    view = _view(qtbot)
+    inserted = mocker.Mock()
+    view.model().rowsInserted.connect(inserted)
+
+    for i in range(50):
+        view.append_line(LINE.format("someone", "line {}".format(i)))
+    assert view.model().rowCount() == 0
+    qtbot.waitUntil(lambda: view.model().rowCount() == 50)
+    assert inserted.call_count == 1
+
+
+def test_removing_lines_includes_pending_ones(qtbot):
+    view = _view(qtbot)
+    for i in range(5):
+        view.append_line(LINE.format("someone", "line {}".format(i)))
+    view.remove_lines(3)
+    texts = [view.model().index(row).data().text
+             for row in range(view.model().rowCount())]
+    assert texts == [LINE.format("someone", "line 3"),
+                     LINE.format("someone", "line 4")]
+
+
+def test_lines_are_laid_out_at_view_width(qtbot):
+    view = _view(qtbot)
+    view.append_line(LINE.format("someone", "word " * 200))
+    view.model().flush()
+    index = view.model().index(0)
+    narrow = view.sizeHintForIndex(index).height()
+
+    view.resize(800, 300)
+    qtbot.waitUntil(lambda: view.sizeHintForIndex(index).height() < narrow)
+
+
+def test_only_drawn_lines_are_laid_out(qtbot):
+    view = _view(qtbot)
+    for i in range(500):
+        view.append_line(LINE.format("someone", "word " * (i % 50)))
+    view.model().flush()
+    view.scrollToBottom()
+    qtbot.waitUntil(lambda: view.model().lines()[-1].width is not None)
+
+    width = view.itemDelegate().width
+    laid_out = [line for line in view.model().lines() if line.width == width]
+    assert len(laid_out) < 50
+
+    # Drawn lines get their real height
+    index = view.model().index(499)
+    qtbot.waitUntil(lambda: view.visualRect(index).height()
+                    == index.data().height)
+
+
+def test_resizing_lays_out_lines_again_once_it_stops(qtbot, mocker):
+    view = _view(qtbot)
+    qtbot.wait(view.RESIZE_DELAY * 2)
+    set_width = mocker.spy(view.itemDelegate(), "set_width")
+    for width in range(500, 600, 10):
+        view.resize(width, 300)
+        qtbot.wait(10)
+    qtbot.waitUntil(lambda: view.itemDelegate().width
+                    == view.viewport().width())
+    assert set_width.call_count == 2
+
+
+def test_clicking_link_emits_url(qtbot):
+    view = _view(qtbot)
+    view.append_line(LINE.format("someone", LINK))
+    view.model().flush()
+    qtbot.waitUntil(lambda: view.visualRect(view.model().index(0)).height() > 0)
+
+    rect = view.visualRect(view.model().index(0))
+    doc = view.itemDelegate().document(view.model().index(0).data())
+    link_pos = None
+    for x in range(0, rect.width(), 2):
+        for y in range(0, rect.height(), 2):
+            if doc.documentLayout().anchorAt(QPoint(x, y)):
+                link_pos = rect.topLeft() + QPoint(x, y)
+                break
+        if link_pos is not None:
+            break
+    assert link_pos is not None
+
+    with qtbot.waitSignal(view.url_clicked) as blocker:
+        qtbot.mouseClick(view.viewport(), Qt.LeftButton, pos=link_pos)
+    assert blocker.args[0].toString() == "http://faforever.com"
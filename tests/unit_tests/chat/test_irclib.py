@@ -0,0 +1,188 @@
+import random
+import re
+
+import pytest
+
+from chat import irclib
+
+
+# How messages were split before, kept to compare against
+_rfc_1459_command_regexp = re.compile(
+    "^(:(?P<prefix>[^ ]+) +)?(?P<command>[^ ]+)( *(?P<argument> .+))?")
+
+
+def _old_parse_message(line):
+    m = _rfc_1459_command_regexp.match(line)
+    if m is None:
+        return None
+    prefix = m.group("prefix") or None
+    command = m.group("command").lower()
+    arguments = []
+    if m.group("argument"):
+        a = m.group("argument").split(" :", 1)
+        arguments = a[0].split()
+        if len(a) == 2:
+            arguments.append(a[1])
+    return prefix, command, arguments
+
+
+LINES = [
+    ":nick!id@host PRIVMSG #aeolus :hello there",
+    ":nick!id@host PRIVMSG #aeolus ::starts with a colon",
+    ":nick!id@host PRIVMSG #aeolus :trailing  :with  spaces ",
+    ":irc.faforever.com 353 me = #aeolus :a @b +c ~d",
+    ":nick!id@host JOIN #aeolus",
+    ":nick!id@host JOIN :#aeolus",
+    ":nick!id@host QUIT :Quit: leaving",
+    ":nick!id@host   MODE   #aeolus  +o   other",
+    ":nick!id@host MODE #aeolus +o other ",
+    "PING :irc.faforever.com",
+    "PING irc.faforever.com",
+    "NOTICE AUTH :*** Looking up your hostname",
+    ":irc.faforever.com 001 me :Welcome",
+    ":prefix",
+    ":prefix   ",
+    ": command arg",
+    ":",
+    "COMMAND",
+    "COMMAND   ",
+    "COMMAND :",
+    "COMMAND a\tb :c",
+    ":nick!id@host PRIVMSG #ünïcode :ünïcode",
+]
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_messages_are_split_like_before(line):
+    assert irclib._parse_message(line) == _old_parse_message(line)
+
+
+def test_lines_without_command_are_skipped():
+    assert irclib._parse_message(" leading space") is None
+
+
+class _Socket:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def recv(self, size):
+        return self._chunks.pop(0)
+
+    def send(self, data):
+        pass
+
+
+def _connection(chunks):
+    irc = irclib.IRC()
+    events = []
+    irc.add_global_handler(
+        "all_events",
+        lambda c, e: events.append((e.eventtype(), e.source(), e.target(),
+                                    e.arguments())))
+    c = irc.server()
+    c.previous_buffer = bytearray()
+    c.handlers = {}
+    c.real_server_name = ""
+    c.real_nickname = "me"
+    c.ssl = None
+    c.socket = _Socket(chunks)
+    return c, events
+
+
+def _feed(chunks):
+    c, events = _connection(chunks)
+    for _ in chunks:
+        c.process_data()
+    return events
+
+
+SESSION = "\r\n".join([
+    ":irc.faforever.com 001 me :Welcome to the FAF IRC Network me",
+    ":irc.faforever.com 353 me = #aeolus :me @mod +voiced ümläut",
+    ":nick!1@host JOIN :#aeolus",
+    ":nick!1@host PRIVMSG #aeolus :gl hf ☢",
+    ":nick!1@host PRIVMSG #aeolus :\x01ACTION waves\x01",
+    ":NickServ!NickServ@services. NOTICE me :Password accepted",
+    ":ChanServ!ChanServ@services. MODE #aeolus +o nick",
+    ":ChanServ!ChanServ@services. MODE me +x",
+    ":nick!1@host NICK :other",
+    ":other!1@host PART #aeolus :bye",
+    ":other!1@host QUIT :Quit: leaving",
+    "PING :irc.faforever.com",
+]).encode() + b"\r\n"
+
+
+def test_session_events():
+    events = _feed([SESSION])
+    assert [e[0] for e in events] == [
+        "welcome", "namreply", "join", "pubmsg", "ctcp", "action",
+        "privnotice", "mode", "umode", "nick", "part", "quit", "ping"]
+    assert events[1] == ("namreply", "irc.faforever.com", "me",
+                         ["=", "#aeolus", "me @mod +voiced ümläut"])
+    assert events[3] == ("pubmsg", "nick!1@host", "#aeolus", ["gl hf ☢"])
+    assert events[5] == ("action", "nick!1@host", "#aeolus", ["waves"])
+    assert events[11] == ("quit", "other!1@host", None, ["Quit: leaving"])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_reads_can_split_lines_anywhere(seed):
+    rng = random.Random(seed)
+    data = SESSION.replace(b"\r\n", rng.choice([b"\r\n", b"\n"]))
+    cuts = sorted(rng.sample(range(1, len(data)), 15))
+    chunks = [data[a:b] for a, b in zip([0] + cuts, cuts + [len(data)])]
+    assert _feed(chunks) == _feed([SESSION])
+
+
+def test_invalid_utf8_is_replaced():
+    events = _feed([b":nick!1@host PRIVMSG #aeolus :a\xffb\r\n"])
+    assert events == [("pubmsg", "nick!1@host", "#aeolus", ["a�b"])]
+
+
+@pytest.mark.parametrize("line, event", [
+    (b":n!1@h PRIVMSG #aeolus", ("privmsg", "n!1@h", "#aeolus", [])),
+    (b":n!1@h PRIVMSG", ("privmsg", "n!1@h", None, [])),
+    (b":n!1@h NOTICE me", ("notice", "n!1@h", "me", [])),
+    (b":me!1@h NICK", ("nick", "me!1@h", None, [])),
+    (b":irc.faforever.com 001", ("welcome", "irc.faforever.com", None, [])),
+])
+def test_messages_with_missing_arguments(line, event):
+    c, events = _connection([line + b"\r\n"])
+    c.process_data()
+    assert events == [event]
+    assert c.real_nickname == "me"
+
+
+def test_raw_messages_only_made_for_listeners():
+    c, events = _connection([b"PING :a\r\n", b"PING :b\r\n"])
+    c.process_data()
+    assert "all_raw_messages" not in [e[0] for e in events]
+
+    raw = []
+    c.irclibobj.add_global_handler(
+        "all_raw_messages", lambda c, e: raw.append(e.arguments()))
+    c.process_data()
+    assert raw == [["PING :b"]]
+
+
+def test_dispatcher_calls_handler_methods():
+    calls = []
+
+    class Client(irclib.SimpleIRCClient):
+        def on_join(self, c, e):
+            calls.append(("join", e.target()))
+
+        def on_default(self, c, e):
+            calls.append(("default", e.eventtype()))
+
+    client = Client()
+    client.ircobj.add_global_handler("all_raw_messages", lambda c, e: None)
+    c = client.connection
+    c.previous_buffer = bytearray()
+    c.handlers = {}
+    c.real_server_name = ""
+    c.real_nickname = "me"
+    c.ssl = None
+    c.socket = _Socket([b":n!1@h JOIN #a\r\n:n!1@h TOPIC #a :t\r\n"
+                        b":n!1@h JOIN #b\r\n"])
+    c.process_data()
+    assert calls == [("join", "#a"), ("default", "topic"), ("join", "#b")]
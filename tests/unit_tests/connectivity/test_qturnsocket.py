@@ -0,0 +1,89 @@
+import struct
+
+import pytest
+from PyQt5.QtNetwork import QHostAddress, QHostInfo
+
+from connectivity.qturnsocket import QTurnSocket
+from connectivity.relay import Relay
+from connectivity.telemetry import PeerTelemetry
+
+
+PEER = ("1.2.3.4", 6112)
+TURN = ("5.6.7.8", 3478)
+
+
+@pytest.fixture
+def data_cb(mocker):
+    return mocker.Mock()
+
+
+@pytest.fixture
+def socket(application, mocker, data_cb):
+    mocker.patch.object(QHostInfo, "lookupHost")
+    sock = QTurnSocket(0, data_cb)
+    info = mocker.Mock()
+    info.addresses.return_value = [QHostAddress(TURN[0])]
+    sock.turn_port = TURN[1]
+    sock._looked_up(info)
+    yield sock
+    sock.close()
+
+
+def test_routed_peer_data_skips_callback(socket, data_cb, mocker):
+    route = mocker.Mock()
+    socket.add_route(PEER, route)
+    socket.handle_data(PEER, b'\x01game data')
+    route.assert_called_once_with(b'\x01game data')
+    assert not data_cb.called
+
+
+def test_nat_packets_from_routed_peers_go_to_callback(socket, data_cb, mocker):
+    route = mocker.Mock()
+    socket.add_route(PEER, route)
+    socket.handle_data(PEER, b'\x08Bind1')
+    data_cb.assert_called_once_with(PEER, b'\x08Bind1')
+    assert not route.called
+
+
+def test_unrouted_data_goes_to_callback(socket, data_cb):
+    socket.handle_data(PEER, b'\x01game data')
+    data_cb.assert_called_once_with(PEER, b'\x01game data')
+
+
+def test_channel_data_from_relay_is_routed(socket, data_cb, mocker):
+    route = mocker.Mock()
+    socket.add_route(PEER, route)
+    socket.channel_bound(PEER, 0x4001)
+    payload = b'relayed game data'
+    socket.handle_data(TURN, struct.pack('!HH', 0x4001, len(payload)) + payload + b'\0\0\0')
+    route.assert_called_once_with(payload)
+    assert not data_cb.called
+
+
+def test_sendto_uses_relay_for_bound_peers(socket, mocker):
+    send_to = mocker.patch.object(socket._session, "send_to")
+    write = mocker.patch.object(socket, "writeDatagram")
+    socket.channel_bound(PEER, 0x4001)
+    socket.sendto(b'data', PEER)
+    send_to.assert_called_once_with(b'data', PEER)
+    assert not write.called
+
+
+def test_sendto_reuses_host_addresses(socket, mocker):
+    write = mocker.patch.object(socket, "writeDatagram")
+    socket.sendto(b'data', PEER)
+    socket.sendto(b'more data', PEER)
+    assert write.call_count == 2
+    first, second = (call[0][1] for call in write.call_args_list)
+    assert first is second
+    assert first == QHostAddress(PEER[0])
+
+
+def test_relay_counts_traffic(application, mocker):
+    sent = mocker.Mock()
+    telemetry = PeerTelemetry(PEER)
+    relay = Relay(6113, "Peer", 2, sent, telemetry)
+    relay.send(b'12345')
+    relay.send(b'123')
+    assert (telemetry.packets_in, telemetry.bytes_in) == (2, 8)
+    assert (telemetry.packets_out, telemetry.bytes_out) == (0, 0)
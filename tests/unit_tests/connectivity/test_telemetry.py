@@ -0,0 +1,79 @@
+from connectivity.telemetry import ConnectivityTelemetry, Histogram, PeerTelemetry
+
+
+PEER = ("1.2.3.4", 6112)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_histogram_buckets():
+    hist = Histogram(bounds=(10, 100))
+    for value in [1, 10, 11, 50, 500]:
+        hist.add(value)
+    assert hist.counts == [2, 2, 1]
+    assert hist.count == 5
+    assert hist.max == 500
+    assert hist.mean == 572 / 5
+    assert hist.percentile(40) == 10
+    assert hist.percentile(80) == 100
+    assert hist.percentile(100) == 500
+
+
+def test_empty_histogram():
+    hist = Histogram()
+    assert hist.percentile(50) == 0
+    assert str(hist) == "no samples"
+
+
+def test_steady_traffic_has_no_jitter():
+    clock = Clock()
+    peer = PeerTelemetry(PEER, clock)
+    for _ in range(10):
+        peer.packet_in(100)
+        clock.now += 0.02
+    assert peer.jitter == 0
+    assert peer.interarrival.count == 9
+    assert peer.packets_in == 10
+    assert peer.bytes_in == 1000
+
+
+def test_uneven_traffic_has_jitter():
+    clock = Clock()
+    peer = PeerTelemetry(PEER, clock)
+    for i in range(10):
+        peer.packet_in(100)
+        clock.now += 0.01 if i % 2 else 0.05
+    assert peer.jitter > 0
+
+
+def test_delay_and_loss_from_nat_packets():
+    clock = Clock()
+    telemetry = ConnectivityTelemetry(lambda addr: False, clock)
+    telemetry.nat_packet_sent(PEER)
+    clock.now += 0.03
+    telemetry.nat_packet_received(PEER)
+    telemetry.nat_packet_sent(PEER)
+
+    peer = telemetry.peers[PEER]
+    assert peer.nat_delay.count == 1
+    assert abs(peer.nat_delay.mean - 30) < 1e-6
+    assert peer.loss == 50
+
+
+def test_report_and_dump(tmpdir):
+    telemetry = ConnectivityTelemetry(lambda addr: addr == PEER)
+    telemetry.peer(PEER, "Peer", 2).packet_in(10)
+    report = telemetry.report()
+    assert "Peer (2) at 1.2.3.4:6112, relay" in report
+    assert "in: 1 packets, 10 bytes" in report
+
+    filename = str(tmpdir.join("stats.txt"))
+    telemetry.dump(filename)
+    with open(filename) as f:
+        assert report in f.read()
@@ -0,0 +1,90 @@
+import struct
+
+from connectivity.stun import STUNMessage, STUN_METHOD_VALUES
+from connectivity.turn import TURNSession
+
+
+class FakeSession(TURNSession):
+    def __init__(self):
+        TURNSession.__init__(self)
+        self.written = []
+        self.calls = []
+
+    def _write(self, data):
+        self.written.append(bytes(data))
+
+    def _call_in(self, func, timeout):
+        self.calls.append(func)
+
+    def _recv(self, channel, data):
+        pass
+
+    def _recvfrom(self, sender, data):
+        pass
+
+    def channel_bound(self, address, channel):
+        pass
+
+    def state_changed(self, new_state):
+        pass
+
+    def run_calls(self):
+        calls, self.calls = self.calls, []
+        for call in calls:
+            call()
+
+
+def _peer_addresses(data):
+    method, length, _, _ = STUNMessage.parse_header(data)
+    attrs = STUNMessage.parse_body(data[20:20 + length])
+    return (STUN_METHOD_VALUES[method],
+            [val for type_, val in attrs if type_ == 'XOR-PEER-ADDRESS'])
+
+
+def test_send_to_bound_peer_uses_channel_data():
+    session = FakeSession()
+    session.bindings[("1.2.3.4", 6112)] = 0x4003
+    session.send_to(b'data', ("1.2.3.4", 6112))
+    session.send_to(b'more', 0x4004)
+    assert session.written == [struct.pack('!HH', 0x4003, 4) + b'data',
+                               struct.pack('!HH', 0x4004, 4) + b'more']
+
+
+def test_permissions_are_batched():
+    session = FakeSession()
+    peers = [("1.2.3.{}".format(i), 6112) for i in range(5)]
+    for peer in peers:
+        session.permit(peer)
+    session.permit(peers[0])
+    assert session.written == []
+    assert len(session.calls) == 1
+
+    session.run_calls()
+    assert len(session.written) == 1
+    method, addresses = _peer_addresses(session.written[0])
+    assert method == 'CreatePermission'
+    assert addresses == peers
+
+
+def test_big_permission_batches_are_split():
+    session = FakeSession()
+    session.MAX_PERMISSIONS_PER_REQUEST = 2
+    for i in range(5):
+        session.permit(("1.2.3.{}".format(i), 6112))
+    session.run_calls()
+    assert [len(_peer_addresses(d)[1]) for d in session.written] == [2, 2, 1]
+
+
+def test_refresh_renews_permissions():
+    session = FakeSession()
+    peers = [("1.2.3.{}".format(i), 6112) for i in range(3)]
+    for peer in peers:
+        session.permit(peer)
+    session.run_calls()
+    session.written = []
+
+    session.refresh()
+    permissions = [_peer_addresses(d) for d in session.written
+                   if _peer_addresses(d)[0] == 'CreatePermission']
+    assert len(permissions) == 1
+    assert sorted(permissions[0][1]) == peers
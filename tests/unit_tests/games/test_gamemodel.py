@@ -0,0 +1,123 @@
+import copy
+
+import pytest
+from PyQt5.QtCore import Qt
+
+from model.game import Game, GameState, GameVisibility
+from model.gameset import Gameset, PlayerGameIndex
+from model.player import Player
+from model.playerset import Playerset
+
+GAME_DICT = {
+    "uid": 1,
+    "state": GameState.OPEN,
+    "launched_at": 10000,
+    "num_players": 2,
+    "max_players": 8,
+    "title": "Sentons sucks",
+    "host": "Alice",
+    "mapname": "Sentons Ultimate 6v6",
+    "map_file_path": "xrca_co_000001.scfamap",
+    "teams": {1: ["Alice"], 2: ["Bob"]},
+    "featured_mod": "faf",
+    "featured_mod_versions": {},
+    "sim_mods": {},
+    "password_protected": True,
+    "visibility": GameVisibility.PUBLIC,
+}
+
+
+@pytest.fixture(scope="module")
+def gamemodel(application):
+    # The games package pulls in the client window on import
+    import client  # noqa: F401
+    from games import gamemodel
+    return gamemodel
+
+
+@pytest.fixture
+def playerset():
+    return Playerset()
+
+
+@pytest.fixture
+def gameset(playerset):
+    gameset = Gameset(playerset)
+    gameset._index = PlayerGameIndex(gameset, playerset)
+    return gameset
+
+
+@pytest.fixture
+def me(mocker):
+    me = mocker.Mock()
+    me.relations.model.is_friend.side_effect = lambda id_: id_ == 1
+    return me
+
+
+@pytest.fixture
+def sort_model(gamemodel, me, gameset, playerset, mocker):
+    model = gamemodel.GameModel(me, mocker.Mock(), gameset, playerset)
+    sort_model = gamemodel.GameSortModel(me, model)
+    sort_model.sort_type = sort_model.SortType.AVERAGE_RATING
+    return sort_model
+
+
+def _add_game(gameset, playerset, uid, host, players,
+              mapname=GAME_DICT["mapname"]):
+    data = copy.deepcopy(GAME_DICT)
+    data.update(uid=uid, host=host, teams={1: players}, mapname=mapname)
+    gameset[uid] = Game(playerset=playerset, **data)
+
+
+def _uids(sort_model):
+    return [sort_model.data(sort_model.index(row, 0), Qt.DisplayRole).game.uid
+            for row in range(sort_model.rowCount())]
+
+
+def test_sort_follows_players_that_connect_later(sort_model, gameset,
+                                                 playerset, qtbot):
+    _add_game(gameset, playerset, 1, "Alice", ["Alice"])
+    _add_game(gameset, playerset, 2, "Bob", ["Bob"])
+    assert _uids(sort_model) == [1, 2]
+
+    playerset[2] = Player(id_=2, login="Bob", global_rating=(2000, 0))
+    qtbot.waitUntil(lambda: _uids(sort_model) == [2, 1])
+
+    playerset[3] = Player(id_=3, login="Alice", global_rating=(1500, 0))
+    playerset[3].update(global_rating=(2500, 0))
+    qtbot.waitUntil(lambda: _uids(sort_model) == [1, 2])
+
+    del playerset[3]
+    qtbot.waitUntil(lambda: _uids(sort_model) == [2, 1])
+
+
+def test_sort_follows_host_that_connects_later(sort_model, gameset,
+                                               playerset, qtbot):
+    _add_game(gameset, playerset, 1, "Alice", ["Alice"])
+    _add_game(gameset, playerset, 2, "Bob", [])
+    assert _uids(sort_model) == [1, 2]
+
+    # Games hosted by friends go first, even if the host isn't in the game
+    playerset[1] = Player(id_=1, login="Bob")
+    qtbot.waitUntil(lambda: _uids(sort_model) == [2, 1])
+
+    del playerset[1]
+    qtbot.waitUntil(lambda: _uids(sort_model) == [1, 2])
+
+
+def test_games_share_one_preview_connection(gamemodel, me, gameset,
+                                            playerset, qtbot, mocker):
+    from fa import maps
+    cache = maps.preview_cache
+    connections = cache.receivers(cache.preview_ready)
+    model = gamemodel.GameModel(me, mocker.Mock(), gameset, playerset)
+    _add_game(gameset, playerset, 1, "Alice", [], "SCMP_009")
+    _add_game(gameset, playerset, 2, "Bob", [], "SCMP_010")
+    assert cache.receivers(cache.preview_ready) == connections + 1
+
+    changed = mocker.Mock()
+    model.dataChanged.connect(changed)
+    cache.preview_ready.emit("scmp_010")
+    qtbot.waitUntil(lambda: changed.called)
+    first, last = changed.call_args[0][:2]
+    assert (first.row(), last.row()) == (1, 1)
@@ -94,3 +94,29 @@ def test_negative_remove_number_is_value_error():
     lines = Lines()
     with pytest.raises(ValueError):
         lines.remove_lines(-5)
+
+
+def test_lines_wrap_around_their_buffer():
+    lines = Lines()
+    expected = []
+    for item in range(1000):
+        lines.add_line(item)
+        expected.append(item)
+        if len(lines) > 100:
+            lines.remove_lines(30)
+            del expected[:30]
+        assert len(lines) == len(expected)
+    assert [i for i in lines] == expected
+    assert lines[0] == expected[0]
+    assert lines[-1] == expected[-1]
+    assert lines[5] == expected[5]
+    assert len(lines._buffer) <= 128
+
+
+def test_lines_index_out_of_range_is_index_error():
+    lines = Lines()
+    lines.add_line("a")
+    with pytest.raises(IndexError):
+        lines[1]
+    with pytest.raises(IndexError):
+        lines[-2]
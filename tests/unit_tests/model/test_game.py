@@ -100,3 +100,36 @@ def test_can_update_to_none(playerset, mocker):
     g = game.Game(playerset=playerset, **data)
     g.update(launched_at=None)
     assert g.launched_at is None
+
+
+def test_update_passes_snapshot_with_changed_fields(playerset, mocker):
+    data = copy.deepcopy(DEFAULT_DICT)
+    g = game.Game(playerset=playerset, **data)
+    updated = mocker.Mock()
+    g.updated.connect(updated)
+
+    data["title"] = "Other title"
+    data["state"] = game.GameState.PLAYING
+    g.update(**data)
+
+    new, old = updated.call_args[0]
+    assert new is g
+    assert old.changed == {"title", "state"}
+    assert old.title == "Sentons sucks"
+    assert old.state == game.GameState.OPEN
+    assert old.id_key == g.id_key
+    assert sorted(old.players) == sorted(g.players)
+    assert not old.closed()
+
+
+def test_abort_snapshot_is_not_closed(playerset, mocker):
+    data = copy.deepcopy(DEFAULT_DICT)
+    g = game.Game(playerset=playerset, **data)
+    updated = mocker.Mock()
+    g.updated.connect(updated)
+    g.abort_game()
+
+    new, old = updated.call_args[0]
+    assert new.closed()
+    assert not old.closed()
+    assert old.changed == {"state"}
@@ -194,3 +194,30 @@ def test_no_state_changes(playerset, mocker):
     assert not lobby.called
     assert not live.called
     assert not closed.called
+
+
+def test_set_items_emits_one_batch(mocker, playerset):
+    s = gameset.Gameset(playerset=playerset)
+    added = mocker.Mock()
+    batch_added = mocker.Mock()
+    s.added.connect(added)
+    s.batch_added.connect(batch_added)
+
+    games = []
+    for uid, state in [(1, game.GameState.OPEN), (2, game.GameState.PLAYING),
+                       (3, game.GameState.CLOSED)]:
+        data = copy.deepcopy(DEFAULT_DICT)
+        data["uid"] = uid
+        data["state"] = state
+        games.append(game.Game(playerset=playerset, **data))
+
+    result = s.set_items(games)
+    assert result == games[:2]
+    assert 1 in s and 2 in s and 3 not in s
+    assert not added.called
+    batch_added.assert_called_once_with(games[:2])
+
+    data = copy.deepcopy(DEFAULT_DICT)
+    data["uid"] = 4
+    s[4] = game.Game(playerset=playerset, **data)
+    assert added.called
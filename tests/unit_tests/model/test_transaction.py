@@ -0,0 +1,152 @@
+import copy
+
+from model import game
+from model.transaction import ModelTransaction, TransactionScheduler
+
+DEFAULT_DICT = {
+    "uid":  1,
+    "state": game.GameState.OPEN,
+    "launched_at": 10000,
+    "num_players": 3,
+    "max_players": 8,
+    "title": "Sentons sucks",
+    "host":  "IllIIIlIlIIIlI",
+    "mapname": "Sentons Ultimate 6v6",
+    "map_file_path": "xrca_co_000001.scfamap",
+    "teams": {
+        1: ["IllIIIlIlIIIlI", "TableNoob"],
+        2: ["Kraut"]
+        },
+    "featured_mod": "faf",
+    "featured_mod_versions": {},
+    "sim_mods": {},
+    "password_protected": False,
+    "visibility": game.GameVisibility.PUBLIC,
+}
+
+
+def _game(playerset, uid=1):
+    data = copy.deepcopy(DEFAULT_DICT)
+    data["uid"] = uid
+    return game.Game(playerset=playerset, **data)
+
+
+def test_transaction_emits_every_update(playerset, mocker):
+    g = _game(playerset)
+    updated = mocker.Mock()
+    g.updated.connect(updated)
+
+    t = ModelTransaction()
+    g.update(title="First", _transaction=t)
+    g.update(title="Second", _transaction=t)
+    assert not updated.called
+    t.finalize()
+    assert updated.call_count == 2
+
+
+def test_coalescing_transaction_merges_updates(playerset, mocker):
+    g = _game(playerset)
+    g2 = _game(playerset, 2)
+    updated = mocker.Mock()
+    g.updated.connect(updated)
+    g2.updated.connect(updated)
+
+    t = ModelTransaction(coalesce=True)
+    g.update(title="First", _transaction=t)
+    g2.update(title="Other", _transaction=t)
+    g.update(host="Someone", _transaction=t)
+    t.finalize()
+
+    assert updated.call_count == 2
+    (new, old), _ = updated.call_args_list[0]
+    assert new is g
+    assert old.title == "Sentons sucks"
+    assert old.host == "IllIIIlIlIIIlI"
+    assert old.changed == {"title", "host"}
+    (new, old), _ = updated.call_args_list[1]
+    assert new is g2
+
+
+def test_scheduler_defers_and_coalesces(playerset, mocker):
+    g = _game(playerset)
+    updated = mocker.Mock()
+    g.updated.connect(updated)
+    scheduler = TransactionScheduler()
+
+    for title in ["One", "Two", "Three"]:
+        t = scheduler.transaction()
+        g.update(title=title, _transaction=t)
+        t.finalize()
+    assert g.title == "Three"
+    assert not updated.called
+
+    scheduler.flush()
+    assert updated.call_count == 1
+    new, old = updated.call_args[0]
+    assert old.title == "Sentons sucks"
+    assert old.changed == {"title"}
+
+    scheduler.flush()
+    assert updated.call_count == 1
+
+
+def _channel(name):
+    from model.chat.channel import Channel, ChannelID, ChannelType
+    return Channel(ChannelID(ChannelType.PUBLIC, name), [], "")
+
+
+def _cc(channel, name):
+    from model.chat.channelchatter import ChannelChatter
+    from model.chat.chatter import Chatter
+    return ChannelChatter(channel, Chatter(name, None), "")
+
+
+def test_transaction_batches_items_per_owner(mocker):
+    c1, c2 = _channel("#a"), _channel("#b")
+    added = mocker.Mock()
+    c1.added_chatters.connect(added)
+    c2.added_chatters.connect(added)
+
+    t = ModelTransaction()
+    ccs = [_cc(c, str(i)) for i in range(3) for c in [c1, c2]]
+    for cc in ccs:
+        cc.channel.add_chatter(cc, t)
+    assert not added.called
+    t.finalize()
+
+    assert added.call_count == 2
+    assert added.call_args_list[0][0][0] == ccs[0::2]
+    assert added.call_args_list[1][0][0] == ccs[1::2]
+
+
+def test_batches_keep_order_of_different_signals(mocker):
+    c = _channel("#a")
+    events = []
+    c.added_chatters.connect(lambda ccs: events.append(("added", ccs)))
+    c.removed_chatters.connect(lambda ccs: events.append(("removed", ccs)))
+    a, b = _cc(c, "a"), _cc(c, "b")
+
+    t = ModelTransaction()
+    c.add_chatter(a, t)
+    c.add_chatter(b, t)
+    c.remove_chatter(a, t)
+    c.add_chatter(a, t)
+    t.finalize()
+    assert events == [("added", [a, b]), ("removed", [a]), ("added", [a])]
+
+
+def test_scheduler_merges_batches_of_transactions(mocker):
+    c = _channel("#a")
+    added = mocker.Mock()
+    c.added_chatters.connect(added)
+    scheduler = TransactionScheduler()
+
+    ccs = [_cc(c, str(i)) for i in range(5)]
+    for cc in ccs:
+        t = scheduler.transaction()
+        c.add_chatter(cc, t)
+        t.finalize()
+    assert not added.called
+
+    scheduler.flush()
+    added.assert_called_once_with(ccs)
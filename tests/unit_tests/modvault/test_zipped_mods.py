@@ -0,0 +1,112 @@
+import os
+import zipfile
+
+import pytest
+
+from modvault import utils
+
+
+MOD_INFO = """name = "Some Mod"
+uid = "some-mod-uid"
+version = 3
+author = "someone"
+ui_only = true
+"""
+
+
+@pytest.fixture
+def mod_folder(tmpdir, mocker):
+    folder = tmpdir.mkdir("mods")
+    mocker.patch.object(utils, "MODFOLDER", str(folder))
+    mocker.patch.object(utils, "modCache", {})
+    mocker.patch.object(utils, "zippedModCache",
+                        utils.ZippedModCache(str(tmpdir.join("zipped.json"))))
+    return folder
+
+
+def _add_zip(folder, name, files):
+    path = str(folder.join(name))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for member, data in files.items():
+            zf.writestr(member, data)
+    return path
+
+
+def test_zipped_mod_info_is_read_without_verifying_the_zip(mod_folder, mocker):
+    _add_zip(mod_folder, "some_mod.zip", {"some_mod/mod_info.lua": MOD_INFO,
+                                          "some_mod/big.bin": b"x" * 10000})
+    testzip = mocker.spy(zipfile.ZipFile, "testzip")
+
+    mods = utils.getInstalledMods()
+    assert [(m.uid, m.version, m.ui_only) for m in mods] == \
+        [("some-mod-uid", 3, True)]
+    assert mods[0].totalname == "Some Mod v3"
+    assert not testzip.called
+
+
+def test_zipped_mod_info_is_kept_between_runs(mod_folder, mocker, tmpdir):
+    _add_zip(mod_folder, "some_mod.zip", {"some_mod/mod_info.lua": MOD_INFO})
+    _add_zip(mod_folder, "broken.zip", {"readme.txt": "no mod here"})
+    assert len(utils.getInstalledMods()) == 1
+
+    mocker.patch.object(utils, "modCache", {})
+    mocker.patch.object(utils, "zippedModCache",
+                        utils.ZippedModCache(str(tmpdir.join("zipped.json"))))
+    read = mocker.spy(utils, "readModInfoFromZip")
+    assert [m.uid for m in utils.getInstalledMods()] == ["some-mod-uid"]
+    assert not read.called
+
+
+def test_changed_zips_are_read_again(mod_folder, mocker):
+    path = _add_zip(mod_folder, "some_mod.zip",
+                    {"some_mod/mod_info.lua": MOD_INFO})
+    os.utime(path, (1000, 1000))
+    utils.getInstalledMods()
+
+    _add_zip(mod_folder, "some_mod.zip",
+             {"some_mod/mod_info.lua": MOD_INFO.replace("3", "4")})
+    os.utime(path, (2000, 2000))
+    mocker.patch.object(utils, "modCache", {})
+    assert [m.version for m in utils.getInstalledMods()] == [4]
+
+
+def test_invalid_zips_are_skipped(mod_folder):
+    mod_folder.join("not_a.zip").write("garbage")
+    assert utils.getInstalledMods() == []
+
+
+def test_checker_finds_corrupt_files(tmpdir, qtbot):
+    path = _add_zip(tmpdir, "some_mod.zip", {"mod_info.lua": MOD_INFO,
+                                             "data.bin": b"\0" * 1000})
+    with open(path, "rb") as fh:
+        data = bytearray(fh.read())
+    offset = data.index(b"data.bin") + len("data.bin")
+    data[offset] ^= 0xff
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+    checker = utils.ZippedModChecker()
+    with qtbot.waitSignal(checker.checked) as blocker:
+        checker.check(path)
+    assert blocker.args == [path, "data.bin"]
+
+
+def test_checker_accepts_good_zips(tmpdir, qtbot):
+    path = _add_zip(tmpdir, "some_mod.zip", {"mod_info.lua": MOD_INFO})
+    checker = utils.ZippedModChecker()
+    with qtbot.waitSignal(checker.checked) as blocker:
+        checker.check(path)
+    assert blocker.args == [path, None]
+
+
+def test_corrupt_zips_are_forgotten_until_they_change(mod_folder, mocker):
+    path = _add_zip(mod_folder, "some_mod.zip", {"mod_info.lua": MOD_INFO})
+    os.utime(path, (1000, 1000))
+    assert len(utils.getInstalledMods()) == 1
+
+    utils.forgetCorruptZip(path)
+    assert utils.installedMods == []
+    assert utils.getInstalledMods() == []
+
+    os.utime(path, (2000, 2000))
+    assert len(utils.getInstalledMods()) == 1
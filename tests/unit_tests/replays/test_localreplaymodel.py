@@ -0,0 +1,153 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def replays(application):
+    # The replays package pulls in the client window on import
+    import client  # noqa: F401
+    from replays import localreplaymodel, replayindex
+    return localreplaymodel, replayindex
+
+
+def _write_replay(directory, uid, complete=True):
+    info = {
+        "uid": uid,
+        "complete": complete,
+        "num_players": 2,
+        "launched_at": 1000 + uid,
+        "mapname": "setons clutch",
+        "title": "game {}".format(uid),
+        "featured_mod": "faf",
+        "teams": {"1": ["Alice"], "2": ["Bob"]},
+    }
+    filename = "{}-Alice.fafreplay".format(uid)
+    with open(os.path.join(directory, filename), "wt") as fh:
+        fh.write(json.dumps(info) + "\n")
+        fh.write("AAAAAA==")
+    return filename
+
+
+@pytest.fixture
+def replay_dir(tmpdir):
+    return str(tmpdir.mkdir("replays"))
+
+
+@pytest.fixture
+def db_file(tmpdir):
+    return str(tmpdir.join("index.sqlite"))
+
+
+def test_model_shows_replays_of_reopened_index(replays, replay_dir, db_file):
+    localreplaymodel, replayindex = replays
+    _write_replay(replay_dir, 1)
+    _write_replay(replay_dir, 2)
+    _write_replay(replay_dir, 3, complete=False)
+    index = replayindex.LocalReplayIndex(replay_dir, db_file)
+    index.refresh()
+    index.close()
+
+    index = replayindex.LocalReplayIndex(replay_dir, db_file)
+    model = localreplaymodel.LocalReplayModel(index)
+    assert model.rowCount() == 2
+    day, incomplete = model.index(0, 0), model.index(1, 0)
+    assert model.data(model.index(0, 3)) == "2 replays"
+    assert model.data(incomplete) == replayindex.ReplayStatus.INCOMPLETE
+
+    assert model.canFetchMore(day)
+    model.fetchMore(day)
+    assert model.rowCount(day) == 2
+    assert [model.record(model.index(row, 0, day)).filename
+            for row in range(2)] == ["2-Alice.fafreplay", "1-Alice.fafreplay"]
+    index.close()
+
+
+@pytest.fixture
+def index(replays, replay_dir, db_file):
+    index = replays[1].LocalReplayIndex(replay_dir, db_file)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def model(replays, index):
+    return replays[0].LocalReplayModel(index)
+
+
+def _refresh(index, model):
+    added, removed = index.refresh()
+    model.update(added, removed)
+
+
+def _filenames(model, parent):
+    return [model.record(model.index(row, 0, parent)).filename
+            for row in range(model.rowCount(parent))]
+
+
+def test_model_fetches_rows_in_batches(replay_dir, index, model):
+    for uid in range(1, 6):
+        _write_replay(replay_dir, uid)
+    _refresh(index, model)
+    model.FETCH_BATCH = 2
+
+    day = model.index(0, 0)
+    assert model.hasChildren(day)
+    assert model.rowCount(day) == 0
+    assert model.data(model.index(0, 3)) == "5 replays"
+
+    fetches = 0
+    while model.canFetchMore(day):
+        model.fetchMore(day)
+        fetches += 1
+    assert fetches == 3
+    assert _filenames(model, day) == ["{}-Alice.fafreplay".format(uid)
+                                      for uid in range(5, 0, -1)]
+
+
+def test_model_release_forgets_fetched_rows(replay_dir, index, model,
+                                            qtmodeltester):
+    for uid in range(1, 4):
+        _write_replay(replay_dir, uid)
+    _refresh(index, model)
+    day = model.index(0, 0)
+    model.fetchMore(day)
+
+    model.release(day)
+    assert model.rowCount(day) == 0
+    assert model.canFetchMore(day)
+    assert model.data(model.index(0, 3)) == "3 replays"
+    model.fetchMore(day)
+    assert model.rowCount(day) == 3
+    qtmodeltester.check(model)
+
+
+def test_model_inserts_and_removes_rows_and_buckets(replay_dir, index, model):
+    _write_replay(replay_dir, 1)
+    _write_replay(replay_dir, 3)
+    _refresh(index, model)
+    day = model.index(0, 0)
+    model.fetchMore(day)
+
+    # New rows land in their sorted place among the fetched ones
+    _write_replay(replay_dir, 2)
+    _write_replay(replay_dir, 4, complete=False)
+    _refresh(index, model)
+    assert model.rowCount() == 2
+    assert _filenames(model, day) == ["3-Alice.fafreplay",
+                                      "2-Alice.fafreplay",
+                                      "1-Alice.fafreplay"]
+
+    # Rows of unfetched buckets are only counted
+    incomplete = model.index(1, 0)
+    assert model.rowCount(incomplete) == 0
+    assert model.data(model.index(1, 3)) == "1 replays"
+
+    os.remove(os.path.join(replay_dir, "2-Alice.fafreplay"))
+    os.remove(os.path.join(replay_dir, "4-Alice.fafreplay"))
+    _refresh(index, model)
+    assert model.rowCount() == 1
+    assert _filenames(model, day) == ["3-Alice.fafreplay",
+                                      "1-Alice.fafreplay"]
+    assert model.data(model.index(0, 3)) == "2 replays"
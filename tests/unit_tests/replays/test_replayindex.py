@@ -0,0 +1,124 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def replayindex(application):
+    # The replays package pulls in the client window on import
+    import client  # noqa: F401
+    from replays import replayindex
+    return replayindex
+
+
+def _write_replay(directory, filename, info):
+    with open(os.path.join(directory, filename), "wt") as fh:
+        fh.write(json.dumps(info) + "\n")
+        fh.write("AAAAAA==")
+
+
+def _info(uid, mapname="setons clutch", mod="faf", teams=None, **kwargs):
+    info = {
+        "uid": uid,
+        "complete": True,
+        "num_players": 2,
+        "launched_at": 1000 + uid,
+        "mapname": mapname,
+        "title": "game {}".format(uid),
+        "featured_mod": mod,
+        "teams": teams or {"1": ["Alice"], "2": ["Bob"]},
+    }
+    info.update(kwargs)
+    return info
+
+
+@pytest.fixture
+def replay_dir(tmpdir):
+    return str(tmpdir.mkdir("replays"))
+
+
+@pytest.fixture
+def index(replayindex, replay_dir, tmpdir):
+    index = replayindex.LocalReplayIndex(replay_dir, str(tmpdir.join("index.sqlite")))
+    yield index
+    index.close()
+
+
+def test_index_reports_new_files_once(replay_dir, index):
+    _write_replay(replay_dir, "1-Alice.fafreplay", _info(1))
+    _write_replay(replay_dir, "2-Alice.fafreplay", _info(2))
+
+    added, removed = index.refresh()
+    assert sorted(added) == ["1-Alice.fafreplay", "2-Alice.fafreplay"]
+    assert removed == []
+    assert index.refresh() == ([], [])
+
+
+def test_index_reports_removed_and_changed_files(replay_dir, index):
+    _write_replay(replay_dir, "1-Alice.fafreplay", _info(1))
+    _write_replay(replay_dir, "2-Alice.fafreplay", _info(2))
+    index.refresh()
+
+    os.remove(os.path.join(replay_dir, "1-Alice.fafreplay"))
+    _write_replay(replay_dir, "2-Alice.fafreplay", _info(2, title="a much longer title"))
+
+    added, removed = index.refresh()
+    assert added == ["2-Alice.fafreplay"]
+    assert sorted(removed) == ["1-Alice.fafreplay", "2-Alice.fafreplay"]
+    record, = index.records()
+    assert record.title == "a much longer title"
+
+
+def test_index_survives_reopening(replayindex, replay_dir, tmpdir):
+    _write_replay(replay_dir, "1-Alice.fafreplay", _info(1))
+    db_file = str(tmpdir.join("index.sqlite"))
+    index = replayindex.LocalReplayIndex(replay_dir, db_file)
+    index.refresh()
+    index.close()
+
+    index = replayindex.LocalReplayIndex(replay_dir, db_file)
+    assert index.refresh() == ([], [])
+    record, = index.records()
+    assert record.teams == {"1": ["Alice"], "2": ["Bob"]}
+    index.close()
+
+
+def test_index_statuses(replayindex, replay_dir, index):
+    _write_replay(replay_dir, "1-Alice.fafreplay", _info(1))
+    _write_replay(replay_dir, "2-Alice.fafreplay", {"uid": 2, "complete": False})
+    with open(os.path.join(replay_dir, "3-Alice.fafreplay"), "wt") as fh:
+        fh.write("{garbage\n")
+    with open(os.path.join(replay_dir, "old.scfareplay"), "wb") as fh:
+        fh.write(b"Supreme Commander v1.50.3599\r\n")
+    with open(os.path.join(replay_dir, "notes.txt"), "wt") as fh:
+        fh.write("not a replay")
+    index.refresh()
+
+    ReplayStatus = replayindex.ReplayStatus
+    statuses = {r.filename: r.status for r in index.records()}
+    assert statuses == {
+        "1-Alice.fafreplay": ReplayStatus.COMPLETE,
+        "2-Alice.fafreplay": ReplayStatus.INCOMPLETE,
+        "3-Alice.fafreplay": ReplayStatus.BROKEN,
+        "old.scfareplay": ReplayStatus.LEGACY,
+    }
+
+
+def test_index_queries(replay_dir, index):
+    _write_replay(replay_dir, "1-Alice.fafreplay", _info(1))
+    _write_replay(replay_dir, "2-Alice.fafreplay", _info(2, mapname="theta passage"))
+    _write_replay(replay_dir, "3-Alice.fafreplay",
+                  _info(3, mod="ladder1v1", teams={"1": ["Alice"], "2": ["Carol"]}))
+    index.refresh()
+
+    def names(records):
+        return sorted(r.filename for r in records)
+
+    assert names(index.query(mapname="Setons Clutch")) == ["1-Alice.fafreplay", "3-Alice.fafreplay"]
+    assert names(index.query(featured_mod="ladder1v1")) == ["3-Alice.fafreplay"]
+    assert names(index.query(player="bob")) == ["1-Alice.fafreplay", "2-Alice.fafreplay"]
+    assert names(index.query(player="bob", mapname="theta passage")) == ["2-Alice.fafreplay"]
+    assert names(index.query(since=1002, until=1003)) == ["2-Alice.fafreplay"]
+    record, = index.query(player="carol")
+    assert record.teams == {"1": ["Alice"], "2": ["Carol"]}
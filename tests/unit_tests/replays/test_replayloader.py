@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def replayloader(application):
+    # The replays package pulls in the client window on import
+    import client  # noqa: F401
+    from replays import replayloader
+    return replayloader
+
+
+@pytest.fixture
+def replay_dir(tmpdir):
+    replay_dir = tmpdir.mkdir("replays")
+    for uid in range(10):
+        info = {"uid": uid, "complete": False}
+        replay_dir.join("{}-Alice.fafreplay".format(uid)).write(
+            json.dumps(info) + "\nAAAAAA==")
+    return str(replay_dir)
+
+
+@pytest.fixture
+def loader(replayloader, replay_dir, mocker):
+    mocker.patch.object(replayloader.ReplayHeaderLoader, "BATCH_SIZE", 3)
+    loader = replayloader.ReplayHeaderLoader(replay_dir)
+    yield loader
+    loader.cancel()
+    loader._pool.waitForDone()
+
+
+def _filenames(replay_dir):
+    return sorted(os.listdir(replay_dir))
+
+
+def test_loader_delivers_records_in_batches(loader, replay_dir, qtbot):
+    batches = []
+    progress = []
+    loader.batch_loaded.connect(batches.append)
+    loader.progress.connect(lambda loaded, total:
+                            progress.append((loaded, total)))
+
+    with qtbot.waitSignal(loader.finished):
+        loader.load(_filenames(replay_dir))
+
+    assert sorted(len(batch) for batch in batches) == [1, 3, 3, 3]
+    records = [r.filename for batch in batches for r in batch]
+    assert sorted(records) == _filenames(replay_dir)
+    assert progress[0] == (0, 10)
+    assert progress[-1] == (10, 10)
+    assert [loaded for loaded, _ in progress] == sorted(
+        loaded for loaded, _ in progress)
+    assert not loader.running
+
+
+def test_loader_skips_unreadable_files(loader, replay_dir, qtbot):
+    batches = []
+    loader.batch_loaded.connect(batches.append)
+
+    with qtbot.waitSignal(loader.finished):
+        loader.load(_filenames(replay_dir) + ["missing.fafreplay"])
+
+    records = [r.filename for batch in batches for r in batch]
+    assert sorted(records) == _filenames(replay_dir)
+
+
+def test_loader_finishes_at_once_without_files(loader, qtbot):
+    with qtbot.waitSignal(loader.finished, timeout=0):
+        loader.load([])
+    assert not loader.running
+
+
+def test_loader_drops_batches_of_cancelled_load(application, loader,
+                                                replay_dir, qtbot):
+    batches = []
+    loader.batch_loaded.connect(batches.append)
+
+    loader.load(_filenames(replay_dir))
+    assert loader.running
+    with qtbot.waitSignal(loader.finished, timeout=0):
+        loader.cancel()
+    loader._pool.waitForDone()
+    application.processEvents()
+
+    assert batches == []
+    assert not loader.running
+
+
+def test_loader_only_reports_latest_load(application, loader, replay_dir,
+                                         qtbot):
+    batches = []
+    loader.batch_loaded.connect(batches.append)
+
+    loader.load(_filenames(replay_dir))
+    loader.load(_filenames(replay_dir)[:2])
+    qtbot.waitUntil(lambda: not loader.running)
+    loader._pool.waitForDone()
+    application.processEvents()
+
+    records = [r.filename for batch in batches for r in batch]
+    assert sorted(records) == _filenames(replay_dir)[:2]
+
+
+def test_loader_reads_headers_on_worker_threads(replayloader, loader,
+                                                replay_dir, qtbot, mocker):
+    threads = set()
+    read_record = replayloader.read_replay_record
+
+    def read(*args):
+        threads.add(threading.current_thread())
+        return read_record(*args)
+    mocker.patch.object(replayloader, "read_replay_record", side_effect=read)
+
+    with qtbot.waitSignal(loader.finished):
+        loader.load(_filenames(replay_dir))
+
+    assert threading.main_thread() not in threads
+    assert 1 <= len(threads) <= loader.MAX_THREADS
+    assert loader._pool.maxThreadCount() == loader.MAX_THREADS
@@ -0,0 +1,65 @@
+import pytest
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture(scope="module")
+def replays(application):
+    # The replays package pulls in the client window on import
+    import client  # noqa: F401
+    from replays import replayindex, replaystats
+    return replayindex, replaystats
+
+
+@pytest.fixture
+def stats(replays):
+    replayindex, replaystats = replays
+    ReplayRecord = replayindex.ReplayRecord
+    ReplayStatus = replayindex.ReplayStatus
+
+    def _record(uid, mapname, teams, mod="faf", launch_time=None):
+        if launch_time is None:
+            launch_time = 1500000000 + uid * DAY
+        return ReplayRecord("{}.fafreplay".format(uid), ReplayStatus.COMPLETE,
+                            launch_time, mapname, "game", mod, teams)
+
+    return replaystats.ReplayStats([
+        _record(1, "Setons Clutch", {"2": ["Alice", "Bob"], "3": ["Carol", "Dave"]}),
+        _record(2, "Setons Clutch", {"2": ["Alice", "Carol"], "3": ["Bob", "Eve"]}),
+        _record(3, "Theta Passage", {"1": ["Alice", "Bob", "Carol"], "-1": ["Zed"]}),
+        _record(4, "Theta Passage", {"1": ["Alice"], "2": ["Bob"]}, mod="ladder1v1"),
+        ReplayRecord("old.scfareplay", ReplayStatus.LEGACY, None, None, None, None, {}),
+    ])
+
+
+def test_stats_only_include_complete_replays(stats):
+    assert len(stats) == 4
+
+
+def test_stats_select(stats):
+    def files(rows):
+        return [stats.filenames[r] for r in rows]
+
+    assert files(stats.select(mapname="setons clutch")) == ["1.fafreplay", "2.fafreplay"]
+    assert files(stats.select(players=["alice", "dave"])) == ["1.fafreplay"]
+    assert files(stats.select(players=["Bob"], featured_mod="ladder1v1")) == ["4.fafreplay"]
+    assert files(stats.select(since=1500000000 + 2 * DAY, until=1500000000 + 4 * DAY)) == \
+        ["2.fafreplay", "3.fafreplay"]
+    assert stats.select(players=["Zed"]) == []
+    assert stats.select(mapname="Unknown Map") == []
+
+
+def test_stats_count_by(stats):
+    assert stats.count_by("mapname") == {"Setons Clutch": 2, "Theta Passage": 2}
+    assert stats.count_by("featured_mod") == {"faf": 3, "ladder1v1": 1}
+    rows = stats.select(mapname="Theta Passage")
+    assert stats.count_by("player", rows) == {"Alice": 2, "Bob": 2, "Carol": 1}
+    assert sum(stats.count_by("day").values()) == 4
+    with pytest.raises(ValueError):
+        stats.count_by("color")
+
+
+def test_stats_co_players(stats):
+    assert stats.co_players("alice", same_team=True) == {"Bob": 1, "Carol": 1}
+    assert stats.co_players("alice", same_team=False) == {"Bob": 3, "Carol": 2, "Dave": 1, "Eve": 1}
+    assert stats.co_players("alice") == {"Bob": 4, "Carol": 3, "Dave": 1, "Eve": 1}
@@ -0,0 +1,78 @@
+import random
+import re
+
+import pytest
+
+from util import irc_escape, html_escape, html_escape_table
+
+
+def _reference_irc_escape(text):
+    # irc_escape as it used to be, escaping and matching one word at a time
+    text = "".join(html_escape_table.get(c, c) for c in text)
+    url_re = re.compile(
+        r'^((https?|faflive|fafgame|fafmap|ftp|ts3server)://)?'
+        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+'
+        r'(?:ac|ad|ae|aero|af|ag|ai|al|am|an|ao|aq|ar|arpa|as|asia|at|au|aw|ax|az|ba|bb|bd|be|bf|bg|bh|bi|biz|bj|bm|bn|bo|br|bs|bt|bv|bw|by|bz|ca|cat|cc|cd|cf|cg|ch|ci|ck|cl|cm|cn|co|com|coop|cr|cu|cv|cw|cx|cy|cz|de|dj|dk|dm|do|dz|ec|edu|ee|eg|er|es|et|eu|fi|fj|fk|fm|fo|fr|ga|gb|gd|ge|gf|gg|gh|gi|gl|gm|gn|gov|gp|gq|gr|gs|gt|gu|gw|gy|hk|hm|hn|hr|ht|hu|id|ie|il|im|in|info|int|io|iq|ir|is|it|je|jm|jo|jobs|jp|ke|kg|kh|ki|km|kn|kp|kr|kw|ky|kz|la|lb|lc|li|lk|lr|ls|lt|lu|lv|ly|ma|mc|md|me|mg|mh|mil|mk|ml|mm|mn|mo|mobi|mp|mq|mr|ms|mt|mu|museum|mv|mw|mx|my|mz|na|name|nc|ne|net|nf|ng|ni|nl|no|np|nr|nu|nz|om|org|pa|pe|pf|pg|ph|pk|pl|pm|pn|pr|pro|ps|pt|pw|py|qa|re|ro|rs|ru|rw|sa|sb|sc|sd|se|sg|sh|si|sj|sk|sl|sm|sn|so|sr|st|su|sv|sx|sy|sz|tc|td|tel|tf|tg|th|tj|tk|tl|tm|tn|to|tp|tr|travel|tt|tv|tw|tz|ua|ug|uk|us|uy|uz|va|vc|ve|vg|vi|vn|vu|wf|ws|xxx|ye|yt|za|zm|zw)'
+        r'|localhost'
+        r'|\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
+        r'(?::\d+)?'
+        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+    result = []
+    for fragment in text.split(" "):
+        match = url_re.match(fragment)
+        if match:
+            if "://" in fragment:
+                rpl = '<a href="{0}">{0}</a>'.format(fragment)
+            else:
+                rpl = '<a href="http://{0}">{0}</a>'.format(fragment)
+            fragment = fragment.replace(match.group(0), rpl)
+        result.append(fragment)
+    return " ".join(result)
+
+
+LINES = [
+    "",
+    "gl hf",
+    "check out faforever.com",
+    "https://www.faforever.com/news?id=3&x=<b>",
+    "join fafgame://lobby.faforever.com/1234/5678.SCFAreplay now",
+    "<script>alert('hi')</script> & \"quotes\"",
+    "localhost:8080/test and LOCALHOST",
+    "ip 127.0.0.1:6112 and 999.1.1.1/x",
+    "trailing newline google.com\n",
+    "google.com\n more",
+    "google.com\n\n",
+    "a.com\tb.com",
+    "double  spaces  a.co  ",
+    "not.a.tld sentence. End.",
+    "ts3server://voice.faforever.com?port=9987",
+    "www.example.com/path/with.dots/ http://x.y/u?v=http://z.org",
+    "mixed CaSe WwW.GooGle.CoM",
+    "unicode ünicode.de ☢.com",
+]
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_irc_escape_matches_reference(line):
+    assert irc_escape(line) == _reference_irc_escape(line)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_irc_escape_matches_reference_on_random_lines(seed):
+    rng = random.Random(seed)
+    words = [w for line in LINES for w in line.split(" ")] + \
+        ["\n", " ", "&", "<", ".", "/", ":", "://", "com", "localhost"]
+    for _ in range(200):
+        line = rng.choice(["", " "]).join(
+            rng.choice(words) for _ in range(rng.randint(1, 12)))
+        assert irc_escape(line) == _reference_irc_escape(line)
+
+
+def test_irc_escape_links_urls():
+    assert irc_escape("see faforever.com & <b>") == \
+        'see <a href="http://faforever.com">faforever.com</a> &amp; &lt;b&gt;'
+
+
+def test_html_escape():
+    assert html_escape("<a href='x'>\"&\"</a>") == \
+        "&lt;a href=&apos;x&apos;&gt;&quot;&amp;&quot;&lt;/a&gt;"
@@ -0,0 +1,109 @@
+from PyQt5.QtCore import QItemSelectionModel, QModelIndex, QObject, \
+    QPersistentModelIndex, QSortFilterProxyModel, Qt, pyqtSignal
+
+from util.qt_list_model import QtListModel
+
+
+class Item(QObject):
+    updated = pyqtSignal(object)
+
+    def __init__(self, data):
+        QObject.__init__(self)
+        self.data = data
+
+
+def _contents(model):
+    return sorted(model.data(model.index(row), Qt.DisplayRole).data
+                  for row in range(model.rowCount(model.index(-1))))
+
+
+def test_add_and_remove_items(application):
+    model = QtListModel(Item)
+    model._add_items((i, i) for i in range(10))
+    assert _contents(model) == list(range(10))
+
+    model._remove_items([0, 3, 8, 9])
+    model._remove_item(5)
+    assert _contents(model) == [1, 2, 4, 6, 7]
+    for row, item in enumerate(model._itemlist):
+        assert model._rows[item] == row
+
+    model._add_item(3, 3)
+    assert _contents(model) == [1, 2, 3, 4, 6, 7]
+    model._clear_items()
+    assert _contents(model) == []
+
+
+def test_persistent_indexes_follow_their_items(application):
+    model = QtListModel(Item)
+    model._add_items((i, i) for i in range(8))
+    indexes = {i: QPersistentModelIndex(model.index(i)) for i in range(8)}
+
+    model._remove_items([1, 4, 6])
+    for i, index in indexes.items():
+        if i in (1, 4, 6):
+            assert not index.isValid()
+        else:
+            assert model.data(QModelIndex(index), Qt.DisplayRole).data == i
+    for row, item in enumerate(model._itemlist):
+        assert model._rows[item] == row
+
+
+def test_selection_follows_items(application):
+    model = QtListModel(Item)
+    model._add_items((i, i) for i in range(5))
+    selection = QItemSelectionModel(model)
+    selection.select(model.index(4), QItemSelectionModel.Select)
+
+    model._remove_items([1])
+    selected = selection.selectedIndexes()
+    assert [model.data(i, Qt.DisplayRole).data for i in selected] == [4]
+
+
+def test_removal_doesnt_make_proxies_sort_again(application, mocker):
+    class Proxy(QSortFilterProxyModel):
+        compared = 0
+
+        def lessThan(self, left, right):
+            self.compared += 1
+            source = self.sourceModel()
+            return (source.data(left, Qt.DisplayRole).data
+                    < source.data(right, Qt.DisplayRole).data)
+
+    model = QtListModel(Item)
+    model._add_items((i, i) for i in range(100))
+    proxy = Proxy()
+    proxy.setSourceModel(model)
+    proxy.sort(0)
+    layout_changed = mocker.Mock()
+    proxy.layoutChanged.connect(layout_changed)
+    removed = mocker.Mock()
+    model.rowsRemoved.connect(removed)
+
+    proxy.compared = 0
+    model._remove_items([3, 4, 5, 50, 99])
+    model._remove_item(0)
+
+    assert not layout_changed.called
+    assert proxy.compared == 0
+    assert [a[1:] for a, _ in removed.call_args_list] == \
+        [(99, 99), (50, 50), (3, 5), (0, 0)]
+    assert [proxy.data(proxy.index(row, 0), Qt.DisplayRole).data
+            for row in range(proxy.rowCount())] == \
+        [i for i in range(100) if i not in (0, 3, 4, 5, 50, 99)]
+
+
+def test_item_updates_are_coalesced(application, qtbot, mocker):
+    model = QtListModel(Item)
+    model._add_items((i, i) for i in range(5))
+    changed = mocker.Mock()
+    model.dataChanged.connect(changed)
+
+    for row in [0, 1, 1, 3]:
+        item = model._itemlist[row]
+        item.updated.emit(item)
+    assert not changed.called
+
+    qtbot.waitUntil(lambda: changed.call_count == 2)
+    ranges = [(a[0].row(), a[1].row()) for a, _ in changed.call_args_list]
+    assert ranges == [(0, 1), (3, 3)]
@@ -0,0 +1,61 @@
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from util.qt_list_model import QtListModel
+from util.sort_key_model import SortKeyFilterModel
+
+
+class Item(QObject):
+    updated = pyqtSignal(object)
+
+    def __init__(self, value):
+        QObject.__init__(self)
+        self.value = value
+
+
+class ValueSortModel(SortKeyFilterModel):
+    def __init__(self, model):
+        SortKeyFilterModel.__init__(self)
+        self.key_calls = 0
+        self.setSourceModel(model)
+        self.sort(0)
+
+    def sort_key(self, item):
+        self.key_calls += 1
+        return item.value
+
+
+def _values(proxy):
+    return [proxy.data(proxy.index(row, 0), Qt.DisplayRole).value
+            for row in range(proxy.rowCount())]
+
+
+def test_sorts_by_cached_keys(application):
+    model = QtListModel(Item)
+    proxy = ValueSortModel(model)
+    model._add_items((v, v) for v in [5, 3, 9, 1, 7])
+    assert _values(proxy) == [1, 3, 5, 7, 9]
+    assert proxy.key_calls == 5
+
+    proxy.sort(0, Qt.DescendingOrder)
+    assert _values(proxy) == [9, 7, 5, 3, 1]
+    assert proxy.key_calls == 5
+
+
+def test_changed_item_gets_new_key(application, qtbot):
+    model = QtListModel(Item)
+    proxy = ValueSortModel(model)
+    model._add_items((v, v) for v in [1, 2, 3])
+    item = model._items[1]
+    item.value = 10
+    item.updated.emit(item)
+    qtbot.waitUntil(lambda: _values(proxy) == [2, 3, 10])
+
+
+def test_invalidate_recomputes_keys(application):
+    model = QtListModel(Item)
+    proxy = ValueSortModel(model)
+    model._add_items((v, v) for v in [1, 2, 3])
+    for item in model._itemlist:
+        item.value = -item.value
+    proxy.invalidate()
+    assert _values(proxy) == [-3, -2, -1]